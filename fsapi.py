@@ -0,0 +1,335 @@
+#
+# JSON API for financial analysis
+#
+
+# -------------------------------------------------------------------------------------------------
+# Imports
+# -------------------------------------------------------------------------------------------------
+
+import pandas    as pd
+import numpy     as np
+import argparse
+import hashlib
+import json
+import threading
+import fschart   as fc
+import fscache
+import fscore
+import fsind
+import fspattern
+import fsprovider
+import fsstore
+
+from http.server  import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# -------------------------------------------------------------------------------------------------
+# Globals
+# -------------------------------------------------------------------------------------------------
+
+# data source ( fetch_info / fetch_history signatures ), replaced by use_stub() for load tests
+source = {
+    'info'   : fscore.fetch_info,
+    'history': fscore.fetch_history,
+}
+
+# serialized responses are keyed by their ETag and expire with the daily tables
+fscache.policies[ 'api' ] = fscache.policies[ 'table' ]
+
+# server started by start() (one per process)
+_server = None
+_lock   = threading.Lock()
+
+# rebalancing modes accepted by /btest (same as the dashboard selector)
+rebalance_modes = [ 'None', 'Monthly', 'Quarterly', 'Band' ]
+
+class QueryError( Exception ):
+
+    # invalid request parameters (answered with 400, anything else is a server error)
+    pass
+
+# -------------------------------------------------------------------------------------------------
+# Source Functions
+# -------------------------------------------------------------------------------------------------
+
+def use_stub():
+
+    # synthetic provider without the local store (each ticker seeded by its name, so every subset agrees)
+    @fscache.memoize( 'daily' )
+    def stub_history( tickers, period, interval ):
+        return fsprovider.synthetic_history( tickers, interval, period )
+
+    @fscache.memoize( 'info' )
+    def stub_info( tickers ):
+        return fsprovider.synthetic_info( tickers )
+
+    source[ 'info'    ] = stub_info
+    source[ 'history' ] = stub_history
+
+# -------------------------------------------------------------------------------------------------
+# Request Functions
+# -------------------------------------------------------------------------------------------------
+
+def get_list( query, name, default=None ):
+
+    # comma separated values
+    if name not in query:
+        if default is None: raise QueryError( f'missing parameter: {name}' )
+        return list( default )
+    values = [ v.strip() for v in query[ name ].split( ',' ) if v.strip() != '' ]
+    if values == []: raise QueryError( f'empty parameter: {name}' )
+    return values
+
+def get_port( query ):
+
+    # 'AAA:60,BBB:40' (weight 1 when omitted)
+    port = {}
+    for item in get_list( query, 'port' ):
+        ticker, _, weight = item.partition( ':' )
+        try:
+            port[ ticker.upper() ] = float( weight ) if weight else 1.
+        except ValueError:
+            raise QueryError( f'invalid weight: {item}' )
+    return port
+
+def get_number( query, name ):
+
+    try:
+        return float( query[ name ] )
+    except ValueError:
+        raise QueryError( f'invalid number: {name}={query[ name ]}' )
+
+def get_period( query, name, default ):
+
+    period = query.get( name, default )
+    if period not in fscore.period_delta: raise QueryError( f'unknown period: {period}' )
+    return period
+
+def check_history( hist, tickers ):
+
+    # requested tickers without data are a client error, not a failed build
+    symbols = set( hist.index.unique( level=0 ) ) if isinstance( hist, pd.DataFrame ) and len( hist.index ) > 0 else set()
+    missing = [ t for t in tickers if t not in symbols ]
+    if missing: raise QueryError( f'no data for: {",".join( missing )}' )
+    return hist
+
+def to_plain( value ):
+
+    # JSON-safe values (pandas serializer turns NaN into null and dates into ISO strings)
+    if isinstance( value, ( pd.DataFrame, pd.Series ) ): return json.loads( value.to_json( orient='index', date_format='iso' ) )
+    if isinstance( value, dict ): return { str( k ): to_plain( v ) for k, v in value.items() }
+    if isinstance( value, ( list, tuple ) ): return [ to_plain( v ) for v in value ]
+    if isinstance( value, np.generic ): value = value.item()
+    if isinstance( value, float ) and not np.isfinite( value ): return None
+    return value
+
+# -------------------------------------------------------------------------------------------------
+# Endpoint Functions ( query -> data version, build function )
+# -------------------------------------------------------------------------------------------------
+
+# same fetches as the dashboard menus, so both share cache entries
+
+def api_table( query ):
+
+    port   = get_port( query )
+    port_k = list( port )
+    info   = source[ 'info'    ]( port_k )
+    hist   = check_history( source[ 'history' ]( port_k, '1y', '1d' ), port_k )
+    return ( fscache.get_token( info ), fsind.get_version( hist ) ), lambda: fscore.fill_table( info, hist, port )
+
+def api_gains( query ):
+
+    port   = get_port( query )
+    port_k = list( port )
+    info   = source[ 'info'    ]( port_k )
+    hist   = check_history( source[ 'history' ]( port_k, '1y', '1d' ), port_k )
+
+    def build():
+        gains = fscore.get_port_gains( info, hist, port )
+        return dict( zip( [ '1D', '1W', '1M', '3M', '6M', '1Y' ], gains ) )
+
+    return ( fscache.get_token( info ), fsind.get_version( hist ) ), build
+
+def api_btest( query ):
+
+    params = { **fscore.default_params, 'port': get_port( query ), 'bench': get_list( query, 'bench', fscore.default_params[ 'bench' ] ) }
+    for name in [ 'band', 'cost_bps', 'slippage_bps' ]:
+        if name in query: params[ name ] = get_number( query, name )
+    if 'rebalance' in query:
+        if query[ 'rebalance' ] not in rebalance_modes: raise QueryError( f'unknown rebalance: {query["rebalance"]}' )
+        params[ 'rebalance' ] = query[ 'rebalance' ]
+
+    period     = get_period( query, 'period', params[ 'gain_period' ] )
+    bench_hist = check_history( source[ 'history' ]( params[ 'bench' ],      fscore.get_fetch_period( period ), '1d' ), params[ 'bench' ] )
+    gain_hist  = check_history( source[ 'history' ]( list( params['port'] ), fscore.get_fetch_period( period ), '1d' ), list( params['port'] ) )
+
+    def build():
+        num_points  = min( [ fscore.get_num_points( bench_hist['close'][ t ].index, fscore.period_delta[ period ] ) for t in params['bench'] ] +
+                           [ fscore.get_num_points( gain_hist ['close'][ t ].index, fscore.period_delta[ period ] ) for t in params['port' ] ] )
+        source_, info = fc.get_btest_source( gain_hist, bench_hist, num_points, params )
+        series = json.loads( source_.to_json( orient='records', date_format='iso' ) )
+        return { 'stats': info, 'rebalance': info.attrs.get( 'rebalance' ), 'series': series }
+
+    return ( fsind.get_version( bench_hist ), fsind.get_version( gain_hist ) ), build
+
+def api_indicators( query ):
+
+    ticker = get_list( query, 'ticker' )[0].upper()
+    period = get_period( query, 'period', '3M' )
+    hist   = check_history( source[ 'history' ]( [ ticker ], fscore.get_fetch_period( period ), '1d' ), [ ticker ] )
+
+    def build():
+        num_points = fscore.get_num_points( hist['close'][ ticker ].index, fscore.period_delta[ period ] )
+        macd, signal, histo = fsind.get_macd( hist, ticker )
+        upper, middle, lower = fsind.get_bbands( hist, ticker )
+        return pd.DataFrame( {
+            'Close'   : hist[ 'close' ][ ticker ],
+            'RSI(14)' : fsind.get_rsi( hist, ticker ),
+            'CCI(14)' : fsind.get_cci( hist, ticker ),
+            'MACD'    : macd,
+            'Signal'  : signal,
+            'Histo'   : histo,
+            'BB_Upper': upper,
+            'BB_Lower': lower,
+        } ).iloc[ -num_points: ]
+
+    return ( fsind.get_version( hist, ticker ), ), build
+
+def api_patterns( query ):
+
+    tickers = [ t.upper() for t in get_list( query, 'tickers' ) ]
+    period  = get_period( query, 'period', fscore.default_params[ 'pattern_period' ] )
+    bullish = get_list( query, 'bullish', fscore.bullish_pattern )
+    bearish = get_list( query, 'bearish', fscore.bearish_pattern )
+    unknown = [ p for p in bullish + bearish if p not in fspattern.all_patterns ]
+    if unknown: raise QueryError( f'unknown pattern: {",".join( unknown )}' )
+    hist    = check_history( source[ 'history' ]( tickers, '1y', '1d' ), tickers )
+
+    def build():
+        num_points = fscore.get_num_points( hist['close'][ tickers[0] ].index, fscore.period_delta[ period ] )
+        bull_logs, bear_logs = fspattern.get_logs( hist, tickers, bullish, bearish, num_points )
+        return { 'Bullish': bull_logs, 'Bearish': bear_logs }
+
+    return ( fsind.get_version( hist ), ), build
+
+def api_cache( query ):
+
+    # never cached (changes on every request)
+    return None, lambda: fscache.get_stats()
+
+endpoints = {
+    '/table'     : api_table,
+    '/gains'     : api_gains,
+    '/btest'     : api_btest,
+    '/indicators': api_indicators,
+    '/patterns'  : api_patterns,
+    '/cache'     : api_cache,
+}
+
+# -------------------------------------------------------------------------------------------------
+# Server Functions
+# -------------------------------------------------------------------------------------------------
+
+def get_etag( path, query, version ):
+
+    # data version of every input plus the request itself (None: not cacheable)
+    if version is None or None in version: return None
+    text = repr( ( path, sorted( query.items() ), version ) )
+    return '"' + hashlib.sha1( text.encode() ).hexdigest()[:20] + '"'
+
+def respond( path, query, if_none_match=None ):
+
+    # ( status, etag, body ) for one request
+    if path not in endpoints: return 404, None, { 'error': f'unknown endpoint: {path}' }
+    try:
+        version, build = endpoints[ path ]( query )
+        etag = get_etag( path, query, version )
+        if etag is not None and if_none_match is not None and etag in [ t.strip() for t in if_none_match.split( ',' ) ]:
+            return 304, etag, None
+
+        # responses shared between clients until the data version changes
+        entry = fscache.get( ( 'api', etag ), 'api' ) if etag is not None else None
+        if entry is not None: return 200, etag, entry[ 'value' ]
+
+        body = json.dumps( to_plain( build() ) ).encode()
+        if etag is not None: fscache.put( ( 'api', etag ), 'api', body )
+        return 200, etag, body
+
+    except QueryError as e:
+        return 400, None, { 'error': str( e ) }
+    except Exception as e:
+        return 500, None, { 'error': f'{type( e ).__name__}: {e}' }
+
+class Handler( BaseHTTPRequestHandler ):
+
+    # keep-alive connections for repeated polling (headers and body go out without delay)
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET( self ):
+        url   = urlparse( self.path )
+        query = { k: v[-1] for k, v in parse_qs( url.query ).items() }
+        status, etag, body = respond( url.path.rstrip( '/' ) or '/', query, self.headers.get( 'If-None-Match' ) )
+        if isinstance( body, dict ): body = json.dumps( body ).encode()
+
+        self.send_response( status )
+        if etag is not None:
+            self.send_header( 'ETag', etag )
+            self.send_header( 'Cache-Control', 'no-cache' )
+        if status == 304:
+            self.end_headers()
+            return
+        self.send_header( 'Content-Type', 'application/json' )
+        self.send_header( 'Content-Length', str( len( body ) ) )
+        self.end_headers()
+        self.wfile.write( body )
+
+    def log_message( self, format, *args ):
+        pass
+
+def start( port, host='127.0.0.1' ):
+
+    # one server thread per process (dashboard reruns reuse it), a thread per client
+    global _server
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer( ( host, port ), Handler )
+            _server.daemon_threads = True
+            threading.Thread( target=_server.serve_forever, daemon=True ).start()
+    return _server
+
+def stop():
+
+    global _server
+    with _lock:
+        if _server is not None:
+            _server.shutdown()
+            _server.server_close()
+            _server = None
+
+# -------------------------------------------------------------------------------------------------
+# Main
+# -------------------------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser( description='Financial Stream API' )
+    parser.add_argument( '--port', type=int, default=8502 )
+    parser.add_argument( '--host', default='127.0.0.1' )
+    parser.add_argument( '--store', default=fsstore.store_dir )
+    parser.add_argument( '--offline', action='store_true', help='use only the local store and info snapshots' )
+    parser.add_argument( '--stub', action='store_true', help='serve synthetic data (load tests)' )
+    parser.add_argument( '--provider', default='yahoo', choices=[ 'yahoo', 'record', 'replay', 'synthetic' ] )
+    parser.add_argument( '--record-file', default=fsprovider.record_file )
+    parser.add_argument( '--latency', type=float, nargs=2, default=[ 0, 0 ], metavar=( 'CALL', 'TICKER' ) )
+    args = parser.parse_args()
+
+    fsstore.store_dir = args.store
+    fscore.offline    = args.offline
+    fsprovider.use( args.provider, args.record_file, *args.latency )
+    if args.stub: use_stub()
+
+    server = ThreadingHTTPServer( ( args.host, args.port ), Handler )
+    server.daemon_threads = True
+    print( f'serving on http://{args.host}:{args.port}' )
+    server.serve_forever()
@@ -0,0 +1,201 @@
+#
+# Benchmarks for financial analysis
+#
+
+# -------------------------------------------------------------------------------------------------
+# Imports
+# -------------------------------------------------------------------------------------------------
+
+import pandas    as pd
+import altair    as alt
+import numpy     as np
+import argparse
+import threading
+import tempfile
+import time
+import os
+import http.client
+import fschart   as fc
+import fsdown
+import fsscreen
+import fsapi
+import fscache
+import fscore
+import fsflight
+import fsprovider
+
+# -------------------------------------------------------------------------------------------------
+# Data Functions
+# -------------------------------------------------------------------------------------------------
+
+def make_bond( st_hist, ticker ):
+
+    # bond history layout ( Close column ) from a synthetic ticker
+    return pd.DataFrame( { 'Close': st_hist[ 'close' ][ ticker ].to_numpy() / 50 }, index=st_hist[ 'close' ][ ticker ].index )
+
+# -------------------------------------------------------------------------------------------------
+# Benchmark Functions
+# -------------------------------------------------------------------------------------------------
+
+def measure( build, repeat ):
+
+    # average build and serialization time (ms), spec size (KB)
+    start = time.perf_counter()
+    for i in range( repeat ):
+        charts = build()
+        if not isinstance( charts, tuple ): charts = ( charts, )
+        spec = [ ch.to_json() for ch in charts ]
+    elapsed = ( time.perf_counter() - start ) / repeat * 1000
+    return elapsed, sum( [ len( s ) for s in spec ] ) / 1024
+
+def get_builders( num_days ):
+
+    tickers = [ 'AAA', 'BBB', 'CCC', 'SPY' ]
+    hist    = fsscreen.make_synthetic_history( tickers, num_days=num_days )
+    info    = fsscreen.make_synthetic_info( hist )
+    bonds   = [ [ 'U.S. 10Y', make_bond( hist, 'AAA' ) ], [ 'U.S. 2Y', make_bond( hist, 'BBB' ) ] ]
+    params  = {
+        'port'     : { 'AAA': 1, 'BBB': 1, 'CCC': 1 },
+        'bench'    : [ 'SPY' ],
+        'rebalance': 'None',
+        'RSI_L'    : 30, 'RSI_H': 70, 'CCI_L': -100, 'CCI_H': 100,
+    }
+    n = num_days
+
+    return {
+        'get_price_chart' : lambda: fc.get_price_chart( info, hist, 'AAA', n, True ),
+        'get_candle_chart': lambda: fc.get_candle_chart( info, hist, 'AAA', n ),
+        'get_stock_chart' : lambda: fc.get_stock_chart( info, hist, 'AAA', n, params, True, { 20: 'red' } ),
+        'get_btest_chart' : lambda: fc.get_btest_chart( fc.get_btest_source( hist, hist, n, params )[0] ),
+        'get_bond_chart'  : lambda: fc.get_bond_chart( bonds[0], bonds[1], n ),
+    }
+
+def run( num_days, target, repeat ):
+
+    # each builder without and with downsampling
+    rows = {}
+    for name, build in get_builders( num_days ).items():
+        fsdown.target_points = None
+        ms0, kb0 = measure( build, repeat )
+        fsdown.target_points = target
+        ms1, kb1 = measure( build, repeat )
+        rows[ name ] = { 'Raw(ms)': ms0, 'Raw(KB)': kb0, 'Down(ms)': ms1, 'Down(KB)': kb1, 'Ratio': kb0 / kb1 }
+    return pd.DataFrame( rows ).transpose()
+
+def get_requests():
+
+    # endpoint name -> path of the api load test
+    port = 'AAA:40,BBB:30,CCC:30'
+    return {
+        'table'     : f'/table?port={port}',
+        'gains'     : f'/gains?port={port}',
+        'btest'     : f'/btest?port={port}&bench=SPY&period=1Y',
+        'indicators': '/indicators?ticker=AAA&period=3M',
+        'patterns'  : '/patterns?tickers=AAA,BBB,CCC&period=1M',
+    }
+
+def run_client( address, paths, num_requests, conditional, result ):
+
+    # one keep-alive connection, revalidating with the last ETag of each path
+    conn  = http.client.HTTPConnection( *address )
+    etags = {}
+    for i in range( num_requests ):
+        path    = paths[ i % len( paths ) ]
+        headers = { 'If-None-Match': etags[ path ] } if conditional and path in etags else {}
+        start   = time.perf_counter()
+        conn.request( 'GET', path, headers=headers )
+        resp    = conn.getresponse()
+        body    = resp.read()
+        result.append( ( path, resp.status, time.perf_counter() - start, len( body ) ) )
+        if resp.getheader( 'ETag' ): etags[ path ] = resp.getheader( 'ETag' )
+    conn.close()
+
+def run_api( num_clients, num_requests, conditional=True ):
+
+    # concurrent clients against the stub source (cold caches)
+    fscache.clear()
+    fsapi.use_stub()
+    server  = fsapi.start( 0 )
+    paths   = list( get_requests().values() )
+    result  = []
+    threads = [ threading.Thread( target=run_client, args=( server.server_address, paths[ i % len( paths ): ] + paths[ :i % len( paths ) ], num_requests, conditional, result ) )
+                for i in range( num_clients ) ]
+
+    start = time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed = time.perf_counter() - start
+    fsapi.stop()
+
+    rows = {}
+    for name, path in get_requests().items():
+        items = [ r for r in result if r[0] == path ]
+        times = np.array( [ r[2] for r in items ] ) * 1000
+        rows[ name ] = {
+            'Requests': len( items ),
+            '200'     : sum( [ r[1] == 200 for r in items ] ),
+            '304'     : sum( [ r[1] == 304 for r in items ] ),
+            'Mean(ms)': times.mean(),
+            'P95(ms)' : np.percentile( times, 95 ),
+            'Max(ms)' : times.max(),
+            'KB'      : sum( [ r[3] for r in items ] ) / 1024,
+        }
+    return pd.DataFrame( rows ).transpose(), len( result ) / elapsed
+
+def run_flight( num_sessions, latency ):
+
+    # sessions opening at once with overlapping ticker lists (sectors, benchmark, one of four portfolios),
+    # served from a synthetic recording with a simulated network delay
+    lists  = [ list( fscore.sector_tickers ) + [ 'QQQ', f'PORT{i % 4}' ] for i in range( num_sessions ) ]
+    path   = os.path.join( tempfile.mkdtemp(), 'record.bin' )
+    fsprovider.make_recorder( fsprovider.synthetic, path )[ 'history' ]( fsscreen.get_universe( *lists ), '1d', '1y' )
+    replay = fsprovider.make_replay( path, *latency )
+
+    rows = {}
+    for mode in [ 'Direct', 'Single-flight' ]:
+        calls = []
+        def upstream( tickers ):
+            calls.append( len( tickers ) )
+            return replay[ 'history' ]( tickers, '1d', '1y' )
+
+        if mode == 'Direct': fetch = upstream
+        else:                fetch = lambda tickers: fsflight.fetch( 'history', tickers, upstream, ( 'bench', mode ) )
+
+        threads = [ threading.Thread( target=fetch, args=( tickers, ) ) for tickers in lists ]
+        start   = time.perf_counter()
+        for t in threads: t.start()
+        for t in threads: t.join()
+        rows[ mode ] = { 'Time(ms)': ( time.perf_counter() - start ) * 1000, 'Upstream': len( calls ), 'Tickers': sum( calls ) }
+    return pd.DataFrame( rows ).transpose()
+
+# -------------------------------------------------------------------------------------------------
+# Main
+# -------------------------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser( description='Financial Stream benchmarks' )
+    parser.add_argument( '--days', type=int, nargs='+', default=[ 252, 2520 ] )
+    parser.add_argument( '--target', type=int, default=fsdown.target_points )
+    parser.add_argument( '--repeat', type=int, default=3 )
+    parser.add_argument( '--api', type=int, nargs=2, default=None, metavar=( 'CLIENTS', 'REQUESTS' ), help='api load test instead' )
+    parser.add_argument( '--no-etag', action='store_true', help='api load test without conditional requests' )
+    parser.add_argument( '--flight', type=int, default=None, metavar='SESSIONS', help='fetch coalescing test instead' )
+    parser.add_argument( '--latency', type=float, nargs=2, default=[ 0.3, 0.01 ], metavar=( 'CALL', 'TICKER' ) )
+    args = parser.parse_args()
+
+    pd.set_option( 'display.width', 120 )
+    alt.data_transformers.disable_max_rows()
+
+    if args.api is not None:
+        table, rate = run_api( args.api[0], args.api[1], not args.no_etag )
+        print( f'\n[ api, {args.api[0]} clients x {args.api[1]} requests, {rate:.0f} requests/s ]' )
+        print( table.round( 1 ) )
+    elif args.flight is not None:
+        print( f'\n[ history fetch, {args.flight} concurrent sessions, latency {args.latency[0]}s + {args.latency[1]}s/ticker ]' )
+        print( run_flight( args.flight, args.latency ).round( 1 ) )
+        print( fsflight.get_stats().round( 1 ) )
+    else:
+        for num_days in args.days:
+            print( f'\n[ chart builders, {num_days} bars, target {args.target} points ]' )
+            print( run( num_days, args.target, args.repeat ).round( 1 ) )
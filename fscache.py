@@ -0,0 +1,295 @@
+#
+# Bounded in-memory cache for financial analysis
+#
+
+# -------------------------------------------------------------------------------------------------
+# Imports
+# -------------------------------------------------------------------------------------------------
+
+import pandas    as pd
+import fscalendar
+import functools
+import inspect
+import threading
+import time
+import sys
+import weakref
+
+from collections import OrderedDict
+
+# -------------------------------------------------------------------------------------------------
+# Globals
+# -------------------------------------------------------------------------------------------------
+
+# memory budget for all entries (bytes)
+budget = 256 * 2**20
+
+# session boundaries of this ticker align daily expiries
+reference = '^GSPC'
+
+# freshness policy per dataset: seconds, or function returning expiry timestamp
+policies = {
+    'intraday': 60,
+    'info'    : 60,
+    'daily'   : lambda: next_close(),
+    'bond'    : 24 * 3600,
+    'table'   : lambda: next_close(),
+    'state'   : lambda: min( time.time() + 900, next_change() ),
+}
+
+# seconds a replaced, evicted or cleared value keeps its token (sessions may still use it as a cache key)
+# ( values supporting weak references, e.g. frames, keep it for as long as they are alive )
+grace = 300
+
+# entries in LRU order (oldest first), replaced values ( time, token, value )
+_entries = OrderedDict()
+_retired = []
+_tokens  = {}
+_stats   = {}
+_version = 0
+_lock    = threading.RLock()
+
+# -------------------------------------------------------------------------------------------------
+# Utility Functions
+# -------------------------------------------------------------------------------------------------
+
+def next_close():
+
+    # daily bars settle at the close of the reference session
+    return fscalendar.next_close( reference ).timestamp()
+
+def next_change():
+
+    return fscalendar.next_change( reference ).timestamp()
+
+def get_expiry( dataset ):
+
+    policy = policies.get( dataset, 0 )
+    if callable( policy ): return policy()
+    return time.time() + policy
+
+def get_size( value ):
+
+    if isinstance( value, pd.DataFrame ): return int( value.memory_usage( deep=True ).sum() )
+    if isinstance( value, pd.Series    ): return int( value.memory_usage( deep=True ) )
+    if isinstance( value, dict ):
+        return sys.getsizeof( value ) + sum( [ get_size( k ) + get_size( v ) for k, v in value.items() ] )
+    if isinstance( value, ( list, tuple ) ):
+        return sys.getsizeof( value ) + sum( [ get_size( v ) for v in value ] )
+    return sys.getsizeof( value )
+
+def freeze( arg ):
+
+    if arg is None or isinstance( arg, ( str, int, float, bool ) ): return arg
+    if isinstance( arg, ( list, tuple ) ): return tuple( [ freeze( v ) for v in arg ] )
+    if isinstance( arg, dict ): return tuple( sorted( [ ( k, freeze( v ) ) for k, v in arg.items() ] ) )
+
+    # values returned by cached functions are keyed by their entry version
+    with _lock:
+        if id( arg ) in _tokens: return _tokens[ id( arg ) ]
+
+    raise TypeError( f'cannot build cache key from {type( arg ).__name__}' )
+
+def get_token( value ):
+
+    with _lock:
+        return _tokens.get( id( value ) )
+
+def count( dataset, field ):
+
+    if dataset not in _stats: _stats[ dataset ] = { 'hits': 0, 'misses': 0, 'evictions': 0 }
+    _stats[ dataset ][ field ] += 1
+
+# -------------------------------------------------------------------------------------------------
+# Entry Functions
+# -------------------------------------------------------------------------------------------------
+
+def forget( value_id, token ):
+
+    # value was garbage collected (its id may be reused from now on)
+    with _lock:
+        if _tokens.get( value_id ) == token: _tokens.pop( value_id )
+
+def track( value, token ):
+
+    # token follows the value while it is alive, True when the value supports weak references
+    _tokens[ id( value ) ] = token
+    try:
+        weakref.finalize( value, forget, id( value ), token )
+        return True
+    except TypeError:
+        return False
+
+def drop( key, evicted=False ):
+
+    # callers may still hold the value, so its token is retired rather than dropped
+    entry = _entries.pop( key )
+    if not entry[ 'weak' ]: _retired.append( ( time.time(), _tokens.get( id( entry[ 'value' ] ) ), entry[ 'value' ] ) )
+    if evicted: count( entry[ 'dataset' ], 'evictions' )
+
+def purge():
+
+    # forget tokens of values replaced more than grace seconds ago
+    while _retired and _retired[0][0] < time.time() - grace:
+        _, token, value = _retired.pop( 0 )
+        if _tokens.get( id( value ) ) == token: _tokens.pop( id( value ) )
+
+def put( key, dataset, value ):
+
+    global _version
+
+    with _lock:
+        if key in _entries: drop( key )
+        purge()
+
+        _version += 1
+        _entries[ key ] = {
+            'dataset': dataset,
+            'value'  : value,
+            'size'   : get_size( value ),
+            'created': time.time(),
+            'expires': get_expiry( dataset ),
+            'hits'   : 0,
+            'weak'   : track( value, ( key[0], _version ) ),
+        }
+
+        # evict least recently used entries beyond budget (keep the newest)
+        total = sum( [ entry[ 'size' ] for entry in _entries.values() ] )
+        while total > budget and len( _entries ) > 1:
+            oldest = next( iter( _entries ) )
+            total -= _entries[ oldest ][ 'size' ]
+            drop( oldest, evicted=True )
+
+def get( key, dataset ):
+
+    with _lock:
+        entry = _entries.get( key )
+        if entry is None or entry[ 'expires' ] <= time.time():
+            count( dataset, 'misses' )
+            return None
+
+        _entries.move_to_end( key )
+        entry[ 'hits' ] += 1
+        count( dataset, 'hits' )
+        return entry
+
+def memoize( dataset ):
+
+    # dataset is a policy name, or a function of the call arguments returning one
+    def decorator( func ):
+
+        signature = inspect.signature( func )
+
+        def bind( args, kwargs ):
+            # keyword and positional calls share one key (defaults filled in)
+            bound = signature.bind( *args, **kwargs )
+            bound.apply_defaults()
+            return bound
+
+        def get_key( bound ):
+            # None when an argument has no key (e.g. a value whose token was forgotten)
+            try:
+                return ( func.__name__, ) + freeze( bound.args ) + ( freeze( bound.kwargs ) if bound.kwargs else () )
+            except TypeError:
+                return None
+
+        def get_dataset( *args, **kwargs ):
+            bound = bind( args, kwargs )
+            return dataset( *bound.args, **bound.kwargs ) if callable( dataset ) else dataset
+
+        @functools.wraps( func )
+        def wrapper( *args, **kwargs ):
+            bound = bind( args, kwargs )
+            key   = get_key( bound )
+            if key is None: return func( *bound.args, **bound.kwargs )
+
+            name  = get_dataset( *bound.args, **bound.kwargs )
+            entry = get( key, name )
+            if entry is not None: return entry[ 'value' ]
+
+            # compute outside the lock so other sessions are not blocked
+            value = func( *bound.args, **bound.kwargs )
+            with _lock:
+                # a concurrent miss may have stored the key meanwhile; keep its value (callers may hold its token)
+                entry = _entries.get( key )
+                if entry is not None and entry[ 'expires' ] > time.time(): return entry[ 'value' ]
+                put( key, name, value )
+            return value
+
+        def revalidate( *args, **kwargs ):
+            # expire in place, next call replaces the entry
+            key = get_key( bind( args, kwargs ) )
+            with _lock:
+                if key in _entries: _entries[ key ][ 'expires' ] = 0
+
+        def refresh( *args, **kwargs ):
+            # recompute and replace, readers keep the old value until then (never blocks a page)
+            bound = bind( args, kwargs )
+            key   = get_key( bound )
+            value = func( *bound.args, **bound.kwargs )
+            if key is not None: put( key, get_dataset( *bound.args, **bound.kwargs ), value )
+            return value
+
+        def expires( *args, **kwargs ):
+            # expiry timestamp, None when not cached
+            key = get_key( bind( args, kwargs ) )
+            with _lock:
+                entry = _entries.get( key )
+                return None if entry is None else entry[ 'expires' ]
+
+        def ttl( *args, **kwargs ):
+            # seconds until expiry, None when not cached
+            stamp = expires( *args, **kwargs )
+            return None if stamp is None else stamp - time.time()
+
+        wrapper.revalidate = revalidate
+        wrapper.refresh    = refresh
+        wrapper.ttl        = ttl
+        wrapper.expires    = expires
+        wrapper.dataset    = get_dataset
+        return wrapper
+
+    return decorator
+
+def clear():
+
+    # values still held by sessions keep their tokens (retired like replaced values)
+    with _lock:
+        for key in list( _entries ): drop( key )
+        purge()
+
+# -------------------------------------------------------------------------------------------------
+# Introspection Functions
+# -------------------------------------------------------------------------------------------------
+
+def get_stats():
+
+    with _lock:
+        info = pd.DataFrame( columns=[ 'Entries', 'Size(KB)', 'Hits', 'Misses', 'Hit(%)', 'Evictions' ] )
+        for name in sorted( set( _stats ) | set( [ e[ 'dataset' ] for e in _entries.values() ] ) ):
+            sizes = [ e[ 'size' ] for e in _entries.values() if e[ 'dataset' ] == name ]
+            stat  = _stats.get( name, { 'hits': 0, 'misses': 0, 'evictions': 0 } )
+            total = stat[ 'hits' ] + stat[ 'misses' ]
+            info.loc[ name ] = {
+                'Entries'  : len( sizes ),
+                'Size(KB)' : sum( sizes ) / 1024,
+                'Hits'     : stat[ 'hits' ],
+                'Misses'   : stat[ 'misses' ],
+                'Hit(%)'   : stat[ 'hits' ] / total * 100 if total > 0 else 0,
+                'Evictions': stat[ 'evictions' ],
+            }
+    return info
+
+def get_entries():
+
+    now = time.time()
+    with _lock:
+        rows = [ {
+            'Dataset' : e[ 'dataset' ],
+            'Key'     : ' '.join( [ str( k ) for k in key ] )[:80],
+            'Size(KB)': e[ 'size' ] / 1024,
+            'Age(s)'  : now - e[ 'created' ],
+            'TTL(s)'  : max( 0, e[ 'expires' ] - now ),
+            'Hits'    : e[ 'hits' ],
+        } for key, e in reversed( _entries.items() ) ]
+    return pd.DataFrame( rows, columns=[ 'Dataset', 'Key', 'Size(KB)', 'Age(s)', 'TTL(s)', 'Hits' ] )
@@ -0,0 +1,201 @@
+#
+# Local exchange calendar for financial analysis
+#
+
+# -------------------------------------------------------------------------------------------------
+# Imports
+# -------------------------------------------------------------------------------------------------
+
+import datetime  as dt
+import functools
+
+from zoneinfo import ZoneInfo
+
+# -------------------------------------------------------------------------------------------------
+# Globals
+# -------------------------------------------------------------------------------------------------
+
+# all sessions are expressed in New York time
+_TZ = ZoneInfo( 'America/New_York' )
+
+# extended hours of US equities
+_PRE_OPEN   = dt.time(  4,  0 )
+_REG_OPEN   = dt.time(  9, 30 )
+_REG_CLOSE  = dt.time( 16,  0 )
+_EARLY      = dt.time( 13,  0 )
+_POST_CLOSE = dt.time( 20,  0 )
+
+# end of day marker for sessions running through midnight
+_MIDNIGHT   = dt.time.max
+
+# -------------------------------------------------------------------------------------------------
+# Holiday Functions
+# -------------------------------------------------------------------------------------------------
+
+def get_easter( year ):
+
+    # anonymous gregorian algorithm
+    a = year % 19
+    b, c = divmod( year, 100 )
+    d, e = divmod( b, 4 )
+    f = ( b + 8 ) // 25
+    g = ( b - f + 1 ) // 3
+    h = ( 19*a + b - d - g + 15 ) % 30
+    i, k = divmod( c, 4 )
+    l = ( 32 + 2*e + 2*i - h - k ) % 7
+    m = ( a + 11*h + 22*l ) // 451
+    month, day = divmod( h + l - 7*m + 114, 31 )
+    return dt.date( year, month, day+1 )
+
+def get_weekday( year, month, weekday, nth ):
+
+    # nth weekday of month (nth < 0 counts from the end)
+    if nth > 0:
+        day = dt.date( year, month, 1 )
+        day += dt.timedelta( days=( weekday - day.weekday() ) % 7 + 7*( nth-1 ) )
+    else:
+        day = dt.date( year + month // 12, month % 12 + 1, 1 ) - dt.timedelta( days=1 )
+        day -= dt.timedelta( days=( day.weekday() - weekday ) % 7 + 7*( -nth-1 ) )
+    return day
+
+def get_observed( day ):
+
+    if day.weekday() == 5: return day - dt.timedelta( days=1 )
+    if day.weekday() == 6: return day + dt.timedelta( days=1 )
+    return day
+
+@functools.lru_cache( maxsize=None )
+def get_holidays( year ):
+
+    days = [
+        get_weekday( year,  1, 0,  3 ),                     # Martin Luther King Jr. Day
+        get_weekday( year,  2, 0,  3 ),                     # Washington's Birthday
+        get_easter ( year ) - dt.timedelta( days=2 ),       # Good Friday
+        get_weekday( year,  5, 0, -1 ),                     # Memorial Day
+        get_observed( dt.date( year, 7, 4 ) ),              # Independence Day
+        get_weekday( year,  9, 0,  1 ),                     # Labor Day
+        get_weekday( year, 11, 3,  4 ),                     # Thanksgiving Day
+        get_observed( dt.date( year, 12, 25 ) ),            # Christmas Day
+    ]
+
+    # New Year's Day is not observed on the previous Friday
+    new_year = dt.date( year, 1, 1 )
+    if new_year.weekday() != 5: days.append( get_observed( new_year ) )
+
+    # Juneteenth since 2022
+    if year >= 2022: days.append( get_observed( dt.date( year, 6, 19 ) ) )
+
+    return frozenset( days )
+
+@functools.lru_cache( maxsize=None )
+def get_early_closes( year ):
+
+    days = [
+        dt.date( year, 7, 3 ),                                          # before Independence Day
+        get_weekday( year, 11, 3, 4 ) + dt.timedelta( days=1 ),         # after Thanksgiving
+        dt.date( year, 12, 24 ),                                        # Christmas Eve
+    ]
+    return frozenset( [ d for d in days if d.weekday() < 5 and d not in get_holidays( year ) ] )
+
+def is_holiday( day ):
+
+    return day.weekday() >= 5 or day in get_holidays( day.year )
+
+# -------------------------------------------------------------------------------------------------
+# Session Functions
+# -------------------------------------------------------------------------------------------------
+
+def get_exchange( ticker ):
+
+    if ticker.endswith( '=F' ): return 'CME'
+    if ticker.endswith( '=X' ): return 'FX'
+    return 'NYSE'
+
+def get_sessions( exchange, day ):
+
+    # list of ( state, start, end ) for a calendar day in New York time
+    wd = day.weekday()
+
+    if exchange == 'NYSE':
+        if is_holiday( day ): return []
+        close = _EARLY if day in get_early_closes( day.year ) else _REG_CLOSE
+        return [ ( 'PRE',     _PRE_OPEN, _REG_OPEN   ),
+                 ( 'REGULAR', _REG_OPEN, close       ),
+                 ( 'POST',    close,     _POST_CLOSE ) ]
+
+    if exchange == 'CME':
+        # globex: sunday 18:00 to friday 17:00 with daily 17:00-18:00 halt, closed on holidays
+        evening = [ ( 'REGULAR', dt.time( 18, 0 ), _MIDNIGHT ) ]
+        if wd == 5: return []
+        if wd == 6: return evening
+        if is_holiday( day ): return evening if wd < 4 else []
+        morning = [ ( 'REGULAR', dt.time( 0, 0 ), dt.time( 17, 0 ) ) ]
+        return morning if wd == 4 else morning + evening
+
+    # FX: sunday 17:00 to friday 17:00
+    if wd == 5: return []
+    if wd == 6: return [ ( 'REGULAR', dt.time( 17, 0 ), _MIDNIGHT ) ]
+    if wd == 4: return [ ( 'REGULAR', dt.time( 0, 0 ), dt.time( 17, 0 ) ) ]
+    return [ ( 'REGULAR', dt.time( 0, 0 ), _MIDNIGHT ) ]
+
+def get_now( now=None ):
+
+    if now is None: return dt.datetime.now( _TZ )
+    if now.tzinfo is None: return now.replace( tzinfo=_TZ )
+    return now.astimezone( _TZ )
+
+def to_datetime( day, time ):
+
+    # end of day marker maps to the next midnight
+    if time == _MIDNIGHT: return dt.datetime.combine( day + dt.timedelta( days=1 ), dt.time( 0, 0 ), _TZ )
+    return dt.datetime.combine( day, time, _TZ )
+
+def iter_sessions( exchange, now, days=14 ):
+
+    # regular sessions from today on, adjacent ones merged (e.g. through midnight)
+    merged = []
+    for i in range( -1, days ):
+        day = now.date() + dt.timedelta( days=i )
+        for state, start, end in get_sessions( exchange, day ):
+            if state != 'REGULAR': continue
+            start, end = to_datetime( day, start ), to_datetime( day, end )
+            if merged and merged[-1][1] == start: merged[-1][1] = end
+            else: merged.append( [ start, end ] )
+    return merged
+
+# -------------------------------------------------------------------------------------------------
+# Query Functions
+# -------------------------------------------------------------------------------------------------
+
+def get_state( ticker, now=None ):
+
+    # same values as yahoo marketState ('PRE', 'REGULAR', 'POST', 'CLOSED')
+    now = get_now( now )
+    for state, start, end in get_sessions( get_exchange( ticker ), now.date() ):
+        if to_datetime( now.date(), start ) <= now < to_datetime( now.date(), end ): return state
+    return 'CLOSED'
+
+def is_open( ticker, now=None ):
+
+    return get_state( ticker, now ) == 'REGULAR'
+
+def next_open( ticker, now=None ):
+
+    now = get_now( now )
+    for start, end in iter_sessions( get_exchange( ticker ), now ):
+        if start > now: return start
+    return None
+
+def next_close( ticker, now=None ):
+
+    now = get_now( now )
+    for start, end in iter_sessions( get_exchange( ticker ), now ):
+        if end > now: return end
+    return None
+
+def next_change( ticker, now=None ):
+
+    # next boundary of the regular session (open or close)
+    now = get_now( now )
+    times = [ t for t in [ next_open( ticker, now ), next_close( ticker, now ) ] if t is not None ]
+    return min( times ) if times else None
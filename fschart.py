@@ -6,18 +6,14 @@
 # Imports
 # -------------------------------------------------------------------------------------------------
 
-import streamlit as st
 import pandas    as pd
 import altair    as alt
-import talib     as ta
-import datetime  as dt
 import numpy     as np
-import requests
-
-from bs4 import BeautifulSoup
-from numpy import NaN
-from io import BytesIO
-from PIL import Image
+import json
+import fsind
+import fsport
+import fsdown
+import fscache
 
 # -------------------------------------------------------------------------------------------------
 # Globals
@@ -41,14 +37,34 @@ abbr_list = {
     'XLY': 'Consumer Cyclical',
 }
 
+# serialized specs share the indicator freshness (keys carry the data version)
+fscache.policies[ 'spec' ] = fscache.policies[ 'indicator' ]
+
 # -------------------------------------------------------------------------------------------------
 # Utility Functions
 # -------------------------------------------------------------------------------------------------
 
-def compute_mdd( data ):
+def get_spec( key, build ):
+
+    # finished Vega-Lite spec for key, build() returns the altair chart on a miss
+    # (keys with None, e.g. an uncached info object, are always rebuilt)
+    key = ( 'spec', ) + key + ( fsdown.target_points, )
+    if None in key: return build().to_dict()
+
+    entry = fscache.get( key, 'spec' )
+    if entry is not None: return json.loads( entry[ 'value' ] )
 
-    mdd = ( data - data.cummax() ).min()
-    return mdd
+    spec = build().to_json()
+    fscache.put( key, 'spec', spec )
+    return json.loads( spec )
+
+def get_bar_interval( num_points ):
+
+    # coarsest daily-derived bars that keep the chart within the downsampling target
+    target = fsdown.target_points
+    if target is None or num_points <= target: return '1d'
+    if num_points <= target * 5: return '1wk'
+    return '1mo'
 
 def get_display_name( _ticker, _st_info ):
 
@@ -77,6 +93,7 @@ def get_price_chart( st_info, st_hist, ticker, num_points, prev_line=False ):
             'Date': hist.index[-num_points:],
             'Price': hist[-num_points:].values
         } )
+        source = fsdown.downsample( source, 'line', 'Price' )
 
         ch = alt.Chart( source ).mark_line().encode(
             x=alt.X( 'Date:T' ),
@@ -91,6 +108,44 @@ def get_price_chart( st_info, st_hist, ticker, num_points, prev_line=False ):
 
         return ch
 
+def get_market_chart( st_info, st_hist, tickers, num_points, prev_line=False ):
+
+    # price charts of several tickers in one spec ( num_points is { ticker: points } )
+    series, titles, prevs = [], {}, {}
+    for i, ticker in enumerate( tickers ):
+        hist = st_hist[ 'close' ][ ticker ].dropna().iloc[ -num_points[ ticker ]: ]
+
+        prev_close = st_info['price'][ ticker ][ 'regularMarketPreviousClose' ]
+        cur_price  = st_info['price'][ ticker ][ 'regularMarketPrice'         ]
+        delta1 = ( cur_price - prev_close ) / prev_close * 100.
+        delta2 = ( cur_price - hist.iloc[0] ) / hist.iloc[0] * 100.
+        title  = get_display_name( ticker, st_info ) + f' ({ticker})'
+        titles[ ticker ] = f'{title}: {cur_price:.2f} (D {delta1:.2f}% / P {delta2:.2f}%)'
+        prevs [ ticker ] = prev_close
+
+        # plain field names (tickers may contain '.')
+        source = pd.DataFrame( { 'Date': hist.index, 'Price': hist.values } )
+        series.append( fsdown.downsample( source, 'line', 'Price' ).set_index( 'Date' )[ 'Price' ].rename( f'P{i}' ) )
+
+    # one wide dataset on the union of dates, each row reads its own column
+    source = pd.concat( series, axis=1 ).sort_index().rename_axis( 'Date' ).reset_index()
+    rows   = []
+    for i, ticker in enumerate( tickers ):
+        ch = alt.Chart().transform_filter( f'isValid(datum.P{i})' ).mark_line().encode(
+            x=alt.X( 'Date:T', title='' ),
+            y=alt.Y( f'P{i}:Q', title='Price', scale=alt.Scale( zero=False ) ),
+            tooltip = [ 'Date:T', alt.Tooltip( f'P{i}:Q', title='Price', format='.2f' ) ]
+        )
+
+        # previous close line
+        if prev_line:
+            ln = alt.Chart( pd.DataFrame( { 'Price': [ prevs[ ticker ] ] } ) )
+            ch = ch + ln.mark_rule( strokeWidth=2, color='#FFAA00' ).encode( y='Price' )
+
+        rows.append( ch.properties( title=titles[ ticker ] ) )
+
+    return alt.vconcat( *rows, data=source )
+
 def get_candle_chart( st_info, st_hist, ticker, num_points, prev_line=False ):
 
         hist = st_hist[ 'close' ][ ticker ]
@@ -111,6 +166,7 @@ def get_candle_chart( st_info, st_hist, ticker, num_points, prev_line=False ):
             'Open':  st_hist['open'][ticker][-num_points:].values,
             'Close': st_hist['close'][ticker][-num_points:].values
         } )
+        source = fsdown.downsample( source, 'candle' )
 
         # conditional color for bar
         open_close_color = alt.condition("datum.Open <= datum.Close",
@@ -150,213 +206,206 @@ def get_candle_chart( st_info, st_hist, ticker, num_points, prev_line=False ):
 
         return ch      
 
-def get_bband_chart( st_hist, ticker, num_points ):
-
-    bband_up, bband_mid, bband_low = ta.BBANDS( st_hist['close'][ ticker ], 20, 2 )
+def get_stock_source( st_hist, ticker, num_points, bband=False, ma_list=() ):
+
+    # one wide per-ticker frame: OHLC and every indicator used by the stock panels
+    macd, macdsignal, macdhist = fsind.get_macd( st_hist, ticker )
+    columns = {
+        'Open'    : st_hist['open'][ticker],
+        'High'    : st_hist['high'][ticker],
+        'Low'     : st_hist['low'][ticker],
+        'Close'   : st_hist['close'][ticker],
+        'RSI'     : fsind.get_rsi( st_hist, ticker ),
+        'CCI'     : fsind.get_cci( st_hist, ticker ),
+        'MACD(12)': macd,
+        'MACD(26)': macdsignal,
+        'Hist'    : macdhist,
+    }
+    if bband:
+        columns[ 'Upper' ], columns[ 'Mid' ], columns[ 'Lower' ] = fsind.get_bbands( st_hist, ticker, 20, 2 )
+    for period in ma_list:
+        columns[ f'MA{period}' ] = fsind.get_sma( st_hist, ticker, period )
+
+    source = pd.DataFrame( { key: value[-num_points:].values for key, value in columns.items() } )
+    source.insert( 0, 'Date', st_hist['close'][ticker].index[-num_points:] )
+
+    # oscillators keep their extremes around the midline (threshold crossings, histogram peaks)
+    return fsdown.downsample( source, 'candle', extremes={ 'RSI': 50, 'CCI': 0, 'MACD(12)': 0, 'MACD(26)': 0, 'Hist': 0 } )
+
+def get_stock_chart( st_info, st_hist, ticker, num_points, params, bband=False, ma_list=None ):
+
+    # candle (with overlays), RSI, CCI and MACD panels in one spec; ma_list is { period: color }
+    ma_list = ma_list or {}
+    source  = get_stock_source( st_hist, ticker, num_points, bband, list( ma_list ) )
+    last   = source.iloc[-1]
+
+    cur_price  = st_info['price'][ ticker ][ 'regularMarketPrice'         ]
+    prev_close = st_info['price'][ ticker ][ 'regularMarketPreviousClose' ]
+    perd_close = st_hist['close'][ ticker ][ -num_points ]
+    delta1 = ( cur_price - prev_close ) / prev_close * 100.
+    delta2 = ( cur_price - perd_close ) / perd_close * 100.
+    title  = get_display_name( ticker, st_info ) + f' ({ticker})'
+
+    # candle and overlays (every layer reads the shared data)
+    x     = alt.X( 'Date:T', title='' )
+    color = alt.condition( "datum.Open <= datum.Close", alt.value( "#06982d" ), alt.value( "#ae1325" ) )
+    base  = alt.Chart().encode( x=x )
+    price = [
+        base.mark_rule().encode( alt.Y( 'Low:Q', title='Price', scale=alt.Scale( zero=False ) ), alt.Y2( 'High:Q' ), color=color ),
+        base.mark_bar().encode( alt.Y( 'Open:Q' ), alt.Y2( 'Close:Q' ), color=color, tooltip=[ 'Date:T', alt.Tooltip( 'Close:Q', format='.2f' ) ] ),
+    ]
+    if bband:
+        price.insert( 0, base.mark_area( opacity=0.1, color='blue' ).encode( y='Upper:Q', y2='Lower:Q' ) )
+        price.insert( 1, base.mark_line( strokeDash=[2,3], color='black', opacity=0.5 ).encode( y='Mid:Q' ) )
+    for period, colorstr in ma_list.items():
+        price.insert( 0, base.mark_line( color=colorstr, strokeWidth=1 ).encode( y=f'MA{period}:Q' ) )
+    price = alt.layer( *price ).properties( title = f'{title}: {cur_price:.2f} (D {delta1:.2f}% / P {delta2:.2f}%)' )
+
+    # oscillator panels with guide lines
+    def _panel( field, domain, low, high ):
+        line  = base.mark_line( point=alt.OverlayMarkDef() ).encode(
+            y=alt.Y( f'{field}:Q', scale=alt.Scale( domain=domain ) ),
+            tooltip=[ 'Date:T', alt.Tooltip( f'{field}:Q', format='.2f' ) ]
+        )
+        guide = alt.Chart( pd.DataFrame( { field: [ low, high ] } ) ).mark_rule( strokeWidth=2, color='#FFAA00' ).encode( y=f'{field}:Q' )
+        return alt.layer( line, guide ).properties( title = f'{field}(14): {last[field]:.2f}', height=150 )
+
+    rsi = _panel( 'RSI', [10,90],   params['RSI_L'], params['RSI_H'] )
+    cci = _panel( 'CCI', [-200,200], params['CCI_L'], params['CCI_H'] )
+
+    macd = base.transform_fold( [ 'MACD(12)', 'MACD(26)' ], as_=[ 'Metric', 'Value' ] ).mark_line( point=alt.OverlayMarkDef() ).encode(
+        y=alt.Y( 'Value:Q', scale=alt.Scale( zero=False ) ),
+        tooltip=[ 'Metric:N', 'Date:T', alt.Tooltip( 'Value:Q', format='.2f' ) ],
+        color=alt.Color( 'Metric:N', legend=alt.Legend( orient="top-left" ) )
+    ).properties( title = 'MACD', height=150 )
+    hist = base.mark_bar().encode(
+        y=alt.Y( 'Hist:Q' ),
+        tooltip=[ 'Date:T', alt.Tooltip( 'Hist:Q', format='.2f' ) ],
+        color=alt.condition( alt.datum.Hist > 0, alt.value("green"), alt.value("red") )
+    ).properties( height=100 )
+
+    return alt.vconcat( price, rsi, cci, macd, hist, data=source ).resolve_scale( color='independent' )
+
+def get_btest_data( po_hist, be_hist, num_points, params ):
+
+    # aligned dates x assets close ( benchmarks first, then portfolio tickers )
+    bench = fsport.get_close( be_hist, params['bench'] )
+    port  = fsport.get_close( po_hist, list( params['port'] ) )
+    close = fsport.get_window( pd.concat( [ bench, port ], axis=1 ), num_points )
+    gains = fsport.get_gains( close.to_numpy() )
+
+    # benchmarks and buy-and-hold portfolio in one matrix
+    nb    = len( params['bench'] )
+    alloc = [ [ params['port'][ticker] ] for ticker in port.columns ]
+    data  = np.hstack( [ gains[ :, :nb ], fsport.get_equity( gains[ :, nb: ], alloc ) ] )
 
-    # prepare source
-    source = pd.DataFrame( {
-        'Date' : bband_up.index[-num_points:],
-        'Upper': bband_up[-num_points:].values,
-        'Mid'  : bband_mid[-num_points:].values,
-        'Lower': bband_low[-num_points:].values,
-    } )
-    
-    # generate chart
-    ch = alt.Chart( source ).mark_area( opacity=0.1, color='blue' ).encode(
-        x  = alt.X ( 'Date'  ),
-        y  = alt.Y ( 'Upper' ),
-        y2 = alt.Y2( 'Lower' ),
-    )
-    mv = alt.Chart( source ).mark_line( strokeDash=[2,3], color='black', opacity=0.5 ).encode(
-        x = alt.X( 'Date' ),
-        y = alt.Y( 'Mid'  ),
+    # get merged ticker list
+    tickers    = params['bench'] + [ 'Portfolio' ]
+    rebal_info = None
 
-    )
-    return ch + mv
+    # rebalanced portfolio with trading costs
+    if params['rebalance'] != 'None':
+        rebal, rebal_info = fsport.get_rebalanced( close.to_numpy()[ :, nb: ], close.index, [ a[0] for a in alloc ],
+                                                   params['rebalance'], params['band']/100, params['cost_bps'], params['slippage_bps'] )
+        data    = np.hstack( [ data, rebal[ :, None ] ] )
+        tickers = tickers + [ 'Rebalanced' ]
 
-def get_ma_chart( st_hist, ticker, num_points, period, colorstr ):
+    return close.index, data, tickers, rebal_info
 
-    ma = ta.SMA( st_hist['close'][ ticker ], period )
-    source = pd.DataFrame( {
-        'Metric': f'MA{period}',
-        'Date'  : ma.index[-num_points:],
-        'Price' : ma[-num_points:].values
-    } )
-    ch = alt.Chart( source ).mark_line().encode(
-        x=alt.X( 'Date' ),
-        y=alt.Y( 'Price', scale=alt.Scale( zero=False )  ),
-        color = alt.value( colorstr ),
-        strokeWidth = alt.value( 1 ),
-    )
-    return ch
+def get_btest_source( po_hist, be_hist, num_points, params ):
 
-def get_rsi_chart( st_hist, ticker, num_points, params ):
+    # statistics (first bench ticker as reference), long format only for the chart
+    dates, data, tickers, rebal_info = get_btest_data( po_hist, be_hist, num_points, params )
+    info   = fsport.get_stats( data, tickers )
+    source = fsdown.downsample( fsport.to_long( dates, data, tickers ), 'line', 'Gain', 'Metric' )
+    if rebal_info is not None: info.attrs[ 'rebalance' ] = rebal_info
 
-    rsi_hist = ta.RSI( st_hist['close'][ ticker ] )
-    source = pd.DataFrame( {
-        'Date': rsi_hist.index[-num_points:],
-        'RSI': rsi_hist[-num_points:].values
-    } )
-    ch = alt.Chart( source ).mark_line( point=alt.OverlayMarkDef() ).encode(
-        x=alt.X( 'Date' ),
-        y=alt.Y( 'RSI', scale=alt.Scale( domain=[10,90] )  ),
-        tooltip = [ 'Date', alt.Tooltip( 'RSI', format='.2f' ) ]
-    ).properties( title = f'RSI(14): {rsi_hist[-1]:.2f}' )
+    return source, info
 
-    # draw guide lines
-    ln_up = alt.Chart( pd.DataFrame( {'RSI': [params['RSI_H']] } ) )
-    up = ln_up.mark_rule( strokeWidth=2, color='#FFAA00').encode( y='RSI' )
+def get_rolling_source( po_hist, be_hist, num_points, params, period ):
 
-    ln_dn = alt.Chart( pd.DataFrame( {'RSI': [params['RSI_L']] } ) )
-    dn = ln_dn.mark_rule( strokeWidth=2, color='#FFAA00').encode( y='RSI' )
+    # rolling statistics of the backtest series ( Stat, Metric, Date, Value )
+    dates, data, tickers, rebal_info = get_btest_data( po_hist, be_hist, num_points, params )
+    stats = fsport.get_rolling_stats( data, 0, period )
 
-    return ch+up+dn
+    source = pd.concat( [ fsport.to_long( dates, stats[ key ], tickers ).assign( Stat=key ) for key in stats ] )
+    return fsdown.downsample( source.rename( columns={ 'Gain': 'Value' } ).dropna(), 'line', 'Value', [ 'Stat', 'Metric' ] )
 
-def get_cci_chart( st_hist, ticker, num_points, params ):
+def get_btest_chart( source ):
 
-    cci_hist = ta.CCI( st_hist['high'][ ticker ], st_hist['low'][ ticker ], st_hist['close'][ ticker ] )
-    source = pd.DataFrame( {
-        'Date': cci_hist.index[-num_points:],
-        'CCI': cci_hist[-num_points:].values
-    } )
-    ch = alt.Chart( source ).mark_line( point=alt.OverlayMarkDef() ).encode(
+    # benchmark chart
+    ch = alt.Chart( source ).mark_line().encode(
         x=alt.X( 'Date' ),
-        y=alt.Y( 'CCI', scale=alt.Scale( domain=[-200,200] )  ),
-        tooltip = [ 'Date', alt.Tooltip( 'CCI', format='.2f' ) ]
-    ).properties( title = f'CCI(14): {cci_hist[-1]:.2f}' )
+        y=alt.Y( 'Gain', scale=alt.Scale( zero=False )  ),
+        tooltip = [ 'Metric', 'Date', alt.Tooltip( 'Gain', format='.2f' ) ],
+        color = alt.Color( 'Metric', legend=alt.Legend( orient="top-left" ) )
+    )
 
-    # draw guide lines
-    ln_up = alt.Chart( pd.DataFrame( {'CCI': [params['CCI_H']] } ) )
-    up = ln_up.mark_rule( strokeWidth=2, color='#FFAA00').encode( y='CCI' )
+    return ch
 
-    ln_dn = alt.Chart( pd.DataFrame( {'CCI': [params['CCI_L']] } ) )
-    dn = ln_dn.mark_rule( strokeWidth=2, color='#FFAA00').encode( y='CCI' )
+def get_rolling_chart( source ):
 
-    return ch+up+dn    
+    # one row per statistic, shared date axis
+    ch = alt.Chart( source ).mark_line().encode(
+        x=alt.X( 'Date', title='' ),
+        y=alt.Y( 'Value', title='', scale=alt.Scale( zero=False ) ),
+        tooltip = [ 'Stat', 'Metric', 'Date', alt.Tooltip( 'Value', format='.2f' ) ],
+        color = alt.Color( 'Metric', legend=alt.Legend( orient="top" ) )
+    ).properties( height=120 ).facet(
+        row=alt.Row( 'Stat', title='', sort=[ 'Stdev', 'Sharpe', 'Beta', 'Drawdown', 'Rolling DD' ] )
+    ).resolve_scale( y='independent' )
 
-def get_macd_charts( st_hist, ticker, num_points ):
+    return ch
 
-    macd, macdsignal, macdhist = ta.MACD( st_hist['close'][ ticker ] )
-    source1 = pd.DataFrame( {
-        'Metric': 'MACD(12)',
-        'Date'  : macd.index[-num_points:],
-        'Value' : macd[-num_points:].values
-    } )
-    source2 = pd.DataFrame( {
-        'Metric': 'MACD(26)',
-        'Date'  : macdsignal.index[-num_points:],
-        'Value' : macdsignal[-num_points:].values
-    } )
-    source3 = pd.DataFrame( {
-        'Metric': 'MACDHIST',
-        'Date'  : macdhist.index[-num_points:],
-        'Hist'  : macdhist[-num_points:].values
-    } )
-    source = pd.concat( [ source1, source2 ] )
+def get_frontier_chart( sweep, current ):
 
-    ch1 = alt.Chart( source ).mark_line( point=alt.OverlayMarkDef() ).encode(
-        x=alt.X( 'Date' ),
-        y=alt.Y( 'Value', scale=alt.Scale( zero=False )  ),
-        tooltip = [ 'Metric', 'Date', alt.Tooltip( 'Value', format='.2f' ) ],
-        color = alt.Color( 'Metric', legend=alt.Legend( orient="top-left" ) )
-    ).properties( title = 'MACD' )
-    ch2 = alt.Chart( source3 ).mark_bar().encode(
-        x=alt.X( 'Date' ),
-        y=alt.Y( 'Hist' ),
-        tooltip = [ 'Date', alt.Tooltip( 'Hist', format='.2f' ) ],
-        color=alt.condition(
-            alt.datum.Hist > 0,
-            alt.value("green"),  # The positive color
-            alt.value("red")  # The negative color
-        )        
+    # sampled candidates colored by Sharpe
+    tooltip = [ alt.Tooltip( col, format='.2f' ) for col in [ 'Return', 'Vol', 'Sharpe', 'Stdev', 'MDD' ] ]
+    ch = alt.Chart( sweep['sample'] ).mark_circle( size=15, opacity=0.5 ).encode(
+        x=alt.X( 'Vol', title='Volatility (%)', scale=alt.Scale( zero=False ) ),
+        y=alt.Y( 'Return', title='Return (%)', scale=alt.Scale( zero=False ) ),
+        color=alt.Color( 'Sharpe', scale=alt.Scale( scheme='viridis' ) ),
+        tooltip=tooltip
     )
-    return ch1, ch2
 
-def get_btest_source( po_hist, be_hist, num_points, params ):
-
-    # get benchmark data
-    _source = []    
-    for ticker in params['bench']:
-
-        elem = be_hist[ 'close' ][ ticker ].copy()
-        elem /= elem[-num_points]
-        elem -= 1
-        elem *= 100
-
-        _temp = pd.DataFrame( {
-            'Metric': ticker,
-            'Date'  : elem.index[-num_points:],
-            'Gain' : elem[-num_points:].values
-        } )
-        _source.append( _temp )
-
-    # get portfolio data
-    total_alloc = 0
-    for index, ticker in enumerate( params['port'] ):
-        elem = po_hist[ 'close' ][ ticker ][-num_points:].copy()
-        elem /= elem[-num_points]
-        elem -= 1
-        elem *= 100 * params['port'][ticker]
-        if index == 0: port  = elem
-        else:          port += elem
-        total_alloc += params['port'][ticker]
-    port /= total_alloc
-
-    _temp = pd.DataFrame( {
-        'Metric': 'Portfolio',
-        'Date'  : port.index[-num_points:],
-        'Gain' : port[-num_points:].values
-    } )
-    _source.append( _temp )
+    # efficient frontier
+    line = alt.Chart( sweep['frontier'] ).mark_line( color='black' ).encode(
+        x='Vol',
+        y='Return',
+        tooltip=tooltip
+    )
 
-    # concat data
-    source = pd.concat( _source )
+    # current and best allocations
+    source = pd.concat( [ current, sweep['stats'] ] ).rename_axis( 'Name' ).reset_index()
+    point  = alt.Chart( source ).mark_point( size=200, filled=True, shape='diamond' ).encode(
+        x='Vol',
+        y='Return',
+        tooltip=[ 'Name' ] + tooltip,
+        color=alt.Color( 'Name', legend=alt.Legend( orient="top-left" ), scale=alt.Scale( range=[ 'red', 'orange', 'blue' ] ) )
+    )
 
-    # get merged ticker list
-    tickers = params['bench'] + [ 'Portfolio' ]
-
-    # make dataframe
-    info = pd.DataFrame( columns=[ 'Gain', 'Delta', 'Stdev', 'Best', 'Worst', 'MDD', 'Beta', 'Sharpe' ] )
-
-    # consider first bench ticker as reference
-    ref_data = source.loc[ source['Metric'] == params['bench'][0] ]['Gain']
-    ref_gain = ref_data.iloc[-1]
-
-    # for each ticker
-    for ticker in tickers:
-        
-        # get column data
-        data  = source.loc[ source['Metric'] == ticker ]['Gain']
-
-        # make row
-        entry = {}
-        entry[ 'Gain'   ] = data.iloc[-1]
-        entry[ 'Delta'  ] = entry[ 'Gain' ] - ref_gain
-        entry[ 'Stdev'  ] = data.std()
-        entry[ 'Best'   ] = data.max()
-        entry[ 'Worst'  ] = data.min()
-        entry[ 'MDD'    ] = compute_mdd( data )
-        entry[ 'Beta'   ] = ta.BETA( ref_data+100, data+100 ).iloc[-1]
-        
-        dc = (data+100).pct_change(1).dropna()
-        entry[ 'Sharpe' ] = dc.mean() / dc.std() * ( 252**0.5 )
-        
-        info.loc[ticker] = entry
-        
-    return source, info
+    return ( ch + line + point ).resolve_scale( color='independent' )
 
-def get_btest_chart( source ):
+def get_fan_chart( fan ):
 
-    # benchmark chart
-    ch = alt.Chart( source ).mark_line().encode(
-        x=alt.X( 'Date' ),
-        y=alt.Y( 'Gain', scale=alt.Scale( zero=False )  ),
-        tooltip = [ 'Metric', 'Date', alt.Tooltip( 'Gain', format='.2f' ) ],
-        color = alt.Color( 'Metric', legend=alt.Legend( orient="top-left" ) )
+    # percentile bands of simulated accumulated gain
+    outer = alt.Chart( fan ).mark_area( opacity=0.2, color='steelblue' ).encode(
+        x=alt.X( 'Day', title='Trading days' ),
+        y=alt.Y( 'P5', title='Gain (%)' ),
+        y2='P95',
+        tooltip=[ 'Day' ] + [ alt.Tooltip( col, format='.2f' ) for col in [ 'P5', 'P25', 'P50', 'P75', 'P95' ] ]
+    )
+    inner = alt.Chart( fan ).mark_area( opacity=0.4, color='steelblue' ).encode(
+        x='Day',
+        y='P25',
+        y2='P75'
+    )
+    line  = alt.Chart( fan ).mark_line( color='black' ).encode(
+        x='Day',
+        y='P50'
     )
 
-    return ch
+    return outer + inner + line
 
 def get_pattern_chart( bullish_histo, bearish_histo ):
 
@@ -384,20 +433,15 @@ def get_pattern_chart( bullish_histo, bearish_histo ):
 
     return ch
 
-def get_sector_chart( _se_info, _se_hist, num_points ):
+def get_sector_chart( _se_info, _se_hist, delta, complete=True, tickers=None ):
 
-    # prepare data
-    se_tickers = list( _se_info[ 'price' ] )
+    # prepare data (tickers: subset of a shared info / history, e.g. one ETF's holdings)
+    se_tickers = list( _se_info[ 'price' ] ) if tickers is None else list( tickers )
 
-    # check validity
-    va_tickers = []
-    for option in se_tickers:
-        if len( _se_hist['close'][option] ) < num_points: continue
-        va_tickers.append( option )
-
-    last_price = [ _se_hist['close'][option][-1]          for option in va_tickers ]
-    ref_price  = [ _se_hist['close'][option][-num_points] for option in va_tickers ]
-    data_list  = [ round( (last_price[i]-ref_price[i])/ref_price[i]*100, 2 ) for i in range( len( va_tickers ) ) ]
+    # change over delta days (unless complete is False, tickers with shorter history are dropped)
+    gains      = fsport.get_returns( _se_hist, se_tickers, [ delta ], complete=complete )[ delta ].dropna()
+    va_tickers = list( gains.index )
+    data_list  = [ round( gains[ option ], 2 ) for option in va_tickers ]
 
     # sort by change
     comb_list = list( zip( data_list, va_tickers ) )
@@ -442,48 +486,60 @@ def get_sector_chart( _se_info, _se_hist, num_points ):
 
     return ch+label
 
+def get_heatmap_chart( source ):
+
+    # sectors x holding rank, colored by change (weight and name in tooltip)
+    sectors = list( dict.fromkeys( source[ 'Sector' ] ) )
+    limit   = max( 1., float( source[ 'Change(%)' ].abs().max() ) ) if source[ 'Change(%)' ].notna().any() else 1.
+
+    base = alt.Chart( source ).encode(
+        x=alt.X( 'Sector:N', sort=sectors, title='', axis=alt.Axis( labelAngle=-45 ) ),
+        y=alt.Y( 'Rank:O', title='Holding rank' ),
+    )
+    rect = base.mark_rect().encode(
+        color=alt.Color( 'Change(%):Q', scale=alt.Scale( scheme='redyellowgreen', domain=[ -limit, limit ] ) ),
+        tooltip=[ 'Sector', 'Ticker', 'Weight(%)', 'Change(%)' ]
+    )
+    text = base.mark_text( baseline='middle', fontSize=10 ).encode(
+        text='Ticker',
+        tooltip=[ 'Sector', 'Ticker', 'Weight(%)', 'Change(%)' ]
+    )
+
+    return rect+text
+
 def get_bond_chart( bond1_info, bond2_info, num_points ):
 
-    # prepare source
-    source1 = pd.DataFrame( {
-        'Metric': bond1_info[0],
-        'Date':   bond1_info[1].index[-num_points:],
-        'Yield':  bond1_info[1]['Close'][-num_points:].values
-    } )
-    source2 = pd.DataFrame( {
-        'Metric': bond2_info[0],
-        'Date':   bond2_info[1].index[-num_points:],
-        'Yield':  bond2_info[1]['Close'][-num_points:].values
-    } )
-    source = pd.concat( [ source1, source2 ] )
+    # one wide frame on common dates ( both yields and the spread, plain field names for vega )
+    name1, name2 = bond1_info[0], bond2_info[0]
+    source = pd.concat( [ bond1_info[1]['Close'].rename( 'Bond1' ), bond2_info[1]['Close'].rename( 'Bond2' ) ], axis=1, join='inner' )
+    source[ 'Spread' ] = source[ 'Bond1' ] - source[ 'Bond2' ]
+    source = source.iloc[-num_points:].rename_axis( 'Date' ).reset_index()
 
     # chart 1
-    domain = [ bond1_info[0], bond2_info[0] ]
-    t1 = bond1_info[1]['Close'][-1]
-    t2 = bond2_info[1]['Close'][-1]
-    d1 = t1 - bond1_info[1]['Close'][-2]
-    d2 = t2 - bond2_info[1]['Close'][-2]
-    ch1 = alt.Chart( source ).mark_line().encode(
-        x=alt.X( 'Date' ),
-        y=alt.Y( 'Yield', scale=alt.Scale( zero=False )  ),
-        tooltip = [ 'Metric', 'Date', alt.Tooltip( 'Yield', format='.3f' ) ],
-        color = alt.Color( 'Metric', legend=alt.Legend( orient="top-left" ), scale=alt.Scale(domain=domain) )
-    ).properties( title = f'{bond1_info[0]}: {t1:.3f}% ({d1:.3f}%) & {bond2_info[0]}: {t2:.3f}% ({d2:.3f}%)' )
-
-    # prepare delta
-    source3 = pd.DataFrame( {
-        'Metric': f'{bond1_info[0]} - {bond2_info[0]}',
-        'Date':   bond1_info[1].index[-num_points:],
-        'Yield':  bond1_info[1]['Close'][-num_points:].values-bond2_info[1]['Close'][-num_points:].values
-    } )
+    domain = [ name1, name2 ]
+    t1 = bond1_info[1]['Close'].iloc[-1]
+    t2 = bond2_info[1]['Close'].iloc[-1]
+    d1 = t1 - bond1_info[1]['Close'].iloc[-2]
+    d2 = t2 - bond2_info[1]['Close'].iloc[-2]
+    source = fsdown.downsample( source, 'line', 'Spread' )
+    ch1 = alt.Chart( source ).transform_fold(
+        [ 'Bond1', 'Bond2' ], as_=[ 'Key', 'Yield' ]
+    ).transform_calculate(
+        Metric=f"datum.Key == 'Bond1' ? {json.dumps( name1 )} : {json.dumps( name2 )}"
+    ).mark_line().encode(
+        x=alt.X( 'Date:T' ),
+        y=alt.Y( 'Yield:Q', scale=alt.Scale( zero=False )  ),
+        tooltip = [ 'Metric:N', 'Date:T', alt.Tooltip( 'Yield:Q', format='.3f' ) ],
+        color = alt.Color( 'Metric:N', legend=alt.Legend( orient="top-left" ), scale=alt.Scale(domain=domain) )
+    ).properties( title = f'{name1}: {t1:.3f}% ({d1:.3f}%) & {name2}: {t2:.3f}% ({d2:.3f}%)' )
 
     # chart 2
     t3 = t1 - t2
     d3 = d1 - d2
-    ch2 = alt.Chart( source3 ).mark_line().encode(
-        x=alt.X( 'Date' ),
-        y=alt.Y( 'Yield', scale=alt.Scale( zero=False )  ),
-        tooltip = [ 'Metric', 'Date', alt.Tooltip( 'Yield', format='.3f' ) ],
-    ).properties( title = f'{bond1_info[0]} - {bond2_info[0]}: {t3:.3f}% ({d3:.3f}%)' )
+    ch2 = alt.Chart( source ).mark_line().encode(
+        x=alt.X( 'Date:T' ),
+        y=alt.Y( 'Spread:Q', title='Yield', scale=alt.Scale( zero=False )  ),
+        tooltip = [ 'Date:T', alt.Tooltip( 'Spread:Q', title='Yield', format='.3f' ) ],
+    ).properties( title = f'{name1} - {name2}: {t3:.3f}% ({d3:.3f}%)' )
 
-    return ch1, ch2
\ No newline at end of file
+    return ch1, ch2
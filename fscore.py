@@ -0,0 +1,263 @@
+#
+# Data functions for financial analysis
+#
+
+# -------------------------------------------------------------------------------------------------
+# Imports
+# -------------------------------------------------------------------------------------------------
+
+import pandas as pd
+import numpy as np
+import datetime as dt
+import fsstore
+import fscache
+import fsind
+import fsport
+import fsprovider
+
+# -------------------------------------------------------------------------------------------------
+# Globals
+# -------------------------------------------------------------------------------------------------
+
+# read only the local store and info snapshots (no network)
+offline = False
+
+# fetch_info sections (also kept in snapshots)
+info_keys = [ 'price', 'summary', 'fund' ]
+
+_DEFAULT_PORT    = { 'SPY':50, 'QQQ':50 }
+_DEFAULT_MARKET  = [ '^IXIC', '^GSPC', '^DJI', 'KRW=X' ]
+_DEFAULT_FUTURE  = [ 'NQ=F', 'ES=F', 'YM=F', 'KRW=X' ]
+_DEFAULT_BENCH   = [ 'SPY' ]
+_RSI_THRESHOLD_L =   30
+_RSI_THRESHOLD_H =   70
+_CCI_THRESHOLD_L = -100
+_CCI_THRESHOLD_H =  100
+_US_BOND         = [ 'U.S. 30Y', 'U.S. 10Y', 'U.S. 5Y', 'U.S. 3Y', 'U.S. 2Y', 'U.S. 1Y', 'U.S. 6M', 'U.S. 3M', 'U.S. 1M' ]
+
+sector_tickers = {
+    'XLK': 'Technology',
+    'XLC': 'Communication Services',
+    'XLY': 'Consumer Cyclical',
+    'XLF': 'Financial',
+    'XLV': 'Healthcare',
+    'XLP': 'Consumer Defensive',
+    'XLI': 'Industrials',
+    'XLRE':'Real Estate',
+    'XLE': 'Energy', 
+    'XLU': 'Utilities', 
+    'XLB': 'Materials',
+    'SPY': 'S&P 500',
+}
+fix_ticker_list = {
+    'BRK.B': 'BRK-B',
+    'LIN.L': 'LIN',
+}
+attr_list = { 
+    'regularMarketChangePercent':'Change(%)', 
+    'regularMarketPrice':'Price',
+    'trailingPE':'P/E',
+    'fiftyTwoWeekHigh':'52W_H(%)',
+    'fiftyTwoWeekLow':'52W_L(%)',
+}
+period_delta = {
+    '1M' : [  30, 0 ],
+    '3M' : [  90, 0 ],
+    '6M' : [ 180, 0 ],
+    '1Y' : [ 365, 0 ],
+    '5Y' : [ 1826, 0 ],
+    '10Y': [ 3652, 0 ],
+    'MAX': [ 36525, 0 ],
+    '6H' : [  0,  6 ],
+    '12H': [  0, 12 ],
+    '1D' : [  1,  0 ],
+    '5D' : [  5,  0 ],
+    '1W' : [  7,  0 ],    
+}
+bullish_pattern = [ 
+    'CDLHAMMER', 
+    'CDLINVERTEDHAMMER',
+    'CDLENGULFING',
+    'CDLPIERCING',
+    'CDLMORNINGSTAR',
+    'CDL3WHITESOLDIERS'
+]
+bearish_pattern = [ 
+    'CDLHANGINGMAN', 
+    'CDLSHOOTINGSTAR',
+    'CDLENGULFING',
+    'CDLEVENINGSTAR',
+    'CDL3BLACKCROWS',
+    'CDLDARKCLOUDCOVER'
+]
+default_params = {
+    'port'   : _DEFAULT_PORT,
+    'market' : _DEFAULT_MARKET,
+    'future' : _DEFAULT_FUTURE,
+    'bench'  : _DEFAULT_BENCH,
+    'RSI_L'  : _RSI_THRESHOLD_L,
+    'RSI_H'  : _RSI_THRESHOLD_H,
+    'CCI_L'  : _CCI_THRESHOLD_L,
+    'CCI_H'  : _CCI_THRESHOLD_H,
+    'market_period' : '12H',
+    'sector_period' : '1W',
+    'gain_period'   : '3M',
+    'stock_period'  : '3M',
+    'pattern_period': '3M',
+    'rebalance'     : 'None',
+    'band'          : 5,
+    'cost_bps'      : 0,
+    'slippage_bps'  : 0,
+}
+
+# -------------------------------------------------------------------------------------------------
+# Fetch Functions
+# -------------------------------------------------------------------------------------------------
+
+@fscache.memoize( 'info' )
+def fetch_info( tickers ):
+    
+    # offline: last snapshot of each ticker
+    if offline:
+        snaps = { ticker: fsstore.load_info( ticker ) or {} for ticker in tickers }
+        return { key: { ticker: snaps[ ticker ].get( key, {} ) for ticker in tickers } for key in info_keys }
+
+    # price, summary_detail and fund_holding_info sections
+    info = fsprovider.get_info( tickers )
+
+    # snapshot for offline use
+    for ticker in tickers:
+        fsstore.save_info( ticker, { key: info[ key ].get( ticker ) for key in info_keys if isinstance( info[ key ], dict ) } )
+
+    return info
+
+@fscache.memoize( lambda tickers, period, interval: 'intraday' if interval[-1] in 'mh' else 'daily' )
+def fetch_history( tickers, period, interval ):
+
+    # loader for the local store (full period or tail since start)
+    def _loader( _tickers, period=None, start=None ):
+        if offline: return {}
+        return fsprovider.get_history( _tickers, interval, period=period, start=start )
+
+    # read from local store first, then fetch missing tail only
+    _hist = fsstore.get_history( tickers, period, interval, _loader )
+    return _hist
+
+@fscache.memoize( 'bond' )
+def fetch_bond_history( bond_name ):
+
+    # offline: last stored yields
+    if offline:
+        result = fsstore.load( bond_name, 'bond' )
+        if result is None: return pd.DataFrame( columns=[ 'Open', 'High', 'Low', 'Close' ] )
+        return result.rename( columns=str.capitalize ).rename_axis( 'Date' )
+
+    to_date = dt.datetime.today()
+    fr_date = to_date - dt.timedelta( days = 365 )
+
+    result = fsprovider.get_bond_history( bond_name, fr_date, to_date )
+    fsstore.save( bond_name, 'bond', result.rename( columns=str.lower ), '1y' )
+
+    return result
+
+@fscache.memoize( 'table' )
+def fill_table( _st_info, _st_hist, _port ):
+
+    # from Ticker.price
+    df1 = pd.DataFrame( _st_info['price'] )
+    rm_index = [ x for x in df1.index if x not in attr_list ]
+    df1.drop( rm_index, inplace=True )
+
+    # from Ticker.summary_detail
+    df2 = pd.DataFrame( _st_info['summary'] )
+    rm_index = [ x for x in df2.index if x not in attr_list ]
+    df2.drop( rm_index, inplace=True )
+
+    # concat
+    df = pd.concat( [ df1, df2 ] ).apply( pd.to_numeric, errors='coerce' )
+    tickers = list( df.columns )
+
+    # compute RSI & CCI for all tickers in one pass
+    close = fsind.get_matrix( _st_hist, tickers, 'close' )
+    high  = fsind.get_matrix( _st_hist, tickers, 'high'  )
+    low   = fsind.get_matrix( _st_hist, tickers, 'low'   )
+    rsi_list = fsind.batch_rsi( close )[ :, -1 ]
+    cci_list = fsind.batch_cci( high, low, close )[ :, -1 ]
+
+    # rename column (missing fields become empty rows)
+    df.rename( index = attr_list, inplace=True )
+    for val in attr_list.values():
+        if val not in df.index: df.loc[ val ] = np.nan
+
+    # compute 52W_H & 52W_L
+    price = df.loc[ 'Price' ]
+    df.loc[ '52W_L(%)' ] = ( price - df.loc[ '52W_L(%)' ] ) / df.loc[ '52W_L(%)' ]
+    df.loc[ '52W_H(%)' ] = ( price - df.loc[ '52W_H(%)' ] ) / df.loc[ '52W_H(%)' ]
+
+    # compute percentage
+    pct_rows = [ key for key in df.index if '(%)' in key ]
+    df.loc[ pct_rows ] *= 100
+
+    # replace ETF P/E
+    etf_list = [ key for key in tickers if _st_info[ 'price' ][ key ][ 'quoteType' ] == 'ETF' ]
+    pe_list  = [ _st_info[ 'fund' ].get( key, {} ) for key in etf_list ]
+    pe_list  = [ elem.get( 'equityHoldings', {} ).get( 'priceToEarnings', np.nan ) if isinstance( elem, dict ) else np.nan for elem in pe_list ]
+    df.loc[ 'P/E', etf_list ] = pd.to_numeric( pd.Series( pe_list, index=etf_list, dtype=object ), errors='coerce' )
+
+    # add rows
+    df.loc[ 'RSI(14)' ] = rsi_list
+    df.loc[ 'CCI(14)' ] = cci_list
+    df.loc[ 'Alloc'   ] = [ _port[ key ] for key in tickers ]
+
+    return df.transpose()
+
+@fscache.memoize( 'state' )
+def fetch_market_state( ticker ):
+
+    return fsprovider.get_market_state( ticker )
+
+# -------------------------------------------------------------------------------------------------
+# Utility Functions
+# -------------------------------------------------------------------------------------------------
+
+def get_num_points( index, delta ):
+
+    last = index[-1]
+    d    = dt.timedelta( days  = delta[0] )
+    h    = dt.timedelta( hours = delta[1] )
+    num_points = len( index [ index >= ( last - d - h ) ] )
+
+    # at least 2
+    return max( 2, num_points )
+
+def get_fetch_period( period ):
+
+    # daily history period to fetch for a view period (long views read the local store)
+    return { '5Y': '5y', '10Y': '10y', 'MAX': 'max' }.get( period, '1y' )
+
+def fix_ticker( ticker ):
+
+    if ticker in fix_ticker_list: return fix_ticker_list[ ticker ]
+    return ticker
+
+def get_subset( st_info, tickers ):
+
+    # info restricted to tickers (same layout as fetch_info)
+    return { key: { t: value[ t ] for t in tickers if t in value } if isinstance( value, dict ) else value for key, value in st_info.items() }
+
+def get_port_gains( st_info, st_hist, port ):
+
+    # get latest value and previous close
+    port_k     = list( port )
+    last_price = { option: st_info['price'][option]['regularMarketPrice'] for option in port_k }
+    prev_price = { option: st_info['price'][option]['regularMarketPreviousClose'] for option in port_k }
+
+    # returns for all tickers and horizons at once (offsets are shared per data version)
+    time_delta = [ 7, 30, 90, 180, 365 ]
+    returns = fsport.get_returns( st_hist, port_k, time_delta, last_price )
+
+    # 1D uses previous close
+    returns.insert( 0, 1, [ ( last_price[option]-prev_price[option] )/prev_price[option]*100. for option in port_k ] )
+
+    # final gain (1D, 1W, 1M, 3M, 6M, 1Y)
+    return list( fsport.get_port_gains( returns, port ) )
@@ -0,0 +1,104 @@
+#
+# Chart downsampling for financial analysis
+#
+
+# -------------------------------------------------------------------------------------------------
+# Imports
+# -------------------------------------------------------------------------------------------------
+
+import pandas    as pd
+import numpy     as np
+
+# -------------------------------------------------------------------------------------------------
+# Globals
+# -------------------------------------------------------------------------------------------------
+
+# points per chart series (about one per horizontal pixel), None disables downsampling
+target_points = 600
+
+# -------------------------------------------------------------------------------------------------
+# Row Selection Functions ( values -> sorted row positions )
+# -------------------------------------------------------------------------------------------------
+
+def lttb_rows( y, target ):
+
+    # largest-triangle-three-buckets on row positions (first and last rows kept)
+    n = len( y )
+    if n <= target or target < 3: return np.arange( n )
+
+    edges = np.linspace( 1, n-1, target-1 ).astype( int )
+    rows  = [ 0 ]
+    for i in range( target-2 ):
+        lo, hi = edges[i], edges[i+1]
+
+        # average of the next bucket (last row for the final bucket)
+        if i+2 < len( edges ): nx, ny = ( edges[i+1] + edges[i+2] - 1 ) / 2, y[ edges[i+1]:edges[i+2] ].mean()
+        else:                  nx, ny = n-1, y[-1]
+
+        # row forming the largest triangle with the previous pick and the next average
+        px, py = rows[-1], y[ rows[-1] ]
+        x      = np.arange( lo, hi )
+        area   = np.abs( ( px - nx ) * ( y[ lo:hi ] - py ) - ( px - x ) * ( ny - py ) )
+        rows.append( lo + int( np.argmax( area ) ) )
+
+    rows.append( n-1 )
+    return np.array( rows )
+
+def minmax_rows( y, target ):
+
+    # minimum and maximum of each bucket (keeps spikes of bar charts)
+    n = len( y )
+    if n <= target or target < 2: return np.arange( n )
+
+    size = -( -n // ( target // 2 ) )
+    pad  = np.concatenate( [ y, np.full( -n % size, np.nan ) ] ).reshape( -1, size )
+    base = np.arange( len( pad ) ) * size
+    rows = np.concatenate( [ base + np.nanargmin( pad, axis=1 ), base + np.nanargmax( pad, axis=1 ) ] )
+    return np.unique( rows )
+
+# row selection per chart kind (add entries to plug in other methods)
+methods = {
+    'line': lttb_rows,
+    'bar' : minmax_rows,
+}
+
+# -------------------------------------------------------------------------------------------------
+# Downsampling Functions
+# -------------------------------------------------------------------------------------------------
+
+def extreme_rows( y, bucket, mid ):
+
+    # row of each bucket farthest from mid (keeps threshold crossings and histogram peaks)
+    dist  = np.nan_to_num( np.abs( y - mid ), nan=-1. )
+    order = np.lexsort( ( -dist, bucket ) )
+    first = np.r_[ True, bucket[ order ][1:] != bucket[ order ][:-1] ]
+    return order[ first ]
+
+def ohlc_buckets( source, target, extremes=None ):
+
+    # candles merged into at most target buckets ( Date/Open first, High max, Low min, Close last )
+    # ( extremes: { column: midline } keep the value farthest from the midline, other columns the last )
+    bucket = np.arange( len( source.index ) ) * target // len( source.index )
+    agg    = { 'Date': 'first', 'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last' }
+    agg    = { **{ col: 'last' for col in source.columns }, **agg }
+    out    = source.groupby( bucket ).agg( agg )[ list( source.columns ) ]
+
+    for col, mid in ( extremes or {} ).items():
+        y = source[ col ].to_numpy( dtype='float64' )
+        out[ col ] = y[ extreme_rows( y, bucket, mid ) ]
+    return out
+
+def downsample( source, kind, y=None, by=None, target=None, extremes=None ):
+
+    # reduce a chart source before the chart is built; kind is 'candle' or a key of methods
+    # ( y: column driving row selection, by: column of independent series, extremes: see ohlc_buckets )
+    target = target or target_points
+    if target is None: return source
+    if by is not None:
+        return pd.concat( [ downsample( group, kind, y, None, target, extremes ) for _, group in source.groupby( by, sort=False ) ] )
+
+    if len( source.index ) <= target: return source
+    if kind == 'candle': return ohlc_buckets( source, target, extremes )
+
+    source = source[ source[ y ].notna() ]
+    return source.iloc[ methods[ kind ]( source[ y ].to_numpy( dtype='float64' ), target ) ]
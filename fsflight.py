@@ -0,0 +1,144 @@
+#
+# Single-flight fetch coalescing for financial analysis
+#
+
+# -------------------------------------------------------------------------------------------------
+# Imports
+# -------------------------------------------------------------------------------------------------
+
+import pandas    as pd
+import threading
+import time
+
+from concurrent.futures import Future
+
+# -------------------------------------------------------------------------------------------------
+# Globals
+# -------------------------------------------------------------------------------------------------
+
+# seconds a new batch waits for other callers before going upstream (0 disables batching)
+window = 0.05
+
+# in-flight fetch per ( dataset, group, ticker ), tickers waiting per ( dataset, group )
+# ( group holds the other call arguments, e.g. interval and period of a history )
+_flights = {}
+_batches = {}
+_stats   = {}
+_lock    = threading.Lock()
+
+# -------------------------------------------------------------------------------------------------
+# Split / Join Functions ( one answer per ticker and back )
+# -------------------------------------------------------------------------------------------------
+
+def split_info( info, tickers ):
+
+    # { section: { ticker: value } } -> { ticker: { section: value or None } }
+    return { t: { key: value.get( t ) for key, value in info.items() if isinstance( value, dict ) } for t in tickers }
+
+def join_info( parts ):
+
+    # sections are kept even when empty
+    sections = dict.fromkeys( [ key for part in parts.values() for key in part ] )
+    return { key: { t: part[ key ] for t, part in parts.items() if part.get( key ) is not None } for key in sections }
+
+def split_history( hist, tickers ):
+
+    # yahooquery history ( symbol, date ) -> { ticker: ( symbol, date ) rows or error }
+    # ( with some tickers failing, yahooquery answers { ticker: date rows or error } instead )
+    if isinstance( hist, dict ):
+        parts = { t: hist.get( t, 'No data found' ) for t in tickers }
+        return { t: pd.concat( { t: part }, names=[ 'symbol', 'date' ] ) if isinstance( part, pd.DataFrame ) and part.index.nlevels == 1 else part
+                 for t, part in parts.items() }
+    if not isinstance( hist, pd.DataFrame ) or len( hist.index ) == 0: return { t: 'No data found' for t in tickers }
+    symbols = set( hist.index.get_level_values( 0 ) )
+    return { t: hist.loc[ [ t ] ] if t in symbols else 'No data found' for t in tickers }
+
+def join_history( parts ):
+
+    # errors are kept as a dict when nothing was found (same as yahooquery)
+    frames = [ part for part in parts.values() if isinstance( part, pd.DataFrame ) ]
+    if frames == []: return dict( parts )
+    return pd.concat( frames ).rename_axis( [ 'symbol', 'date' ] )
+
+# split / join per dataset
+datasets = {
+    'info'   : [ split_info,    join_info    ],
+    'history': [ split_history, join_history ],
+}
+
+# -------------------------------------------------------------------------------------------------
+# Flight Functions
+# -------------------------------------------------------------------------------------------------
+
+def count( dataset, field, value=1 ):
+
+    if dataset not in _stats: _stats[ dataset ] = { 'Calls': 0, 'Tickers': 0, 'Shared': 0, 'Upstream': 0, 'Batched': 0 }
+    _stats[ dataset ][ field ] += value
+
+def run_batch( dataset, group, call ):
+
+    # leader of a batch: wait for other callers, then one upstream call for all waiting tickers
+    if window > 0: time.sleep( window )
+    with _lock:
+        tickers = _batches.pop( ( dataset, group ) )
+        count( dataset, 'Upstream' )
+        count( dataset, 'Batched', len( tickers ) )
+
+    split, _ = datasets[ dataset ]
+    try:
+        parts  = split( call( tickers ), tickers )
+        errors = None
+    except Exception as e:
+        parts, errors = {}, e
+
+    # settle every future of the batch, then let new fetches start
+    with _lock:
+        for t in tickers:
+            future = _flights.pop( ( dataset, group, t ) )
+            if errors is not None: future.set_exception( errors )
+            else: future.set_result( parts.get( t ) )
+
+def fetch( dataset, tickers, call, group=() ):
+
+    # call( tickers ) goes upstream once for all concurrent callers asking for the same tickers;
+    # callers with overlapping lists (same group) are merged into one batch
+    tickers = list( dict.fromkeys( tickers ) )
+    futures, leader = {}, False
+    with _lock:
+        count( dataset, 'Calls' )
+        count( dataset, 'Tickers', len( tickers ) )
+        for t in tickers:
+            key = ( dataset, group, t )
+            if key in _flights:
+                count( dataset, 'Shared' )
+            else:
+                _flights[ key ] = Future()
+                if ( dataset, group ) not in _batches:
+                    _batches[ ( dataset, group ) ] = []
+                    leader = True
+                _batches[ ( dataset, group ) ].append( t )
+            futures[ t ] = _flights[ key ]
+
+    if leader: run_batch( dataset, group, call )
+
+    _, join = datasets[ dataset ]
+    return join( { t: future.result() for t, future in futures.items() } )
+
+# -------------------------------------------------------------------------------------------------
+# Introspection Functions
+# -------------------------------------------------------------------------------------------------
+
+def get_pending():
+
+    # tickers currently in flight
+    with _lock:
+        return len( _flights )
+
+def get_stats():
+
+    # requested tickers vs tickers that went upstream
+    with _lock:
+        info = pd.DataFrame( columns=[ 'Calls', 'Tickers', 'Shared', 'Upstream', 'Batched', 'Dedup(%)' ] )
+        for name, stat in sorted( _stats.items() ):
+            info.loc[ name ] = { **stat, 'Dedup(%)': ( 1 - stat[ 'Batched' ] / stat[ 'Tickers' ] ) * 100 if stat[ 'Tickers' ] > 0 else 0 }
+    return info
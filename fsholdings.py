@@ -0,0 +1,87 @@
+#
+# Sector holdings for financial analysis
+#
+
+# -------------------------------------------------------------------------------------------------
+# Imports
+# -------------------------------------------------------------------------------------------------
+
+import pandas    as pd
+import numpy     as np
+import fscache
+import fscore
+import fsport
+import fsscreen
+import fsstore
+
+# -------------------------------------------------------------------------------------------------
+# Universe Functions
+# -------------------------------------------------------------------------------------------------
+
+def get_holdings( sector_info ):
+
+    # { ETF: { ticker: weight (%) } } in holdings order, from fund_holding_info of the sector ETFs
+    holdings = {}
+    for etf in sector_info[ 'fund' ]:
+        fund = sector_info[ 'fund' ][ etf ]
+        if not isinstance( fund, dict ): continue
+        holdings[ etf ] = { fscore.fix_ticker( elem[ 'symbol' ] ): pd.to_numeric( elem.get( 'holdingPercent' ), errors='coerce' ) * 100
+                            for elem in fund.get( 'holdings', [] ) }
+    return holdings
+
+def get_universe( holdings ):
+
+    # each symbol once, whichever ETFs hold it (sorted, so cache keys are stable)
+    return fsscreen.get_universe( *[ list( weights ) for weights in holdings.values() ] )
+
+# -------------------------------------------------------------------------------------------------
+# Fetch Functions ( one cache entry for the whole universe )
+# -------------------------------------------------------------------------------------------------
+
+# one upstream call per dataset (yahooquery bounds its own per-ticker requests), coalesced with
+# concurrent page fetches by fsflight
+
+@fscache.memoize( 'info' )
+def fetch_holdings_info( tickers ):
+
+    # uncached fetch (offline snapshots), every section kept
+    info = fscore.fetch_info.__wrapped__( list( tickers ) )
+    return { key: info[ key ] if isinstance( info.get( key ), dict ) else {} for key in fscore.info_keys }
+
+@fscache.memoize( 'daily' )
+def fetch_holdings_history( tickers, period ):
+
+    # read through the local store
+    hist = fscore.fetch_history.__wrapped__( list( tickers ), period, '1d' )
+    if not isinstance( hist, pd.DataFrame ): return pd.DataFrame( columns=fsstore.store_cols )
+    return hist
+
+# -------------------------------------------------------------------------------------------------
+# View Functions
+# -------------------------------------------------------------------------------------------------
+
+def get_available( ho_info, ho_hist, tickers ):
+
+    # tickers with both a quote and a history
+    symbols = set( ho_hist.index.unique( level=0 ) ) if len( ho_hist.index ) > 0 else set()
+    return [ t for t in tickers if t in symbols and isinstance( ho_info[ 'price' ].get( t ), dict ) and ho_info[ 'price' ][ t ] != {} ]
+
+def get_heatmap_source( holdings, ho_info, ho_hist, delta, complete=True ):
+
+    # one row per ( ETF, holding ), ranked by weight; returns of the whole universe in one pass
+    tickers = get_available( ho_info, ho_hist, get_universe( holdings ) )
+    gains   = fsport.get_returns( ho_hist, tickers, [ delta ], complete=complete )[ delta ] if tickers else pd.Series( dtype='float64' )
+
+    rows = []
+    for etf, weights in holdings.items():
+        ranked = sorted( weights.items(), key=lambda item: -item[1] if item[1] == item[1] else 0 )
+        for rank, ( ticker, weight ) in enumerate( ranked ):
+            rows.append( {
+                'ETF'      : etf,
+                'Sector'   : fscore.sector_tickers.get( etf, etf ),
+                'Rank'     : rank + 1,
+                'Ticker'   : ticker,
+                'Weight(%)': round( weight, 2 ),
+                'Change(%)': round( gains.get( ticker, np.nan ), 2 ),
+            } )
+    return pd.DataFrame( rows, columns=[ 'ETF', 'Sector', 'Rank', 'Ticker', 'Weight(%)', 'Change(%)' ] )
@@ -0,0 +1,155 @@
+#
+# Shared indicator engine for financial analysis
+#
+
+# -------------------------------------------------------------------------------------------------
+# Imports
+# -------------------------------------------------------------------------------------------------
+
+import pandas    as pd
+import numpy     as np
+import talib     as ta
+import fscache
+
+# -------------------------------------------------------------------------------------------------
+# Globals
+# -------------------------------------------------------------------------------------------------
+
+# input fields of each TA-Lib indicator
+indicator_fields = {
+    'RSI'   : [ 'close' ],
+    'CCI'   : [ 'high', 'low', 'close' ],
+    'MACD'  : [ 'close' ],
+    'BBANDS': [ 'close' ],
+    'SMA'   : [ 'close' ],
+    'EMA'   : [ 'close' ],
+}
+
+# memoized series live in the shared cache under this dataset
+fscache.policies[ 'indicator' ] = fscache.policies[ 'table' ]
+
+# -------------------------------------------------------------------------------------------------
+# Utility Functions
+# -------------------------------------------------------------------------------------------------
+
+def get_version( st_hist, ticker=None ):
+
+    # histories returned by cached fetches carry their entry version (includes interval)
+    token = fscache.get_token( st_hist )
+    if token is not None: return token
+
+    # otherwise fingerprint the ticker's series (or the whole frame)
+    close = st_hist[ 'close' ] if ticker is None else st_hist[ 'close' ][ ticker ]
+    return ( len( close ), str( close.index[-1] ), float( close.iloc[-1] ) )
+
+def compute( st_hist, ticker, name, *args ):
+
+    # full-length series, keyed by ( ticker, data version, indicator, parameters )
+    key   = ( 'indicator', ticker, get_version( st_hist, ticker ), name ) + args
+    entry = fscache.get( key, 'indicator' )
+    if entry is not None: return entry[ 'value' ]
+
+    inputs = [ st_hist[ field ][ ticker ] for field in indicator_fields[ name ] ]
+    value  = getattr( ta, name )( *inputs, *args )
+    fscache.put( key, 'indicator', value )
+    return value
+
+# -------------------------------------------------------------------------------------------------
+# Indicator Functions
+# -------------------------------------------------------------------------------------------------
+
+def get_rsi( st_hist, ticker, period=14 ):
+
+    return compute( st_hist, ticker, 'RSI', period )
+
+def get_cci( st_hist, ticker, period=14 ):
+
+    return compute( st_hist, ticker, 'CCI', period )
+
+def get_macd( st_hist, ticker, fast=12, slow=26, signal=9 ):
+
+    # ( macd, signal, histogram )
+    return compute( st_hist, ticker, 'MACD', fast, slow, signal )
+
+def get_bbands( st_hist, ticker, period=20, nbdev=2 ):
+
+    # ( upper, middle, lower )
+    return compute( st_hist, ticker, 'BBANDS', period, nbdev, nbdev )
+
+def get_sma( st_hist, ticker, period ):
+
+    return compute( st_hist, ticker, 'SMA', period )
+
+# -------------------------------------------------------------------------------------------------
+# Batch Functions (tickers x bars)
+# -------------------------------------------------------------------------------------------------
+
+def get_matrix( st_hist, tickers, field ):
+
+    # each ticker's valid bars, right-aligned on the latest bar and NaN-padded in front
+    series = st_hist[ field ]
+    series = series[ series.index.get_level_values( 0 ).isin( tickers ) & series.notna() ]
+    rows   = pd.Index( tickers ).get_indexer( series.index.get_level_values( 0 ) )
+    values = series.to_numpy( dtype='float64' )
+
+    # position of each bar from the end of its ticker
+    order  = np.argsort( rows, kind='stable' )
+    rows, values = rows[ order ], values[ order ]
+    counts = np.bincount( rows, minlength=len( tickers ) )
+    starts = np.cumsum( counts ) - counts
+    width  = max( 1, counts.max( initial=0 ) )
+    cols   = np.arange( len( rows ) ) - starts[ rows ] + ( width - counts[ rows ] )
+
+    matrix = np.full( ( len( tickers ), width ), np.nan )
+    matrix[ rows, cols ] = values
+    return matrix
+
+def batch_rsi( close, period=14 ):
+
+    # Wilder smoothing seeded with the simple average of the first period changes (as TA-Lib)
+    out   = np.full( close.shape, np.nan )
+    gain  = np.zeros( len( close ) )
+    loss  = np.zeros( len( close ) )
+    count = np.zeros( len( close ), dtype=int )
+
+    diff  = np.diff( close, axis=1 )
+    for j in range( diff.shape[1] ):
+        d     = diff[ :, j ]
+        valid = ~np.isnan( d )
+        count += valid
+        g = np.where( d > 0, d, 0. )
+        l = np.where( d < 0, -d, 0. )
+
+        # accumulate seed, then smooth
+        seed = valid & ( count <= period )
+        gain[ seed ] += g[ seed ]
+        loss[ seed ] += l[ seed ]
+        first = valid & ( count == period )
+        gain[ first ] /= period
+        loss[ first ] /= period
+        rest = valid & ( count > period )
+        gain[ rest ] = ( gain[ rest ] * ( period-1 ) + g[ rest ] ) / period
+        loss[ rest ] = ( loss[ rest ] * ( period-1 ) + l[ rest ] ) / period
+
+        ready = valid & ( count >= period )
+        total = gain + loss
+        out[ ready, j+1 ] = np.where( total[ ready ] > 0, 100 * gain[ ready ] / np.where( total[ ready ] > 0, total[ ready ], 1 ), 0 )
+
+    return out
+
+def batch_cci( high, low, close, period=14 ):
+
+    out = np.full( close.shape, np.nan )
+    if close.shape[1] < period: return out
+
+    # mean deviation of typical price around each window's average
+    tp   = ( high + low + close ) / 3
+    win  = np.lib.stride_tricks.sliding_window_view( tp, period, axis=1 )
+    avg  = win.mean( axis=2 )
+    dev  = np.abs( win - avg[ :, :, None ] ).mean( axis=2 )
+    last = tp[ :, period-1: ]
+
+    with np.errstate( invalid='ignore', divide='ignore' ):
+        out[ :, period-1: ] = np.where( dev > 0, ( last - avg ) / ( 0.015 * dev ), 0 )
+    out[ :, period-1: ][ np.isnan( avg ) ] = np.nan
+    return out
@@ -0,0 +1,188 @@
+#
+# Streaming indicators for financial analysis
+#
+
+# -------------------------------------------------------------------------------------------------
+# Imports
+# -------------------------------------------------------------------------------------------------
+
+import copy
+import threading
+
+from collections import deque
+from math import nan, sqrt
+
+# -------------------------------------------------------------------------------------------------
+# Globals
+# -------------------------------------------------------------------------------------------------
+
+# per ( ticker, interval ) state that survives reruns
+books      = {}
+books_lock = threading.Lock()
+
+# -------------------------------------------------------------------------------------------------
+# Indicator States (each update is O(1) in history length, results match TA-Lib)
+# -------------------------------------------------------------------------------------------------
+
+def new_sma( period ):
+
+    return { 'period': period, 'window': deque(), 'sum': 0. }
+
+def update_sma( s, x ):
+
+    s[ 'window' ].append( x )
+    s[ 'sum' ] += x
+    if len( s[ 'window' ] ) > s[ 'period' ]: s[ 'sum' ] -= s[ 'window' ].popleft()
+    if len( s[ 'window' ] ) < s[ 'period' ]: return nan
+    return s[ 'sum' ] / s[ 'period' ]
+
+def new_ema( period ):
+
+    return { 'period': period, 'k': 2. / ( period+1 ), 'count': 0, 'value': 0. }
+
+def update_ema( s, x ):
+
+    # seeded with the simple average of the first period values
+    s[ 'count' ] += 1
+    if s[ 'count' ] < s[ 'period' ]:
+        s[ 'value' ] += x
+        return nan
+    if s[ 'count' ] == s[ 'period' ]:
+        s[ 'value' ] = ( s[ 'value' ] + x ) / s[ 'period' ]
+    else:
+        s[ 'value' ] = ( x - s[ 'value' ] ) * s[ 'k' ] + s[ 'value' ]
+    return s[ 'value' ]
+
+def new_rsi( period=14 ):
+
+    return { 'period': period, 'prev': None, 'count': 0, 'gain': 0., 'loss': 0. }
+
+def update_rsi( s, x ):
+
+    prev, s[ 'prev' ] = s[ 'prev' ], x
+    if prev is None: return nan
+
+    # Wilder smoothing seeded with the average of the first period changes
+    p = s[ 'period' ]
+    g, l = max( x-prev, 0. ), max( prev-x, 0. )
+    s[ 'count' ] += 1
+    if s[ 'count' ] <= p:
+        s[ 'gain' ] += g
+        s[ 'loss' ] += l
+        if s[ 'count' ] < p: return nan
+        s[ 'gain' ] /= p
+        s[ 'loss' ] /= p
+    else:
+        s[ 'gain' ] = ( s[ 'gain' ] * ( p-1 ) + g ) / p
+        s[ 'loss' ] = ( s[ 'loss' ] * ( p-1 ) + l ) / p
+
+    total = s[ 'gain' ] + s[ 'loss' ]
+    return 100 * s[ 'gain' ] / total if total > 0 else 0.
+
+def new_macd( fast=12, slow=26, signal=9 ):
+
+    return { 'fast': new_ema( fast ), 'slow': new_ema( slow ), 'signal': new_ema( signal ), 'seed': [] }
+
+def update_macd( s, x ):
+
+    # TA-Lib seeds both averages at the slow period (fast one over its last values)
+    if s[ 'seed' ] is not None:
+        s[ 'seed' ].append( x )
+        if len( s[ 'seed' ] ) < s[ 'slow' ][ 'period' ]: return nan, nan, nan
+        for v in s[ 'seed' ]: slow = update_ema( s[ 'slow' ], v )
+        for v in s[ 'seed' ][ -s[ 'fast' ][ 'period' ]: ]: fast = update_ema( s[ 'fast' ], v )
+        s[ 'seed' ] = None
+    else:
+        slow = update_ema( s[ 'slow' ], x )
+        fast = update_ema( s[ 'fast' ], x )
+
+    macd   = fast - slow
+    signal = update_ema( s[ 'signal' ], macd )
+    if signal != signal: return nan, nan, nan
+    return macd, signal, macd - signal
+
+def new_cci( period=14 ):
+
+    return { 'period': period, 'window': deque( maxlen=period ) }
+
+def update_cci( s, high, low, close ):
+
+    # mean deviation needs the window itself, O(period) per bar
+    s[ 'window' ].append( ( high + low + close ) / 3 )
+    if len( s[ 'window' ] ) < s[ 'period' ]: return nan
+    avg = sum( s[ 'window' ] ) / s[ 'period' ]
+    dev = sum( [ abs( v-avg ) for v in s[ 'window' ] ] ) / s[ 'period' ]
+    return ( s[ 'window' ][-1] - avg ) / ( 0.015 * dev ) if dev > 0 else 0.
+
+def new_bbands( period=20, nbdev=2 ):
+
+    return { 'period': period, 'nbdev': nbdev, 'window': deque(), 'sum': 0., 'sumsq': 0. }
+
+def update_bbands( s, x ):
+
+    # running sums of values and squares (population deviation, as TA-Lib)
+    s[ 'window' ].append( x )
+    s[ 'sum' ] += x
+    s[ 'sumsq' ] += x*x
+    if len( s[ 'window' ] ) > s[ 'period' ]:
+        old = s[ 'window' ].popleft()
+        s[ 'sum' ] -= old
+        s[ 'sumsq' ] -= old*old
+    if len( s[ 'window' ] ) < s[ 'period' ]: return nan, nan, nan
+
+    mid = s[ 'sum' ] / s[ 'period' ]
+    var = s[ 'sumsq' ] / s[ 'period' ] - mid*mid
+    dev = s[ 'nbdev' ] * sqrt( var ) if var > 0 else 0.
+    return mid + dev, mid, mid - dev
+
+# -------------------------------------------------------------------------------------------------
+# Book Functions (all indicators of one ticker)
+# -------------------------------------------------------------------------------------------------
+
+def new_book():
+
+    return {
+        'last'  : None,
+        'sma20' : new_sma( 20 ),
+        'ema20' : new_ema( 20 ),
+        'rsi'   : new_rsi(),
+        'macd'  : new_macd(),
+        'cci'   : new_cci(),
+        'bbands': new_bbands(),
+        'value' : {},
+    }
+
+def update_book( book, date, open_, high, low, close ):
+
+    book[ 'last' ] = date
+    book[ 'value' ] = {
+        'SMA(20)'  : update_sma   ( book[ 'sma20'  ], close ),
+        'EMA(20)'  : update_ema   ( book[ 'ema20'  ], close ),
+        'RSI(14)'  : update_rsi   ( book[ 'rsi'    ], close ),
+        'MACD'     : update_macd  ( book[ 'macd'   ], close ),
+        'CCI(14)'  : update_cci   ( book[ 'cci'    ], high, low, close ),
+        'BBANDS'   : update_bbands( book[ 'bbands' ], close ),
+    }
+    return book[ 'value' ]
+
+def feed( st_hist, ticker, interval ):
+
+    # apply only bars newer than the last completed one; the live (last) bar is peeked on a copy
+    hist = st_hist.xs( ticker, level=0 )[ [ 'open', 'high', 'low', 'close' ] ].dropna()
+    if len( hist.index ) == 0: return {}
+
+    with books_lock:
+        key  = ( ticker, interval )
+        book = books.get( key )
+
+        # restart when the stored state does not connect to this history
+        if book is None or book[ 'last' ] is None or book[ 'last' ] < hist.index[0] or book[ 'last' ] > hist.index[-1]:
+            book = books[ key ] = new_book()
+
+        done = hist.iloc[ :-1 ]
+        if book[ 'last' ] is not None: done = done[ done.index > book[ 'last' ] ]
+        for date, row in zip( done.index, done.itertuples( index=False ) ):
+            update_book( book, date, row.open, row.high, row.low, row.close )
+
+        live = hist.iloc[-1]
+        return update_book( copy.deepcopy( book ), hist.index[-1], live['open'], live['high'], live['low'], live['close'] )
@@ -0,0 +1,146 @@
+#
+# Allocation sweep for financial analysis
+#
+
+# -------------------------------------------------------------------------------------------------
+# Imports
+# -------------------------------------------------------------------------------------------------
+
+import pandas    as pd
+import numpy     as np
+import os
+import fsport
+
+from concurrent.futures import ProcessPoolExecutor
+
+# -------------------------------------------------------------------------------------------------
+# Globals
+# -------------------------------------------------------------------------------------------------
+
+# statistics of each candidate ( annualized Return / Vol from mean & covariance, others as backtest )
+stat_cols = [ 'Return', 'Vol', 'Sharpe', 'Gain', 'Stdev', 'MDD' ]
+
+# frontier resolution (annualized vol bins, %)
+_VOL_BIN = 0.25
+_VOL_MAX = 200
+
+# memory per worker (bytes) and process limit; candidates per chunk shrink with the history length
+# ( evaluate keeps about this many dates x candidates float64 arrays alive at once )
+chunk_bytes   = 64 * 2**20
+max_workers   = 4
+_CHUNK_ARRAYS = 6
+
+# -------------------------------------------------------------------------------------------------
+# Evaluation Functions
+# -------------------------------------------------------------------------------------------------
+
+def evaluate( returns, cov, weights ):
+
+    # returns: dates x assets daily returns, weights: assets x candidates (constant weights)
+    daily = returns @ weights
+    gains = ( np.cumprod( 1 + daily, axis=0 ) - 1 ) * 100
+    mean  = daily.mean( axis=0 )
+    vol   = np.sqrt( np.einsum( 'ij,ik,kj->j', weights, cov, weights ) )
+
+    with np.errstate( invalid='ignore', divide='ignore' ):
+        sharpe = mean / daily.std( axis=0, ddof=1 ) * ( 252**0.5 )
+
+    return np.vstack( [
+        mean * 252 * 100,
+        vol * ( 252**0.5 ) * 100,
+        sharpe,
+        gains[-1],
+        gains.std( axis=0, ddof=1 ),
+        fsport.get_mdd( gains ),
+    ] )
+
+def run_chunk( returns, cov, size, seed, sample_size ):
+
+    # random long-only weights, reduced to frontier bins, best candidates and a small sample
+    rng     = np.random.default_rng( seed )
+    weights = rng.dirichlet( np.ones( returns.shape[1] ), size ).T
+    stats   = evaluate( returns, cov, weights )
+
+    bins = np.clip( ( stats[1] / _VOL_BIN ).astype( int ), 0, int( _VOL_MAX / _VOL_BIN ) )
+    best = {}
+    for i in np.lexsort( ( -stats[0], bins ) ):
+        if bins[i] not in best: best[ bins[i] ] = i
+
+    # no Sharpe candidate when every Sharpe is undefined (zero variance or too short history)
+    pick = rng.choice( size, min( size, sample_size ), replace=False )
+    top  = None if np.isnan( stats[2] ).all() else np.nanargmax( stats[2] )
+    keep = {
+        'frontier': { b: ( stats[ :, i ], weights[ :, i ] ) for b, i in best.items() },
+        'sample'  : stats[ :, pick ],
+        'sharpe'  : None if top is None else ( stats[ :, top ], weights[ :, top ] ),
+        'minvol'  : ( stats[ :, np.argmin( stats[1] ) ], weights[ :, np.argmin( stats[1] ) ] ),
+    }
+    return keep
+
+def merge( total, part ):
+
+    # keep the best of both (memory does not depend on the number of candidates)
+    if total is None: return part
+    for b, elem in part[ 'frontier' ].items():
+        if b not in total[ 'frontier' ] or elem[0][0] > total[ 'frontier' ][ b ][0][0]: total[ 'frontier' ][ b ] = elem
+    total[ 'sample' ] = np.hstack( [ total[ 'sample' ], part[ 'sample' ] ] )
+    if part[ 'sharpe' ] is not None and ( total[ 'sharpe' ] is None or part[ 'sharpe' ][0][2] > total[ 'sharpe' ][0][2] ): total[ 'sharpe' ] = part[ 'sharpe' ]
+    if part[ 'minvol' ][0][1] < total[ 'minvol' ][0][1]: total[ 'minvol' ] = part[ 'minvol' ]
+    return total
+
+# -------------------------------------------------------------------------------------------------
+# Sweep Functions
+# -------------------------------------------------------------------------------------------------
+
+def get_returns( close ):
+
+    # daily returns of the aligned close matrix ( dates x assets )
+    return close.ffill().pct_change().iloc[ 1: ].fillna( 0 ).to_numpy()
+
+def get_chunk( num_dates ):
+
+    # candidates per chunk within chunk_bytes (at least 100)
+    return max( 100, chunk_bytes // ( _CHUNK_ARRAYS * 8 * max( num_dates, 1 ) ) )
+
+def sweep( close, num, chunk=None, workers=None, seed=0, sample_size=3000 ):
+
+    # chunks are seeded independently, so results do not depend on the number of workers
+    returns = get_returns( close )
+    cov     = np.cov( returns, rowvar=False ).reshape( returns.shape[1], returns.shape[1] )
+    chunk   = chunk or get_chunk( len( returns ) )
+    sizes   = [ min( chunk, num - i ) for i in range( 0, num, chunk ) ]
+    seeds   = np.random.SeedSequence( seed ).spawn( len( sizes ) )
+    samples = [ max( 1, sample_size * s // num ) for s in sizes ]
+
+    total = None
+    with ProcessPoolExecutor( max_workers=min( workers or os.cpu_count(), max_workers ) ) as pool:
+        parts = pool.map( run_chunk, [ returns ]*len( sizes ), [ cov ]*len( sizes ), sizes, seeds, samples )
+        for part in parts: total = merge( total, part )
+
+    # frontier: highest return among candidates with lower or equal vol
+    top  = -np.inf
+    edge = []
+    for b, ( stats, weights ) in sorted( total[ 'frontier' ].items() ):
+        if stats[0] > top:
+            edge.append( stats )
+            top = stats[0]
+
+    tickers = list( close.columns )
+    if total[ 'sharpe' ] is None: total[ 'sharpe' ] = ( np.full( len( stat_cols ), np.nan ), np.full( len( tickers ), np.nan ) )
+    return {
+        'sample'  : pd.DataFrame( total[ 'sample' ].T, columns=stat_cols ),
+        'frontier': pd.DataFrame( edge, columns=stat_cols ),
+        'best'    : pd.DataFrame( {
+            'Max Sharpe': pd.Series( total[ 'sharpe' ][1] * 100, index=tickers ),
+            'Min Vol'   : pd.Series( total[ 'minvol' ][1] * 100, index=tickers ),
+        } ),
+        'stats'   : pd.DataFrame( [ total[ 'sharpe' ][0], total[ 'minvol' ][0] ], index=[ 'Max Sharpe', 'Min Vol' ], columns=stat_cols ),
+    }
+
+def get_current( close, port ):
+
+    # statistics of the current allocation (same definitions as the sweep)
+    returns = get_returns( close )
+    cov     = np.cov( returns, rowvar=False ).reshape( returns.shape[1], returns.shape[1] )
+    weights = np.array( [ [ port[ t ] ] for t in close.columns ], dtype='float64' )
+    return pd.DataFrame( evaluate( returns, cov, weights / weights.sum() ).T, index=[ 'Current' ], columns=stat_cols )
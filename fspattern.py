@@ -0,0 +1,74 @@
+#
+# Candlestick pattern scanner for financial analysis
+#
+
+# -------------------------------------------------------------------------------------------------
+# Imports
+# -------------------------------------------------------------------------------------------------
+
+import pandas    as pd
+import talib     as ta
+import fscache
+import fsind
+
+# -------------------------------------------------------------------------------------------------
+# Globals
+# -------------------------------------------------------------------------------------------------
+
+# every TA-Lib candlestick function (CDL*)
+all_patterns = ta.get_function_groups()[ 'Pattern Recognition' ]
+
+# signal matrices share the indicator freshness
+fscache.policies[ 'pattern' ] = fscache.policies[ 'indicator' ]
+
+# -------------------------------------------------------------------------------------------------
+# Scan Functions
+# -------------------------------------------------------------------------------------------------
+
+def scan_arrays( open_, high, low, close, patterns ):
+
+    # { pattern: signed output } for plain arrays
+    return { p: getattr( ta, p )( open_, high, low, close ) for p in dict.fromkeys( patterns ) }
+
+def scan( st_hist, ticker, patterns ):
+
+    # signed outputs ( dates x patterns ), each CDL function computed once per ticker and data version
+    key    = ( 'pattern', ticker, fsind.get_version( st_hist, ticker ) )
+    entry  = fscache.get( key, 'pattern' )
+    matrix = entry[ 'value' ] if entry is not None else None
+
+    missing = [ p for p in dict.fromkeys( patterns ) if matrix is None or p not in matrix.columns ]
+    if missing:
+        hist = [ st_hist[ field ][ ticker ] for field in [ 'open', 'high', 'low', 'close' ] ]
+        new  = pd.DataFrame( scan_arrays( *[ h.to_numpy( dtype='float64' ) for h in hist ], missing ), index=hist[3].index )
+        matrix = new if matrix is None else pd.concat( [ matrix, new ], axis=1 )
+        fscache.put( key, 'pattern', matrix )
+
+    return matrix[ list( dict.fromkeys( patterns ) ) ]
+
+def get_signals( st_hist, ticker, bullish, bearish, num_points ):
+
+    # split signed outputs: positive values are bullish, negative values are bearish
+    matrix = scan( st_hist, ticker, bullish + bearish ).iloc[ -num_points: ]
+    return matrix[ list( dict.fromkeys( bullish ) ) ] > 0, matrix[ list( dict.fromkeys( bearish ) ) ] < 0
+
+def get_logs( st_hist, tickers, bullish, bearish, num_points ):
+
+    # '<date>: [<ticker>] <pattern>' lines for bullish and bearish detections
+    bull_logs, bear_logs = [], []
+    for ticker in tickers:
+        bull, bear = get_signals( st_hist, ticker, bullish, bearish, num_points )
+        for logs, signal in [ ( bull_logs, bull ), ( bear_logs, bear ) ]:
+            hits = signal.stack()
+            logs += [ f'{d:%Y-%m-%d}: [{ticker:5}] {method}' for ( d, method ) in hits[ hits ].index ]
+
+    bull_logs.sort()
+    bear_logs.sort()
+    return bull_logs, bear_logs
+
+def get_histo( st_hist, ticker, bullish, bearish, num_points ):
+
+    # close prices at bars with any bullish / bearish detection (for pattern chart)
+    bull, bear = get_signals( st_hist, ticker, bullish, bearish, num_points )
+    close = st_hist[ 'close' ][ ticker ].iloc[ -num_points: ]
+    return close[ bull.any( axis=1 ) ], close[ bear.any( axis=1 ) ]
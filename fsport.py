@@ -0,0 +1,271 @@
+#
+# Portfolio computations for financial analysis
+#
+
+# -------------------------------------------------------------------------------------------------
+# Imports
+# -------------------------------------------------------------------------------------------------
+
+import pandas    as pd
+import numpy     as np
+import fscache
+import fsind
+
+# -------------------------------------------------------------------------------------------------
+# Utility Functions
+# -------------------------------------------------------------------------------------------------
+
+def memoize( key, compute ):
+
+    # share results per data version through the bounded cache
+    entry = fscache.get( key, 'table' )
+    if entry is not None: return entry[ 'value' ]
+    value = compute()
+    fscache.put( key, 'table', value )
+    return value
+
+def get_close( st_hist, tickers ):
+
+    # dates x tickers on the union of dates (NaN where a ticker has no bar)
+    def _compute():
+        close = st_hist[ 'close' ].unstack( level=0 ).reindex( columns=tickers )
+        return close.set_axis( pd.DatetimeIndex( close.index ), axis=0 )
+
+    return memoize( ( 'close', fsind.get_version( st_hist ), tuple( tickers ) ), _compute )
+
+# -------------------------------------------------------------------------------------------------
+# Returns Functions
+# -------------------------------------------------------------------------------------------------
+
+def get_offsets( close, deltas ):
+
+    # row of the reference bar for each ( horizon, ticker ): first valid bar at or after last-delta
+    index = close.index.to_numpy()
+    valid = close.notna().to_numpy()
+    n     = len( index )
+    cols  = np.arange( valid.shape[1] )
+
+    last_pos  = n - 1 - np.argmax( valid[ ::-1 ], axis=0 )
+    first_pos = np.argmax( valid, axis=0 )
+
+    thresh = index[ last_pos ][ None, : ] - np.array( deltas, dtype='timedelta64[D]' )[ :, None ]
+    pos    = np.searchsorted( index, thresh.ravel(), side='left' ).reshape( thresh.shape )
+
+    # keep at least two bars (as get_num_points), then skip gaps
+    pos = np.minimum( pos, np.maximum( last_pos - 1, 0 ) )
+    next_valid = np.where( valid, np.arange( n )[ :, None ], n )
+    next_valid = np.minimum.accumulate( next_valid[ ::-1 ], axis=0 )[ ::-1 ]
+    pos = np.minimum( next_valid[ pos, cols ], last_pos )
+
+    # horizon fully covered by history (a week of slack for weekends and holidays)
+    complete = thresh >= index[ first_pos ][ None, : ] - np.timedelta64( 7, 'D' )
+    return pos, complete
+
+def get_returns( st_hist, tickers, deltas, last_price=None, complete=False ):
+
+    # tickers x horizons returns (%) from the bar delta days before the last one
+    # (complete=True drops horizons longer than a ticker's history)
+    close = get_close( st_hist, tickers )
+    key   = ( 'offsets', fsind.get_version( st_hist ), tuple( tickers ), tuple( deltas ) )
+    pos, covered = memoize( key, lambda: get_offsets( close, deltas ) )
+
+    values = close.to_numpy()
+    ref    = values[ pos, np.arange( len( tickers ) ) ]
+    if last_price is None: last = close.ffill().to_numpy()[-1]
+    else:                  last = np.array( [ last_price[ t ] for t in tickers ], dtype='float64' )
+
+    gains = ( last[ None, : ] - ref ) / ref * 100
+    if complete: gains[ ~covered ] = np.nan
+    return pd.DataFrame( gains.T, index=tickers, columns=deltas )
+
+def get_port_gains( returns, port ):
+
+    # allocation weighted gains for each horizon
+    alloc = np.array( [ port[ t ] for t in returns.index ], dtype='float64' )
+    return ( alloc / alloc.sum() ) @ returns.to_numpy()
+
+# -------------------------------------------------------------------------------------------------
+# Backtest Functions (dates x assets)
+# -------------------------------------------------------------------------------------------------
+
+def get_window( close, num_points ):
+
+    # last num_points rows, gaps filled with the previous (or first) close
+    return close.iloc[ -num_points: ].ffill().bfill()
+
+def get_gains( prices ):
+
+    # accumulated gain (%) of each column since the first row
+    return ( prices / prices[0] - 1 ) * 100
+
+def get_equity( gains, weights ):
+
+    # buy-and-hold portfolios: weights is assets x portfolios
+    weights = np.asarray( weights, dtype='float64' )
+    return gains @ ( weights / weights.sum( axis=0 ) )
+
+def get_beta( x, y, period=5 ):
+
+    # TA-Lib BETA of y against x over the last period returns (one value per column)
+    if len( x ) <= period: return np.full( y.shape[1], np.nan )
+    rx = ( x[ 1: ] / x[ :-1 ] - 1 )[ -period: ][ :, None ]
+    ry = ( y[ 1: ] / y[ :-1 ] - 1 )[ -period: ]
+    sx, sy = rx.sum( axis=0 ), ry.sum( axis=0 )
+    sxx, sxy = ( rx*rx ).sum( axis=0 ), ( rx*ry ).sum( axis=0 )
+    den = period * sxx - sx * sx
+    with np.errstate( invalid='ignore', divide='ignore' ):
+        return np.where( den != 0, ( period * sxy - sx * sy ) / den, 0. )
+
+def get_mdd( gains ):
+
+    # maximum drawdown of each column (in gain points)
+    return ( gains - np.maximum.accumulate( gains, axis=0 ) ).min( axis=0 )
+
+def get_stats( gains, names, ref=0 ):
+
+    # statistics table of gain series ( dates x series ), relative to column ref
+    level  = gains + 100
+    daily  = level[ 1: ] / level[ :-1 ] - 1
+    with np.errstate( invalid='ignore', divide='ignore' ):
+        sharpe = daily.mean( axis=0 ) / daily.std( axis=0, ddof=1 ) * ( 252**0.5 )
+
+    return pd.DataFrame( {
+        'Gain'  : gains[-1],
+        'Delta' : gains[-1] - gains[-1, ref],
+        'Stdev' : gains.std( axis=0, ddof=1 ),
+        'Best'  : gains.max( axis=0 ),
+        'Worst' : gains.min( axis=0 ),
+        'MDD'   : get_mdd( gains ),
+        'Beta'  : get_beta( level[ :, ref ], level ),
+        'Sharpe': sharpe,
+    }, index=names )
+
+# -------------------------------------------------------------------------------------------------
+# Rolling Functions (dates x series, O(n) in history length, first period-1 rows are NaN)
+# -------------------------------------------------------------------------------------------------
+
+def get_rolling_sum( x, period ):
+
+    # window sums from one cumulative sum
+    csum = np.cumsum( np.vstack( [ np.zeros( ( 1, ) + x.shape[ 1: ] ), x ] ), axis=0 )
+    out  = np.full( x.shape, np.nan )
+    out[ period-1: ] = csum[ period: ] - csum[ :-period ]
+    return out
+
+def get_rolling_max( x, period ):
+
+    # van Herk / Gil-Werman: block prefix and suffix maxima, two lookups per row
+    n   = len( x )
+    pad = np.full( ( -n % period, ) + x.shape[ 1: ], -np.inf )
+    blk = np.vstack( [ x, pad ] ).reshape( ( -1, period ) + x.shape[ 1: ] )
+    pre = np.maximum.accumulate( blk, axis=1 ).reshape( ( -1, ) + x.shape[ 1: ] )
+    suf = np.maximum.accumulate( blk[ :, ::-1 ], axis=1 )[ :, ::-1 ].reshape( ( -1, ) + x.shape[ 1: ] )
+
+    out = np.maximum.accumulate( x, axis=0 )
+    out[ period-1: ] = np.maximum( suf[ :n-period+1 ], pre[ period-1:n ] )
+    return out
+
+def get_rolling_stats( gains, ref=0, period=63 ):
+
+    # rolling Stdev (annualized %), Sharpe and Beta (against column ref) of daily returns,
+    # drawdown from the running peak and from the peak of the last period rows
+    level = gains + 100
+    daily = level[ 1: ] / level[ :-1 ] - 1
+
+    # centered returns keep the variance sums well conditioned
+    dc   = daily - daily.mean( axis=0 )
+    xc   = dc[ :, ref:ref+1 ]
+    s1   = get_rolling_sum( dc, period )
+    s2   = get_rolling_sum( dc * dc, period )
+    sxy  = get_rolling_sum( xc * dc, period )
+    sx   = s1[ :, ref:ref+1 ]
+    sxx  = s2[ :, ref:ref+1 ]
+
+    with np.errstate( invalid='ignore', divide='ignore' ):
+        var    = np.maximum( s2 - s1 * s1 / period, 0 ) / ( period - 1 )
+        mean   = get_rolling_sum( daily, period ) / period
+        stdev  = np.sqrt( var ) * ( 252**0.5 ) * 100
+        sharpe = mean / np.sqrt( var ) * ( 252**0.5 )
+        den    = period * sxx - sx * sx
+        beta   = np.where( den != 0, ( period * sxy - sx * s1 ) / den, 0. )
+        beta[ np.isnan( s1 ) ] = np.nan
+
+    # row 0 has no return, results are aligned to the gain rows
+    pad = lambda v: np.vstack( [ np.full( ( 1, v.shape[1] ), np.nan ), v ] )
+    return {
+        'Stdev'     : pad( stdev ),
+        'Sharpe'    : pad( sharpe ),
+        'Beta'      : pad( beta ),
+        'Drawdown'  : ( level / np.maximum.accumulate( level, axis=0 ) - 1 ) * 100,
+        'Rolling DD': ( level / get_rolling_max( level, period ) - 1 ) * 100,
+    }
+
+def to_long( dates, gains, names ):
+
+    # long format for altair ( Metric, Date, Gain )
+    return pd.DataFrame( {
+        'Metric': np.repeat( names, len( dates ) ),
+        'Date'  : np.tile( dates, len( names ) ),
+        'Gain'  : gains.T.ravel(),
+    } )
+
+# -------------------------------------------------------------------------------------------------
+# Rebalancing Functions
+# -------------------------------------------------------------------------------------------------
+
+def get_period_starts( dates, mode ):
+
+    # first row of each new month / quarter (row 0 is the initial allocation)
+    dates = pd.DatetimeIndex( dates )
+    if mode == 'Monthly':   key = dates.year * 12 + dates.month
+    elif mode == 'Quarterly': key = dates.year * 4 + ( dates.month - 1 ) // 3
+    else: return np.array( [], dtype=int )
+    key = np.asarray( key )
+    return np.flatnonzero( key[ 1: ] != key[ :-1 ] ) + 1
+
+def get_rebalanced( prices, dates, weights, mode, band=0.05, cost_bps=0, slippage_bps=0, lookahead=64 ):
+
+    # periodic ('Monthly', 'Quarterly') or threshold ('Band') rebalancing with trading costs
+    # returns gain curve (%) and { rebalance count, turnover (%), cost (%) }
+    prices = np.asarray( prices, dtype='float64' )
+    target = np.asarray( weights, dtype='float64' )
+    target = target / target.sum()
+    rate   = ( cost_bps + slippage_bps ) / 1e4
+    n      = len( prices )
+
+    value  = np.empty( n )
+    units  = target / prices[0]
+    starts = list( get_period_starts( dates, mode ) ) + [ n ]
+    info   = { 'Rebalances': 0, 'Turnover(%)': 0., 'Cost(%)': 0. }
+
+    row = 0
+    while row < n:
+        # end of the current holding segment
+        if mode == 'Band':
+            end = n
+            for s in range( row+1, n, lookahead ):
+                block = prices[ s:s+lookahead ] * units
+                drift = np.abs( block / block.sum( axis=1, keepdims=True ) - target ).max( axis=1 )
+                hits  = np.flatnonzero( drift > band )
+                if len( hits ) > 0:
+                    end = s + hits[0]
+                    break
+        else:
+            end = next( s for s in starts if s > row )
+
+        # holdings drift with prices inside the segment
+        value[ row:end ] = prices[ row:end ] @ units
+        if end >= n: break
+
+        # rebalance at the segment end, paying costs on traded notional
+        total  = prices[ end ] @ units
+        traded = np.abs( target * total - prices[ end ] * units ).sum()
+        cost   = traded * rate
+        units  = target * ( total - cost ) / prices[ end ]
+
+        info[ 'Rebalances'  ] += 1
+        info[ 'Turnover(%)' ] += traded / total * 100
+        info[ 'Cost(%)'     ] += cost / total * 100
+        row = end
+
+    return ( value / value[0] - 1 ) * 100, info
@@ -0,0 +1,246 @@
+#
+# Background prefetch for financial analysis
+#
+
+# -------------------------------------------------------------------------------------------------
+# Imports
+# -------------------------------------------------------------------------------------------------
+
+import pandas    as pd
+import datetime  as dt
+import threading
+import time
+import fscache
+import fscalendar
+import fscore
+import fsflight
+import fsholdings
+
+from concurrent.futures import ThreadPoolExecutor
+
+# -------------------------------------------------------------------------------------------------
+# Globals
+# -------------------------------------------------------------------------------------------------
+
+# seconds between schedule checks, entries are refreshed this many seconds before they expire
+tick = 1.0
+lead = 15
+
+# daily bars are refreshed once, this many seconds after the close (never ahead of it)
+settle      = 120
+close_based = [ 'daily', 'table' ]
+
+# refresh jobs running at once; jobs are deferred while page fetches have more tickers in flight
+workers     = 2
+max_pending = 20
+
+# minimum seconds between runs of a job while the market is open / closed
+schedules = {
+    'market'   : [ 0,    0 ],
+    'sector'   : [ 0,    0 ],
+    'holdings' : [ 0,  300 ],
+    'portfolio': [ 0,    0 ],
+    'bench'    : [ 0,    0 ],
+    'bond'     : [ 0,    0 ],
+}
+
+# ticker lists seen by dashboard sessions are kept warm this long (seconds)
+watch_ttl = 3600
+
+_watched = {}
+_status  = {}
+_running = set()
+_pool    = None
+_thread  = None
+_stop    = threading.Event()
+_lock    = threading.Lock()
+
+# -------------------------------------------------------------------------------------------------
+# Job Functions ( -> [ ( memoized fetch, args ) ] with the same arguments as the menus )
+# -------------------------------------------------------------------------------------------------
+
+def watch( kind, tickers ):
+
+    # ticker list rendered by a session ( kind: 'portfolio', 'bench', 'market', 'future' ),
+    # or the fetch period of the sector page ( kind: 'sector', [ period ] )
+    with _lock:
+        _watched[ ( kind, tuple( tickers ) ) ] = time.time()
+
+def get_watched( kind, default ):
+
+    now = time.time()
+    with _lock:
+        lists = [ list( t ) for ( k, t ), seen in _watched.items() if k == kind and seen > now - watch_ttl ]
+    return lists or [ list( default ) ]
+
+def is_open():
+
+    return fscalendar.is_open( fscore.default_params[ 'market' ][0] )
+
+def job_market():
+
+    # index tickers while the market is open, futures otherwise (both around a session change)
+    ticker = fscore.default_params[ 'market' ][0]
+    change = fscalendar.next_change( ticker )
+    kinds  = [ 'market' if is_open() else 'future' ]
+    if change is not None and change - fscalendar.get_now() < dt.timedelta( minutes=5 ): kinds = [ 'market', 'future' ]
+
+    lists = [ t for kind in kinds for t in get_watched( kind, fscore.default_params[ kind ] ) ]
+    return [ c for t in lists for c in [ ( fscore.fetch_info, ( t, ) ), ( fscore.fetch_history, ( t, '5d', '5m' ) ) ] ]
+
+def get_sector_periods():
+
+    return [ periods[0] for periods in get_watched( 'sector', [ '1y' ] ) ]
+
+def job_sector():
+
+    tickers = list( fscore.sector_tickers )
+    return [ ( fscore.fetch_info, ( tickers, ) ) ] + [ ( fscore.fetch_history, ( tickers, period, '1d' ) ) for period in get_sector_periods() ]
+
+def job_holdings():
+
+    # shared holdings of every sector ETF (one universe entry), once the sector info is cached
+    tickers = list( fscore.sector_tickers )
+    ttl     = fscore.fetch_info.ttl( tickers )
+    if ttl is None or ttl <= 0: return []
+
+    universe = fsholdings.get_universe( fsholdings.get_holdings( fscore.fetch_info( tickers ) ) )
+    if universe == []: return []
+    return [ ( fsholdings.fetch_holdings_info, ( universe, ) ) ] + [ ( fsholdings.fetch_holdings_history, ( universe, period ) ) for period in get_sector_periods() ]
+
+def job_portfolio():
+
+    lists = get_watched( 'portfolio', fscore.default_params[ 'port' ] )
+    return [ c for t in lists for c in [ ( fscore.fetch_info, ( t, ) ), ( fscore.fetch_history, ( t, '1y', '1d' ) ) ] ]
+
+def job_bench():
+
+    return [ ( fscore.fetch_history, ( t, '1y', '1d' ) ) for t in get_watched( 'bench', fscore.default_params[ 'bench' ] ) ]
+
+def job_bond():
+
+    return [ ( fscore.fetch_bond_history, ( name, ) ) for name in fscore._US_BOND ]
+
+jobs = {
+    'market'   : job_market,
+    'sector'   : job_sector,
+    'holdings' : job_holdings,
+    'portfolio': job_portfolio,
+    'bench'    : job_bench,
+    'bond'     : job_bond,
+}
+
+# -------------------------------------------------------------------------------------------------
+# Scheduler Functions
+# -------------------------------------------------------------------------------------------------
+
+def is_stale( func, args ):
+
+    expires = func.expires( *args )
+    if expires is None: return True
+    dataset = func.dataset( *args )
+    if dataset not in close_based: return expires - time.time() < lead
+
+    # a refresh before the close would store the same expiry with unsettled bars
+    if expires == fscache.get_expiry( dataset ): return False
+    return time.time() >= expires + settle
+
+def get_state( name ):
+
+    if name not in _status:
+        _status[ name ] = { 'State': 'idle', 'Last run': None, 'Duration(s)': 0., 'Refreshed': 0, 'Runs': 0,
+                            'Errors': 0, 'Deferred': 0, 'Last error': '', 'retry': 0., 'failures': 0 }
+    return _status[ name ]
+
+def run_job( name, calls ):
+
+    # refresh stale entries in place, pages keep reading the old values meanwhile
+    start, refreshed, error = time.time(), 0, None
+    for func, args in calls:
+        try:
+            if is_stale( func, args ):
+                func.refresh( *args )
+                refreshed += 1
+        except Exception as e:
+            error = f'{type( e ).__name__}: {e}'
+
+    with _lock:
+        state = get_state( name )
+        state.update( { 'State': 'idle', 'Last run': dt.datetime.now(), 'Duration(s)': time.time() - start, 'Refreshed': refreshed } )
+        state[ 'Runs' ] += 1
+
+        # failed jobs back off (30 s doubling up to 15 min)
+        if error is not None:
+            state[ 'Errors'     ] += 1
+            state[ 'Last error' ]  = error
+            state[ 'failures'   ] += 1
+            state[ 'retry'      ]  = time.time() + min( 900, 30 * 2 ** ( state[ 'failures' ] - 1 ) )
+        else:
+            state[ 'failures' ] = 0
+        _running.discard( name )
+
+def schedule():
+
+    # submit due jobs while workers are free and page fetches are not piling up
+    now    = time.time()
+    closed = 0 if is_open() else 1
+    for name, job in jobs.items():
+        with _lock:
+            state = get_state( name )
+            if name in _running or now < state[ 'retry' ]: continue
+            if state[ 'Last run' ] is not None and now - state[ 'Last run' ].timestamp() < schedules[ name ][ closed ]: continue
+
+        try:
+            calls = [ c for c in job() if is_stale( *c ) ]
+        except Exception as e:
+            calls = []
+            with _lock: get_state( name )[ 'Last error' ] = f'{type( e ).__name__}: {e}'
+        if calls == []: continue
+
+        with _lock:
+            if _pool is None: return
+            if len( _running ) >= workers or fsflight.get_pending() > max_pending:
+                state[ 'Deferred' ] += 1
+                continue
+            state[ 'State' ] = 'running'
+            _running.add( name )
+            _pool.submit( run_job, name, calls )
+
+def loop():
+
+    while not _stop.wait( tick ):
+        schedule()
+
+def start():
+
+    # one scheduler per process (dashboard reruns reuse it)
+    global _pool, _thread
+    with _lock:
+        if _thread is not None: return
+        _stop.clear()
+        _pool   = ThreadPoolExecutor( max_workers=workers )
+        _thread = threading.Thread( target=loop, daemon=True )
+        _thread.start()
+
+def stop():
+
+    global _pool, _thread
+    with _lock:
+        if _thread is None: return
+        _stop.set()
+        thread, pool, _thread, _pool = _thread, _pool, None, None
+    thread.join()
+    pool.shutdown( wait=True )
+
+# -------------------------------------------------------------------------------------------------
+# Introspection Functions
+# -------------------------------------------------------------------------------------------------
+
+def get_status():
+
+    columns = [ 'State', 'Last run', 'Duration(s)', 'Refreshed', 'Runs', 'Errors', 'Deferred', 'Last error' ]
+    with _lock:
+        rows = { name: { **get_state( name ) } for name in jobs }
+    for row in rows.values():
+        row[ 'Last run' ] = '-' if row[ 'Last run' ] is None else row[ 'Last run' ].strftime( '%H:%M:%S' )
+    return pd.DataFrame( rows ).transpose()[ columns ]
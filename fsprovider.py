@@ -0,0 +1,327 @@
+#
+# Market data providers for financial analysis
+#
+
+# -------------------------------------------------------------------------------------------------
+# Imports
+# -------------------------------------------------------------------------------------------------
+
+import pandas    as pd
+import threading
+import atexit
+import pickle
+import time
+import zlib
+import os
+import fscalendar
+import fsflight
+import fsscreen
+import fsstore
+
+from yahooquery import Ticker
+
+# -------------------------------------------------------------------------------------------------
+# Globals
+# -------------------------------------------------------------------------------------------------
+
+# operations every provider implements:
+#   info( tickers )                               -> { 'price'|'summary'|'fund': { ticker: dict } }
+#   history( tickers, interval, period, start )   -> yahooquery history ( symbol, date ) or error dict
+#   state( ticker )                               -> market state string ( 'REGULAR', ... )
+#   symbols( tickers )                            -> valid tickers
+#   bond( name, fr_date, to_date )                -> investpy history ( Date x Open/High/Low/Close )
+operations = [ 'info', 'history', 'state', 'symbols', 'bond' ]
+
+# default recording file (zlib compressed pickle), written at most every flush_interval seconds and at exit
+record_file    = os.path.join( 'store', 'record.bin' )
+flush_interval = 5.
+
+# last bar of synthetic histories (fixed, so runs are reproducible)
+synthetic_end = '2024-12-31'
+
+# active provider and the settings it was built from
+provider = None
+_config  = None
+_lock    = threading.Lock()
+
+# -------------------------------------------------------------------------------------------------
+# Yahoo Provider
+# -------------------------------------------------------------------------------------------------
+
+def yahoo_info( tickers ):
+
+    _list = Ticker( tickers, verify=False, asynchronous=True )
+    return { 'price': _list.price, 'summary': _list.summary_detail, 'fund': _list.fund_holding_info }
+
+def yahoo_history( tickers, interval, period=None, start=None ):
+
+    _list = Ticker( tickers, verify=False, asynchronous=True )
+    if start is None: return _list.history( period, interval, adj_timezone=False )
+    return _list.history( interval=interval, start=start, adj_timezone=False )
+
+def yahoo_state( ticker ):
+
+    return Ticker( ticker, verify=False ).price[ ticker ][ 'marketState' ]
+
+def yahoo_symbols( tickers ):
+
+    return Ticker( tickers, verify=False, validate=True ).symbols
+
+def investing_bond( name, fr_date, to_date ):
+
+    # imported on first use (synthetic / replay runs do not need it)
+    import investpy
+    return investpy.get_bond_historical_data( bond=name, from_date=fr_date.strftime( '%d/%m/%Y' ), to_date=to_date.strftime( '%d/%m/%Y' ) )
+
+yahoo = {
+    'info'   : yahoo_info,
+    'history': yahoo_history,
+    'state'  : yahoo_state,
+    'symbols': yahoo_symbols,
+    'bond'   : investing_bond,
+}
+
+# -------------------------------------------------------------------------------------------------
+# Synthetic Provider ( random walks seeded by ticker name )
+# -------------------------------------------------------------------------------------------------
+
+def get_synthetic_index( interval ):
+
+    # every call slices the same bars, so tail fetches agree with full fetches
+    # ( about 50 years of sessions, intraday bars from the regular open for 60 sessions like yahoo )
+    intraday = interval[-1] in 'mh'
+    days     = pd.bdate_range( end=synthetic_end, periods=60 if intraday else 12600, name='date' )
+    if not intraday: return days
+
+    minutes = int( interval[:-1] ) * ( 60 if interval[-1] == 'h' else 1 )
+    bars    = pd.timedelta_range( '9:30:00', '15:59:59', freq=f'{minutes}min' )
+    return pd.DatetimeIndex( [ d + b for d in days for b in bars ], name='date' )
+
+def synthetic_history( tickers, interval, period=None, start=None ):
+
+    # generate the full series, keep the requested bars
+    full = get_synthetic_index( interval )
+    keep = full[ full >= pd.Timestamp( start ) ] if start is not None else fsstore.trim( pd.DataFrame( index=full ), period ).index
+    if len( keep ) == 0: return { t: 'No data found' for t in tickers }
+
+    frames = [ fsscreen.make_synthetic_history( [ t ], seed=zlib.crc32( t.encode() ), index=full ) for t in tickers ]
+    hist   = pd.concat( frames )
+    return hist[ hist.index.get_level_values( 1 ) >= keep[0] ]
+
+def synthetic_info( tickers ):
+
+    return fsscreen.make_synthetic_info( synthetic_history( tickers, '1d', '1y' ) )
+
+def synthetic_state( ticker ):
+
+    return 'REGULAR' if fscalendar.is_open( ticker ) else 'CLOSED'
+
+def synthetic_symbols( tickers ):
+
+    return list( tickers )
+
+def synthetic_bond( name, fr_date, to_date ):
+
+    # yields around 2% from a random walk of the bond name
+    hist = synthetic_history( [ name ], '1d', '1y' ).xs( name, level=0 ) / 50
+    hist = hist[ [ 'open', 'high', 'low', 'close' ] ].rename( columns=str.capitalize ).rename_axis( 'Date' )
+    return hist
+
+synthetic = {
+    'info'   : synthetic_info,
+    'history': synthetic_history,
+    'state'  : synthetic_state,
+    'symbols': synthetic_symbols,
+    'bond'   : synthetic_bond,
+}
+
+# -------------------------------------------------------------------------------------------------
+# Record / Replay Providers
+# -------------------------------------------------------------------------------------------------
+
+# recordings keep the latest answer per ticker, so replay does not depend on the call pattern
+#   { 'info': { ticker: { section: dict } }, 'history': { ( ticker, interval ): frame },
+#     'state': { ticker: str }, 'symbols': set, 'bond': { name: frame } }
+
+def load_recording( path ):
+
+    if not os.path.isfile( path ): return { 'info': {}, 'history': {}, 'state': {}, 'symbols': set(), 'bond': {} }
+    with open( path, 'rb' ) as fp:
+        return pickle.loads( zlib.decompress( fp.read() ) )
+
+def save_recording( path, data ):
+
+    # write to temporary file and swap, so a replay never reads partial data
+    os.makedirs( os.path.dirname( path ) or '.', exist_ok=True )
+    temp = path + '.tmp'
+    with open( temp, 'wb' ) as fp:
+        fp.write( zlib.compress( pickle.dumps( data, protocol=pickle.HIGHEST_PROTOCOL ), 6 ) )
+    os.replace( temp, path )
+
+def merge( old, new ):
+
+    # newer rows win (same rule as the local store)
+    if old is None or len( old.index ) == 0: return new
+    if len( new.index ) == 0: return old
+    return pd.concat( [ old[ old.index < new.index[0] ], new ] )
+
+def make_recorder( base, path ):
+
+    # pass calls to base and keep every answer in the recording
+    data    = load_recording( path )
+    lock    = threading.Lock()
+    io      = threading.Lock()
+    pending = { 'dirty': False, 'timer': None }
+
+    def flush():
+        # snapshot under the lock (frames are replaced, never changed), write outside it
+        with lock:
+            pending[ 'timer' ] = None
+            if not pending[ 'dirty' ]: return
+            pending[ 'dirty' ] = False
+            snap = { key: value.copy() for key, value in data.items() }
+        with io:
+            save_recording( path, snap )
+
+    def save():
+        # called with lock held: one delayed write for all answers until then
+        pending[ 'dirty' ] = True
+        if pending[ 'timer' ] is None:
+            pending[ 'timer' ] = threading.Timer( flush_interval, flush )
+            pending[ 'timer' ].daemon = True
+            pending[ 'timer' ].start()
+
+    atexit.register( flush )
+
+    def info( tickers ):
+        result = base[ 'info' ]( tickers )
+        with lock:
+            for ticker in tickers:
+                data[ 'info' ][ ticker ] = { key: value.get( ticker ) for key, value in result.items() if isinstance( value, dict ) }
+            save()
+        return result
+
+    def history( tickers, interval, period=None, start=None ):
+        result = base[ 'history' ]( tickers, interval, period=period, start=start )
+        with lock:
+            for ticker, df in fsstore.split_symbols( result ).items():
+                data[ 'history' ][ ( ticker, interval ) ] = merge( data[ 'history' ].get( ( ticker, interval ) ), df )
+            save()
+        return result
+
+    def state( ticker ):
+        result = base[ 'state' ]( ticker )
+        with lock:
+            data[ 'state' ][ ticker ] = result
+            save()
+        return result
+
+    def symbols( tickers ):
+        result = base[ 'symbols' ]( tickers )
+        with lock:
+            data[ 'symbols' ].update( result )
+            save()
+        return result
+
+    def bond( name, fr_date, to_date ):
+        result = base[ 'bond' ]( name, fr_date, to_date )
+        with lock:
+            data[ 'bond' ][ name ] = merge( data[ 'bond' ].get( name ), result )
+            save()
+        return result
+
+    return { 'info': info, 'history': history, 'state': state, 'symbols': symbols, 'bond': bond }
+
+def make_replay( path, latency=0., per_ticker=0. ):
+
+    # answers from a recording after a simulated network delay (seconds per call and per ticker)
+    data = load_recording( path )
+
+    def wait( count ):
+        time.sleep( latency + per_ticker * count )
+
+    def info( tickers ):
+        wait( len( tickers ) )
+        snaps = { t: data[ 'info' ][ t ] for t in tickers if t in data[ 'info' ] }
+        return { key: { t: snap.get( key ) for t, snap in snaps.items() if snap.get( key ) is not None } for key in [ 'price', 'summary', 'fund' ] }
+
+    def history( tickers, interval, period=None, start=None ):
+        wait( len( tickers ) )
+        frames = {}
+        for ticker in tickers:
+            df = data[ 'history' ].get( ( ticker, interval ) )
+            if df is None: continue
+            frames[ ticker ] = df[ df.index >= pd.Timestamp( start ) ] if start is not None else fsstore.trim( df, period )
+
+        # yahoo answers with an error dict when nothing matches
+        if frames == {}: return { t: 'No data found' for t in tickers }
+        return pd.concat( frames, names=[ 'symbol', 'date' ] )
+
+    def state( ticker ):
+        wait( 1 )
+        return data[ 'state' ].get( ticker, 'CLOSED' )
+
+    def symbols( tickers ):
+        wait( len( tickers ) )
+        return [ t for t in tickers if t in data[ 'symbols' ] ]
+
+    def bond( name, fr_date, to_date ):
+        wait( 1 )
+        df = data[ 'bond' ].get( name )
+        if df is None or len( df.index ) == 0: return pd.DataFrame( columns=[ 'Open', 'High', 'Low', 'Close' ] )
+
+        # same span, ending at the last recorded day (recordings outlive the calendar)
+        return df[ df.index >= df.index[-1] - ( to_date - fr_date ) ]
+
+    return { 'info': info, 'history': history, 'state': state, 'symbols': symbols, 'bond': bond }
+
+# -------------------------------------------------------------------------------------------------
+# Selection Functions
+# -------------------------------------------------------------------------------------------------
+
+def use( name, path=None, latency=0., per_ticker=0. ):
+
+    # 'yahoo', 'synthetic', 'record' (yahoo, saved to path) or 'replay' (from path)
+    global provider, _config
+
+    path   = path or record_file
+    config = ( name, path, latency, per_ticker )
+    with _lock:
+        # dashboard reruns keep the provider (and its loaded recording)
+        if config == _config: return provider
+
+        if   name == 'yahoo'    : provider = yahoo
+        elif name == 'synthetic': provider = synthetic
+        elif name == 'record'   : provider = make_recorder( yahoo, path )
+        elif name == 'replay'   : provider = make_replay( path, latency, per_ticker )
+        else: raise ValueError( f'unknown provider: {name}' )
+
+        _config = config
+        return provider
+
+def get( operation ):
+
+    if provider is None: use( 'yahoo' )
+    return provider[ operation ]
+
+def get_info( tickers ):
+
+    # concurrent sessions share one upstream call per ticker
+    return fsflight.fetch( 'info', tickers, get( 'info' ) )
+
+def get_history( tickers, interval, period=None, start=None ):
+
+    call = lambda batch: get( 'history' )( batch, interval, period=period, start=start )
+    return fsflight.fetch( 'history', tickers, call, ( interval, period, start ) )
+
+def get_market_state( ticker ):
+
+    return get( 'state' )( ticker )
+
+def get_symbols( tickers ):
+
+    return get( 'symbols' )( tickers )
+
+def get_bond_history( name, fr_date, to_date ):
+
+    return get( 'bond' )( name, fr_date, to_date )
@@ -0,0 +1,238 @@
+#
+# Headless reports for financial analysis
+#
+
+# -------------------------------------------------------------------------------------------------
+# Imports
+# -------------------------------------------------------------------------------------------------
+
+import pandas    as pd
+import datetime  as dt
+import argparse
+import json
+import html
+import os
+import fschart   as fc
+import fscore
+import fsstore
+import fsprovider
+import fsscreen
+import fspattern
+
+from concurrent.futures import ProcessPoolExecutor
+
+# -------------------------------------------------------------------------------------------------
+# Globals
+# -------------------------------------------------------------------------------------------------
+
+# daily history periods from shortest to longest
+fetch_periods = [ '1y', '5y', '10y', 'max' ]
+
+# data fetched once by the parent process, handed to each worker
+_shared = {}
+
+# page template (charts are rendered by vega-embed in the browser)
+_HTML = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="https://cdn.jsdelivr.net/npm/vega@5"></script>
+<script src="https://cdn.jsdelivr.net/npm/vega-lite@5"></script>
+<script src="https://cdn.jsdelivr.net/npm/vega-embed@6"></script>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; font-size: 0.9em; }}
+td, th {{ border: 1px solid #ddd; padding: 4px 8px; text-align: right; }}
+.chart {{ width: 100%; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<p>{date}</p>
+{body}
+<script>
+{script}
+</script>
+</body>
+</html>
+'''
+
+# -------------------------------------------------------------------------------------------------
+# Data Functions
+# -------------------------------------------------------------------------------------------------
+
+def load_portfolio( path ):
+
+    # param.json layout, missing keys from the dashboard defaults
+    with open( path, 'r' ) as fp:
+        params = { **fscore.default_params, **json.load( fp ) }
+    return os.path.splitext( os.path.basename( path ) )[0], params
+
+def fetch_shared( portfolios, bonds, sector_period ):
+
+    # every ticker is fetched once for all portfolios
+    tickers = fsscreen.get_universe( *[ list( p['port'] ) + p['bench'] for p in portfolios.values() ] )
+    periods = [ fscore.get_fetch_period( p[ key ] ) for p in portfolios.values() for key in [ 'gain_period' ] ]
+    period  = max( periods, key=fetch_periods.index )
+
+    sectors = list( fscore.sector_tickers )
+    return {
+        'info'       : fscore.fetch_info( tickers ),
+        'hist'       : fscore.fetch_history( tickers, period=period, interval='1d' ),
+        'sector_info': fscore.fetch_info( sectors ),
+        'sector_hist': fscore.fetch_history( sectors, period=fscore.get_fetch_period( sector_period ), interval='1d' ),
+        'bonds'      : [ [ name, fscore.fetch_bond_history( name ) ] for name in bonds ],
+    }
+
+def get_min_points( st_hist, tickers, period ):
+
+    # common number of points of tickers for a view period
+    return min( [ fscore.get_num_points( st_hist['close'][ t ].index, fscore.period_delta[ period ] ) for t in tickers ] )
+
+# -------------------------------------------------------------------------------------------------
+# Build Functions
+# -------------------------------------------------------------------------------------------------
+
+def build_common( shared, sector_period ):
+
+    # sections shared by all portfolios (sector bars, bond spread)
+    delta  = fscore.period_delta[ sector_period ][0]
+    report = { 'charts': {}, 'tables': {} }
+    report[ 'charts' ][ f'Sector ({sector_period})' ] = fc.get_sector_chart( shared['sector_info'], shared['sector_hist'], delta, sector_period != 'MAX' ).to_dict()
+
+    bond1, bond2 = shared['bonds']
+    if len( bond1[1].index ) > 1 and len( bond2[1].index ) > 1:
+        num_points = min( len( bond1[1].index ), len( bond2[1].index ) )
+        ch1, ch2   = fc.get_bond_chart( bond1, bond2, num_points )
+        report[ 'charts' ][ 'Bond' ]        = ch1.to_dict()
+        report[ 'charts' ][ 'Bond spread' ] = ch2.to_dict()
+
+    # last yield and daily change of each bond with at least two rows
+    rows = { name: { 'Yield': df['Close'].iloc[-1], 'Change': df['Close'].iloc[-1] - df['Close'].iloc[-2] }
+             for name, df in shared['bonds'] if len( df.index ) > 1 }
+    if rows: report[ 'tables' ][ 'Bond' ] = pd.DataFrame( rows ).transpose()[ [ 'Yield', 'Change' ] ]
+
+    return report
+
+def init_worker( shared ):
+
+    global _shared
+    _shared = shared
+
+def build_portfolio( name, params ):
+
+    # portfolio sections from the shared data (runs in a worker process)
+    port_k = list( params['port'] )
+    info   = fscore.get_subset( _shared['info'], port_k )
+    hist   = _shared['hist']
+
+    # table (uncached call, the subset is not a cache entry) and gains
+    table = fscore.fill_table.__wrapped__( info, hist, params['port'] ).sort_values( by='RSI(14)' )
+    gains = fscore.get_port_gains( info, hist, params['port'] )
+    gains = pd.DataFrame( [ gains ], index=[ 'Gain(%)' ], columns=[ '1D', '1W', '1M', '3M', '6M', '1Y' ] )
+
+    # backtest
+    num_points     = get_min_points( hist, port_k + params['bench'], params['gain_period'] )
+    bt_src, bt_inf = fc.get_btest_source( hist, hist, num_points, params )
+
+    # patterns
+    num_points = get_min_points( hist, port_k, params['pattern_period'] )
+    bull_logs, bear_logs = fspattern.get_logs( hist, port_k, fscore.bullish_pattern, fscore.bearish_pattern, num_points )
+
+    return {
+        'name'    : name,
+        'tables'  : {
+            'Portfolio'                                  : table,
+            'Gains'                                      : gains,
+            f'Backtest statistics ({params["gain_period"]})': bt_inf,
+        },
+        'charts'  : { f'Accumulated Gain ({params["gain_period"]})': fc.get_btest_chart( bt_src ).to_dict() },
+        'patterns': { 'Bullish': bull_logs, 'Bearish': bear_logs },
+        'rebalance': bt_inf.attrs.get( 'rebalance' ),
+    }
+
+# -------------------------------------------------------------------------------------------------
+# Output Functions
+# -------------------------------------------------------------------------------------------------
+
+def to_json( report, common ):
+
+    # tables as { row: { column: value } }, charts as Vega-Lite specs
+    tables = { **report['tables'], **common['tables'] }
+    return {
+        'name'     : report['name'],
+        'date'     : dt.datetime.now().isoformat( timespec='seconds' ),
+        'tables'   : { key: json.loads( df.to_json( orient='index' ) ) for key, df in tables.items() },
+        'patterns' : report['patterns'],
+        'rebalance': report['rebalance'],
+        'charts'   : { **report['charts'], **common['charts'] },
+    }
+
+def to_html( report, common ):
+
+    body, script = [], []
+    for key, df in { **report['tables'], **common['tables'] }.items():
+        body.append( f'<h2>{html.escape( key )}</h2>' + df.to_html( float_format='{:.2f}'.format, na_rep='-' ) )
+    for key, logs in report['patterns'].items():
+        body.append( f'<h2>{key} patterns</h2><pre>' + html.escape( '\n'.join( logs ) ) + '</pre>' )
+    for i, ( key, spec ) in enumerate( { **report['charts'], **common['charts'] }.items() ):
+        body.append( f'<h2>{html.escape( key )}</h2><div class="chart" id="chart{i}"></div>' )
+        script.append( f'vegaEmbed( "#chart{i}", {json.dumps( spec )} );' )
+
+    return _HTML.format( title=html.escape( report['name'] ), date=dt.datetime.now().strftime( '%Y-%m-%d %H:%M' ),
+                         body='\n'.join( body ), script='\n'.join( script ) )
+
+def write( report, common, out_dir, formats ):
+
+    os.makedirs( out_dir, exist_ok=True )
+    paths = []
+    if 'json' in formats:
+        paths.append( os.path.join( out_dir, report['name'] + '.json' ) )
+        with open( paths[-1], 'w' ) as fp:
+            json.dump( to_json( report, common ), fp, indent=2, default=str )
+    if 'html' in formats:
+        paths.append( os.path.join( out_dir, report['name'] + '.html' ) )
+        with open( paths[-1], 'w' ) as fp:
+            fp.write( to_html( report, common ) )
+    return paths
+
+# -------------------------------------------------------------------------------------------------
+# Main
+# -------------------------------------------------------------------------------------------------
+
+def run( paths, out_dir, formats=( 'html', 'json' ), workers=None, sector_period='1W', bonds=( 'U.S. 10Y', 'U.S. 2Y' ) ):
+
+    # shared data in this process, one portfolio per worker task
+    portfolios = dict( [ load_portfolio( path ) for path in paths ] )
+    shared     = fetch_shared( portfolios, bonds, sector_period )
+    common     = build_common( shared, sector_period )
+
+    written = []
+    with ProcessPoolExecutor( max_workers=workers, initializer=init_worker, initargs=( shared, ) ) as pool:
+        for report in pool.map( build_portfolio, list( portfolios ), list( portfolios.values() ) ):
+            written += write( report, common, out_dir, formats )
+    return written
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser( description='Financial Stream reports' )
+    parser.add_argument( 'params', nargs='+', help='portfolio parameter files (param.json layout)' )
+    parser.add_argument( '--out', default='reports' )
+    parser.add_argument( '--format', nargs='+', default=[ 'html', 'json' ], choices=[ 'html', 'json' ] )
+    parser.add_argument( '--workers', type=int, default=None )
+    parser.add_argument( '--sector-period', default='1W', choices=[ '1D', '1W', '1M', '3M', '6M', '1Y' ] )
+    parser.add_argument( '--bond', nargs=2, default=[ 'U.S. 10Y', 'U.S. 2Y' ] )
+    parser.add_argument( '--store', default=fsstore.store_dir )
+    parser.add_argument( '--offline', action='store_true', help='use only the local store and info snapshots' )
+    parser.add_argument( '--provider', default='yahoo', choices=[ 'yahoo', 'record', 'replay', 'synthetic' ] )
+    parser.add_argument( '--record-file', default=fsprovider.record_file )
+    parser.add_argument( '--latency', type=float, nargs=2, default=[ 0, 0 ], metavar=( 'CALL', 'TICKER' ) )
+    args = parser.parse_args()
+
+    fsstore.store_dir = args.store
+    fscore.offline    = args.offline
+    fsprovider.use( args.provider, args.record_file, *args.latency )
+
+    for path in run( args.params, args.out, args.format, args.workers, args.sector_period, args.bond ):
+        print( path )
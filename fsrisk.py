@@ -0,0 +1,112 @@
+#
+# Monte Carlo risk simulation for financial analysis
+#
+
+# -------------------------------------------------------------------------------------------------
+# Imports
+# -------------------------------------------------------------------------------------------------
+
+import pandas    as pd
+import numpy     as np
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+
+# -------------------------------------------------------------------------------------------------
+# Globals
+# -------------------------------------------------------------------------------------------------
+
+# accumulated gain (%) bins shared by all chunks (values outside are clipped to the end bins)
+gain_edges = np.arange( -100, 400.25, 0.25 )
+
+# reported levels
+var_levels = [ 95, 99 ]
+dd_levels  = [ 10, 20, 30, 50 ]
+fan_levels = [ 5, 25, 50, 75, 95 ]
+
+# -------------------------------------------------------------------------------------------------
+# Simulation Functions
+# -------------------------------------------------------------------------------------------------
+
+def get_port_returns( close, port ):
+
+    # daily returns of the constant-weight portfolio ( dates x assets close matrix )
+    returns = close.ffill().pct_change().iloc[ 1: ].fillna( 0 ).to_numpy()
+    weights = np.array( [ port[ t ] for t in close.columns ], dtype='float64' )
+    return returns @ ( weights / weights.sum() )
+
+def sample_paths( rng, returns, method, size, horizon, block ):
+
+    # size x horizon daily returns
+    if method == 'Parametric':
+        return rng.normal( returns.mean(), returns.std( ddof=1 ), ( size, horizon ) )
+
+    # circular block bootstrap keeps short-term autocorrelation
+    n      = len( returns )
+    starts = rng.integers( 0, n, ( size, -( -horizon // block ) ) )
+    index  = ( starts[ :, :, None ] + np.arange( block ) ).reshape( size, -1 )[ :, :horizon ]
+    return returns[ index % n ]
+
+def run_chunk( returns, method, size, horizon, block, seed ):
+
+    # reduce one batch of paths to fixed-size histograms and drawdown counts
+    rng   = np.random.default_rng( seed )
+    level = np.cumprod( 1 + sample_paths( rng, returns, method, size, horizon, block ), axis=1 )
+    gains = ( level - 1 ) * 100
+    nb    = len( gain_edges ) - 1
+
+    bins  = np.clip( np.searchsorted( gain_edges, gains, side='right' ) - 1, 0, nb-1 )
+    daily = np.bincount( ( bins + np.arange( horizon ) * nb ).ravel(), minlength=horizon*nb ).reshape( horizon, nb )
+
+    # maximum drawdown of each path (% from running peak, initial value included)
+    peak = np.maximum( np.maximum.accumulate( level, axis=1 ), 1 )
+    mdd  = ( ( level / peak - 1 ) * 100 ).min( axis=1 )
+
+    return {
+        'daily'   : daily,
+        'final'   : np.bincount( bins[ :, -1 ], minlength=nb ),
+        'tail'    : np.bincount( bins[ :, -1 ], weights=gains[ :, -1 ], minlength=nb ),
+        'drawdown': np.array( [ ( mdd <= -dd ).sum() for dd in dd_levels ] ),
+    }
+
+def get_percentile( counts, q ):
+
+    # percentile from histogram counts (linear inside the bin)
+    cum  = np.cumsum( counts, axis=-1 )
+    rank = cum[ ..., -1:] * q / 100
+    pos  = np.minimum( ( cum < rank ).sum( axis=-1, keepdims=True ), counts.shape[-1]-1 )
+    prev = np.take_along_axis( cum, pos, axis=-1 ) - np.take_along_axis( counts, pos, axis=-1 )
+    frac = ( rank - prev ) / np.maximum( np.take_along_axis( counts, pos, axis=-1 ), 1 )
+    return ( gain_edges[ pos ] + frac * np.diff( gain_edges )[ pos ] )[ ..., 0 ]
+
+def simulate( returns, num=100000, horizon=252, method='Bootstrap', block=10, chunk=10000, seed=0, workers=None ):
+
+    # chunks are seeded independently, so results do not depend on the number of workers
+    sizes = [ min( chunk, num - i ) for i in range( 0, num, chunk ) ]
+    seeds = np.random.SeedSequence( seed ).spawn( len( sizes ) )
+    args  = [ [ returns ]*len( sizes ), [ method ]*len( sizes ), sizes, [ horizon ]*len( sizes ), [ block ]*len( sizes ), seeds ]
+
+    total = None
+    with ProcessPoolExecutor( max_workers=workers or os.cpu_count() ) as pool:
+        for part in pool.map( run_chunk, *args ):
+            if total is None: total = part
+            else: total = { k: total[ k ] + part[ k ] for k in total }
+
+    # value at risk / conditional value at risk of the final gain (loss, %)
+    risk = {}
+    for level in var_levels:
+        var  = get_percentile( total[ 'final' ], 100 - level )
+
+        # whole bins below the VaR bin, plus the part of the VaR bin under VaR (uniform inside the bin)
+        pos  = min( max( np.searchsorted( gain_edges, var, side='right' ) - 1, 0 ), len( gain_edges ) - 2 )
+        frac = ( var - gain_edges[ pos ] ) / ( gain_edges[ pos+1 ] - gain_edges[ pos ] )
+        part = frac * total[ 'final' ][ pos ]
+        loss = total[ 'tail' ][ :pos ].sum() + part * ( gain_edges[ pos ] + var ) / 2
+        risk[ f'VaR({level}%)'  ] = -var
+        risk[ f'CVaR({level}%)' ] = -loss / max( total[ 'final' ][ :pos ].sum() + part, 1e-12 )
+    for dd, count in zip( dd_levels, total[ 'drawdown' ] ):
+        risk[ f'P(MDD>{dd}%)' ] = count / num * 100
+
+    fan = pd.DataFrame( { f'P{q}': get_percentile( total[ 'daily' ], q ) for q in fan_levels } )
+    fan.insert( 0, 'Day', np.arange( 1, horizon+1 ) )
+    return pd.Series( risk ), fan
@@ -0,0 +1,141 @@
+#
+# Universe screener for financial analysis
+#
+
+# -------------------------------------------------------------------------------------------------
+# Imports
+# -------------------------------------------------------------------------------------------------
+
+import pandas    as pd
+import numpy     as np
+import time
+import os
+import fsind
+import fspattern
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# -------------------------------------------------------------------------------------------------
+# Globals
+# -------------------------------------------------------------------------------------------------
+
+# result columns of each screened ticker
+screen_cols = [ 'Price', 'RSI(14)', 'CCI(14)', 'Bullish', 'Bearish' ]
+
+# -------------------------------------------------------------------------------------------------
+# Universe Functions
+# -------------------------------------------------------------------------------------------------
+
+def load_universe( path ):
+
+    # whitespace or comma separated tickers, '#' starts a comment
+    if path is None or not os.path.isfile( path ): return []
+    with open( path, 'r' ) as fp:
+        lines = [ line.split( '#' )[0] for line in fp ]
+    return [ t.upper() for t in ' '.join( lines ).replace( ',', ' ' ).split() ]
+
+def get_universe( *ticker_lists ):
+
+    # sorted union keeps shards (and their cache keys) stable between runs
+    return sorted( set( [ t for tickers in ticker_lists for t in tickers ] ) )
+
+def make_synthetic_history( tickers, num_days=252, seed=0, index=None ):
+
+    # random-walk OHLC in yahooquery layout, for benchmarks without network (daily bars unless index is given)
+    rng   = np.random.default_rng( seed )
+    index = pd.bdate_range( end='2024-12-31', periods=num_days, name='date' ) if index is None else index
+    close = 100 * np.exp( np.cumsum( rng.normal( 0, 0.02, ( len( tickers ), len( index ) ) ), axis=1 ) )
+    openp = close * np.exp( rng.normal( 0, 0.005, close.shape ) )
+    high  = np.maximum( openp, close ) * ( 1 + rng.uniform( 0, 0.01, close.shape ) )
+    low   = np.minimum( openp, close ) * ( 1 - rng.uniform( 0, 0.01, close.shape ) )
+
+    frames = { t: pd.DataFrame( {
+        'open' : openp[i],
+        'high' : high[i],
+        'low'  : low[i],
+        'close': close[i],
+        'volume': 1e6,
+    }, index=index ) for i, t in enumerate( tickers ) }
+    return pd.concat( frames, names=[ 'symbol', 'date' ] )
+
+def make_synthetic_info( st_hist ):
+
+    # fetch_info layout ( price, summary, fund ) matching a synthetic history
+    close = st_hist[ 'close' ]
+    info  = { 'price': {}, 'summary': {}, 'fund': {} }
+    for ticker in st_hist.index.unique( level=0 ):
+        last, prev = close[ ticker ].iloc[-1], close[ ticker ].iloc[-2]
+        info[ 'price' ][ ticker ] = {
+            'shortName'                 : ticker,
+            'longName'                  : ticker,
+            'quoteType'                 : 'EQUITY',
+            'regularMarketPrice'        : last,
+            'regularMarketPreviousClose': prev,
+            'regularMarketChangePercent': last / prev - 1,
+        }
+        info[ 'summary' ][ ticker ] = {
+            'fiftyTwoWeekHigh': close[ ticker ].iloc[ -252: ].max(),
+            'fiftyTwoWeekLow' : close[ ticker ].iloc[ -252: ].min(),
+        }
+    return info
+
+# -------------------------------------------------------------------------------------------------
+# Screen Functions
+# -------------------------------------------------------------------------------------------------
+
+def screen_shard( st_hist, tickers, bullish, bearish, num_points ):
+
+    # tickers missing from history (failed fetch) are skipped
+    symbols = set( st_hist.index.get_level_values( 0 ) )
+    tickers = [ t for t in tickers if t in symbols ]
+    if tickers == []: return pd.DataFrame( columns=screen_cols )
+
+    fields = { field: fsind.get_matrix( st_hist, tickers, field ) for field in [ 'open', 'high', 'low', 'close' ] }
+    close  = fields[ 'close' ]
+
+    result = pd.DataFrame( {
+        'Price'  : close[ :, -1 ],
+        'RSI(14)': fsind.batch_rsi( close )[ :, -1 ],
+        'CCI(14)': fsind.batch_cci( fields[ 'high' ], fields[ 'low' ], close )[ :, -1 ],
+    }, index=tickers )
+
+    # patterns detected in the last num_points bars (each CDL function once per ticker)
+    bull_list, bear_list = [], []
+    for i in range( len( tickers ) ):
+        valid = ~np.isnan( close[i] )
+        out   = fspattern.scan_arrays( *[ fields[ f ][i][ valid ] for f in [ 'open', 'high', 'low', 'close' ] ], bullish + bearish )
+        bull_list.append( ' '.join( [ p for p in dict.fromkeys( bullish ) if ( out[ p ][ -num_points: ] > 0 ).any() ] ) )
+        bear_list.append( ' '.join( [ p for p in dict.fromkeys( bearish ) if ( out[ p ][ -num_points: ] < 0 ).any() ] ) )
+
+    result[ 'Bullish' ] = bull_list
+    result[ 'Bearish' ] = bear_list
+    return result
+
+def run( tickers, loader, bullish, bearish, num_points=5, shard_size=100, workers=8 ):
+
+    # yields ( partial result, progress ) as shards complete; loader( shard ) returns history
+    def _task( shard ):
+        return screen_shard( loader( shard ), shard, bullish, bearish, num_points )
+
+    shards = [ tickers[ i:i+shard_size ] for i in range( 0, len( tickers ), shard_size ) ]
+    start  = time.time()
+    done   = 0
+
+    with ThreadPoolExecutor( max_workers=workers ) as pool:
+        futures = { pool.submit( _task, shard ): shard for shard in shards }
+        for future in as_completed( futures ):
+            done += len( futures[ future ] )
+            elapsed = time.time() - start
+            yield future.result(), {
+                'done'      : done,
+                'total'     : len( tickers ),
+                'elapsed'   : elapsed,
+                'throughput': done / elapsed if elapsed > 0 else 0,
+            }
+
+def get_over( result, params ):
+
+    # same oversold / overbought rule as the portfolio table
+    oversold   = result[ ( result['RSI(14)'] < params['RSI_L'] ) & ( result['CCI(14)'] < params['CCI_L'] ) ]
+    overbought = result[ ( result['RSI(14)'] > params['RSI_H'] ) & ( result['CCI(14)'] > params['CCI_H'] ) ]
+    return oversold.sort_values( by='RSI(14)' ), overbought.sort_values( by='RSI(14)', ascending=False )
@@ -0,0 +1,194 @@
+#
+# Local columnar price store for financial analysis
+#
+
+# -------------------------------------------------------------------------------------------------
+# Imports
+# -------------------------------------------------------------------------------------------------
+
+import pandas    as pd
+import numpy     as np
+import datetime  as dt
+import threading
+import json
+import os
+
+# -------------------------------------------------------------------------------------------------
+# Globals
+# -------------------------------------------------------------------------------------------------
+
+# root directory of the store (one file per interval and ticker)
+store_dir = 'store'
+
+# columns kept in the store, in order
+store_cols = [ 'open', 'high', 'low', 'close', 'volume', 'adjclose', 'dividends', 'splits' ]
+
+# on-disk value type (half the size of float64, converted back on load)
+store_dtype = 'float32'
+
+# aggregation of bars derived locally from daily bars
+resample_rules = { '1wk': 'W', '1mo': 'MS' }
+resample_agg   = { 'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum',
+                   'adjclose': 'last', 'dividends': 'sum', 'splits': 'prod', 'date': 'last' }
+
+# calendar length of yahoo periods (days), 'd' periods are counted in trading days
+period_days = {
+    '1d' :     1,
+    '5d' :     5,
+    '1mo':    31,
+    '3mo':    92,
+    '6mo':   183,
+    '1y' :   366,
+    '2y' :   731,
+    '5y' :  1827,
+    '10y':  3653,
+    'max': 36525,
+}
+
+# one lock per partition file
+_locks      = {}
+_locks_lock = threading.Lock()
+
+# -------------------------------------------------------------------------------------------------
+# Partition Functions
+# -------------------------------------------------------------------------------------------------
+
+def get_path( ticker, interval, ext='.npz' ):
+
+    # keep file names portable (e.g. '^GSPC', 'KRW=X')
+    name = ''.join( [ c if c.isalnum() or c in '-_.' else f'%{ord(c):02X}' for c in ticker ] )
+    return os.path.join( store_dir, interval, name + ext )
+
+def get_lock( ticker, interval ):
+
+    with _locks_lock:
+        key = ( ticker, interval )
+        if key not in _locks: _locks[ key ] = threading.Lock()
+        return _locks[ key ]
+
+def load( ticker, interval ):
+
+    path = get_path( ticker, interval )
+    if not os.path.isfile( path ): return None
+
+    with np.load( path, allow_pickle=False ) as data:
+        cols  = { col: data[ col ].astype( 'float64' ) for col in data.files if col not in [ 'date', 'period' ] }
+        index = pd.DatetimeIndex( data[ 'date' ].astype( 'datetime64[ns]' ), name='date' )
+        period = str( data[ 'period' ] )
+
+    df = pd.DataFrame( cols, index=index )
+    df.attrs[ 'period' ] = period
+    return df
+
+def save( ticker, interval, df, period ):
+
+    path = get_path( ticker, interval )
+    os.makedirs( os.path.dirname( path ), exist_ok=True )
+
+    cols = { col: df[ col ].to_numpy( dtype=store_dtype ) for col in store_cols if col in df.columns }
+    cols[ 'date'   ] = df.index.to_numpy( dtype='datetime64[ns]' ).astype( 'int64' )
+    cols[ 'period' ] = np.array( period )
+
+    # write to temporary file and swap, so readers never see partial data
+    temp = path + '.tmp.npz'
+    np.savez( temp, **cols )
+    os.replace( temp, path )
+
+def save_info( ticker, info ):
+
+    # snapshot of quote / summary / fund info (JSON, non-serializable values as strings)
+    path = get_path( ticker, 'info', '.json' )
+    os.makedirs( os.path.dirname( path ), exist_ok=True )
+
+    temp = path + '.tmp'
+    with open( temp, 'w' ) as fp:
+        json.dump( info, fp, default=str )
+    os.replace( temp, path )
+
+def load_info( ticker ):
+
+    path = get_path( ticker, 'info', '.json' )
+    if not os.path.isfile( path ): return None
+    with open( path, 'r' ) as fp:
+        return json.load( fp )
+
+# -------------------------------------------------------------------------------------------------
+# Utility Functions
+# -------------------------------------------------------------------------------------------------
+
+def normalize( df ):
+
+    # convert index to naive datetime (yahoo returns date objects for daily bars)
+    index = pd.to_datetime( pd.Index( df.index ), utc=True ).tz_localize( None )
+    df = df.set_axis( index.rename( 'date' ) )
+    df = df[ [ col for col in store_cols if col in df.columns ] ].astype( 'float64' )
+
+    # last bar wins
+    return df[ ~df.index.duplicated( keep='last' ) ].sort_index()
+
+def split_symbols( hist ):
+
+    # yahoo returns a dict (error messages) when nothing could be fetched
+    if not isinstance( hist, pd.DataFrame ) or len( hist.index ) == 0: return {}
+    return { symbol: normalize( hist.xs( symbol, level=0 ) ) for symbol in hist.index.unique( level=0 ) }
+
+def trim( df, period ):
+
+    if len( df.index ) == 0 or period not in period_days: return df
+
+    # trading-day periods keep last N sessions, others keep calendar window
+    if period.endswith( 'd' ):
+        days  = df.index.normalize().unique()[ -period_days[ period ]: ]
+        return df[ df.index >= days[0] ]
+
+    return df[ df.index >= df.index[-1] - dt.timedelta( days=period_days[ period ] ) ]
+
+def resample( hist, interval ):
+
+    # weekly / monthly bars from daily history (yahooquery layout), dated by their last session
+    if interval not in resample_rules: return hist
+    df  = hist.reset_index( level=1 )
+    agg = { col: rule for col, rule in resample_agg.items() if col in df.columns }
+    out = df.groupby( [ pd.Grouper( level=0 ), pd.Grouper( key='date', freq=resample_rules[ interval ] ) ] ).agg( agg )
+    out = out.dropna( subset=[ 'close' ] ).droplevel( 1 )
+    return out.set_index( 'date', append=True )
+
+def covers( df, period ):
+
+    if df is None: return False
+    return period_days.get( df.attrs.get( 'period' ), 0 ) >= period_days.get( period, 0 )
+
+# -------------------------------------------------------------------------------------------------
+# Read-through Functions
+# -------------------------------------------------------------------------------------------------
+
+def get_history( tickers, period, interval, loader ):
+
+    # loader( tickers, period=..., start=... ) returns yahooquery style history
+    stored = { ticker: load( ticker, interval ) for ticker in tickers }
+
+    # partitions not covering the period are fetched in full
+    missing = [ ticker for ticker in tickers if not covers( stored[ ticker ], period ) ]
+    if missing:
+        for ticker, df in split_symbols( loader( missing, period=period ) ).items():
+            with get_lock( ticker, interval ):
+                save( ticker, interval, df, period )
+                stored[ ticker ] = load( ticker, interval )
+
+    # others only fetch the tail since the oldest last timestamp (last bar may still change)
+    present = [ ticker for ticker in tickers if ticker not in missing and len( stored[ ticker ].index ) > 0 ]
+    if present:
+        start = min( [ stored[ ticker ].index[-1] for ticker in present ] ).normalize()
+        for ticker, df in split_symbols( loader( present, start=start ) ).items():
+            if ticker not in stored or len( df.index ) == 0: continue
+            with get_lock( ticker, interval ):
+                old    = stored[ ticker ]
+                merged = pd.concat( [ old[ old.index < df.index[0] ], df ] )
+                merged = trim( merged, old.attrs[ 'period' ] )
+                save( ticker, interval, merged, old.attrs[ 'period' ] )
+                stored[ ticker ] = load( ticker, interval )
+
+    # return in yahooquery layout
+    frames = { ticker: trim( stored[ ticker ], period ) for ticker in tickers if stored[ ticker ] is not None }
+    if frames == {}: return pd.DataFrame( columns=store_cols )
+    return pd.concat( frames, names=[ 'symbol', 'date' ] )
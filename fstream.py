@@ -14,16 +14,31 @@ urllib3.disable_warnings( urllib3.exceptions.InsecureRequestWarning )
 import streamlit as st
 import pandas as pd
 import altair as alt
-import talib  as ta
 import os
 import json
-import datetime as dt
 import fschart  as fc
+import fsstore
+import fscache
+import fscalendar
+import fsind
+import fslive
+import fspattern
+import fsscreen
+import fsport
+import fsopt
+import fsrisk
+import fsdown
+import fscore
+import fsapi
+import fsprovider
+import fsflight
+import fsprefetch
+import fsholdings
 import argparse
-import investpy
 
-from yahooquery import Ticker
-from numpy import NaN, isnan
+from fscore import ( _DEFAULT_PORT, _US_BOND, sector_tickers, period_delta, bullish_pattern, bearish_pattern, default_params,
+                     fetch_info, fetch_history, fetch_bond_history, fill_table, fetch_market_state,
+                     get_num_points, get_fetch_period, get_port_gains )
 
 # -------------------------------------------------------------------------------------------------
 # Globals
@@ -31,41 +46,8 @@ from numpy import NaN, isnan
 
 _PARAM_FILE      = "param.json"
 
-_DEFAULT_PORT    = { 'SPY':50, 'QQQ':50 }
-_DEFAULT_MARKET  = [ '^IXIC', '^GSPC', '^DJI', 'KRW=X' ]
-_DEFAULT_FUTURE  = [ 'NQ=F', 'ES=F', 'YM=F', 'KRW=X' ]
-_DEFAULT_BENCH   = [ 'SPY' ]
-_RSI_THRESHOLD_L =   30
-_RSI_THRESHOLD_H =   70
-_CCI_THRESHOLD_L = -100
-_CCI_THRESHOLD_H =  100
-_US_BOND         = [ 'U.S. 30Y', 'U.S. 10Y', 'U.S. 5Y', 'U.S. 3Y', 'U.S. 2Y', 'U.S. 1Y', 'U.S. 6M', 'U.S. 3M', 'U.S. 1M' ]
-
-sector_tickers = {
-    'XLK': 'Technology',
-    'XLC': 'Communication Services',
-    'XLY': 'Consumer Cyclical',
-    'XLF': 'Financial',
-    'XLV': 'Healthcare',
-    'XLP': 'Consumer Defensive',
-    'XLI': 'Industrials',
-    'XLRE':'Real Estate',
-    'XLE': 'Energy', 
-    'XLU': 'Utilities', 
-    'XLB': 'Materials',
-    'SPY': 'S&P 500',
-}
-fix_ticker_list = {
-    'BRK.B': 'BRK-B',
-    'LIN.L': 'LIN',
-}
-attr_list = { 
-    'regularMarketChangePercent':'Change(%)', 
-    'regularMarketPrice':'Price',
-    'trailingPE':'P/E',
-    'fiftyTwoWeekHigh':'52W_H(%)',
-    'fiftyTwoWeekLow':'52W_L(%)',
-}
+params = { **default_params }
+
 attr_color_scheme = {
     'Change(%)': [ [ -10000,   0, 'red'   ], [  0, 10000, 'green' ] ],
     'Price'    : [ ],
@@ -76,169 +58,17 @@ attr_color_scheme = {
     'CCI(14)'  : [ [ -10000,-100, 'red'   ], [100, 10000, 'red'   ] ],
     'Alloc'    : [ ],
 }
-period_delta = {
-    '1M' : [  30, 0 ],
-    '3M' : [  90, 0 ],
-    '6M' : [ 180, 0 ],
-    '1Y' : [ 365, 0 ],
-    '6H' : [  0,  6 ],
-    '12H': [  0, 12 ],
-    '1D' : [  1,  0 ],
-    '5D' : [  5,  0 ],
-    '1W' : [  7,  0 ],    
-}
-bullish_pattern = [ 
-    'CDLHAMMER', 
-    'CDLINVERTEDHAMMER',
-    'CDLENGULFING',
-    'CDLPIERCING',
-    'CDLMORNINGSTAR',
-    'CDL3WHITESOLDIERS'
-]
-bearish_pattern = [ 
-    'CDLHANGINGMAN', 
-    'CDLSHOOTINGSTAR',
-    'CDLENGULFING',
-    'CDLEVENINGSTAR',
-    'CDL3BLACKCROWS',
-    'CDLDARKCLOUDCOVER'
-]
-params = {
-    'port'   : _DEFAULT_PORT,
-    'market' : _DEFAULT_MARKET,
-    'future' : _DEFAULT_FUTURE,
-    'bench'  : _DEFAULT_BENCH,
-    'RSI_L'  : _RSI_THRESHOLD_L,
-    'RSI_H'  : _RSI_THRESHOLD_H,
-    'CCI_L'  : _CCI_THRESHOLD_L,
-    'CCI_H'  : _CCI_THRESHOLD_H,
-    'market_period' : '12H',
-    'sector_period' : '1W',
-    'gain_period'   : '3M',
-    'stock_period'  : '3M',
-    'pattern_period': '3M',
-}
 
 # -------------------------------------------------------------------------------------------------
 # Functions
 # -------------------------------------------------------------------------------------------------
 
-def fetch_tickers( tickers ):
-    
-    _list = Ticker( tickers, verify=False, asynchronous=True )
-    return _list
-
-@st.experimental_singleton
-def fetch_info( _tickers_list, cache_key ):
-    
-    info = {}
-    info[ 'price'     ] = _tickers_list.price
-    info[ 'summary'   ] = _tickers_list.summary_detail
-    info[ 'fund'      ] = _tickers_list.fund_holding_info
-
-    return info
-
-@st.experimental_singleton
-def fetch_history( _ticker_list, period, interval, cache_key ):
-
-    _hist = _ticker_list.history( period, interval, adj_timezone=False )
-    return _hist
-
-@st.experimental_singleton
-def fetch_bond_history( bond_name, cache_key ):
-
-    to_date = dt.datetime.today()
-    fr_date = to_date - dt.timedelta( days = 365 )
-    to_date_str = to_date.strftime( '%d/%m/%Y' )
-    fr_date_str = fr_date.strftime( '%d/%m/%Y' )
-
-    result = investpy.get_bond_historical_data( bond=bond_name, from_date=fr_date_str, to_date=to_date_str )
-
-    return result
-
-@st.experimental_singleton
-def fill_table( _st_info, _st_hist, cache_key ):
-
-    # from Ticker.price
-    df1 = pd.DataFrame( _st_info['price'] )
-    rm_index = [ x for x in df1.index if x not in attr_list ]
-    df1.drop( rm_index, inplace=True )
-
-    # from Ticker.summary_detail
-    df2 = pd.DataFrame( _st_info['summary'] )
-    rm_index = [ x for x in df2.index if x not in attr_list ]
-    df2.drop( rm_index, inplace=True )
-
-    # concat
-    df = pd.concat( [ df1, df2 ] )
-    
-    # compute RSI & CCI
-    rsi_list = {}
-    cci_list = {}
-    for key in df.columns:
-        
-        # compute RSI
-        rsi = ta.RSI( _st_hist['close'][ key ] )[-1]   
-        rsi_list[ key ] = rsi
-        
-        # compute CCI
-        cci = ta.CCI( _st_hist['high'][ key ], _st_hist['low'][ key ], _st_hist['close'][ key ] )[-1] 
-        cci_list[ key ] = cci
-
-    # rename column
-    for key, val in attr_list.items():
-        df.rename( index = { key:val }, inplace=True )
-
-    # compute 52W_H & 52W_L
-    for key in df.columns:
-        # 52W_L
-        try:
-            new_entry  = df.loc[ 'Price'][ key ] - df.loc[ '52W_L(%)' ][ key ]
-            new_entry /= df.loc[ '52W_L(%)' ][ key ]
-            df.loc[ '52W_L(%)' ][ key ] = new_entry
-        except:
-            df.loc[ '52W_L(%)' ][ key ] = NaN
-        
-        # 52W_H
-        try:
-            new_entry  = df.loc[ 'Price'][ key ] - df.loc[ '52W_H(%)' ][ key ]
-            new_entry /= df.loc[ '52W_H(%)' ][ key ]
-            df.loc[ '52W_H(%)' ][ key ] = new_entry
-        except:
-            df.loc[ '52W_H(%)' ][ key ] = NaN
-
-    # compute percentage
-    for key in df.index:
-        if '(%)' in key: df.loc[ key ] *= 100
-
-    # replace ETF P/E
-    for key in df.columns:
-        if _st_info[ 'price' ][ key ][ 'quoteType' ] != 'ETF': continue
-        try:
-            df.loc[ 'P/E' ][ key ] = _st_info[ 'fund' ][ key ][ 'equityHoldings' ][ 'priceToEarnings' ]
-        except:
-            try:
-                df.loc[ 'P/E' ][ key ] = NaN
-            except:
-                pass
-
-    # allocation
-    alo_list = []
-    for key in df.columns:
-        alo_list.append( params['port'][key] )
-
-    # add rows
-    df.loc[ 'RSI(14)' ] = rsi_list
-    df.loc[ 'CCI(14)' ] = cci_list
-    df.loc[ 'Alloc'   ] = alo_list
-
-    return df.transpose()
-
 def is_market_open():
     
-    t=Ticker( params['market'][0], verify=False )
-    if t.price[ params['market'][0] ]['marketState'] == 'REGULAR': return True
-    return False
+    # answer from local calendar, optionally reconciled with a cached quote
+    ticker = params['market'][0]
+    if not args.reconcile: return fscalendar.is_open( ticker )
+    return fetch_market_state( ticker ) == 'REGULAR'
 
 def highlight_color( s ):
 
@@ -275,7 +105,7 @@ def load_params():
     # check if first load, load from file
     if 'params' not in st.session_state:
         with open( _PARAM_FILE, 'r' ) as fp:
-            ret = json.load( fp )
+            ret = { **params, **json.load( fp ) }
         st.session_state.params = ret
     # otherwise, load from session
     else:
@@ -283,16 +113,6 @@ def load_params():
 
     return ret
 
-def get_num_points( index, delta ):
-
-    last = index[-1]
-    d    = dt.timedelta( days  = delta[0] )
-    h    = dt.timedelta( hours = delta[1] )
-    num_points = len( index [ index >= ( last - d - h ) ] )
-
-    # at least 2
-    return max( 2, num_points )
-
 def get_shortcut( port_dic ):
 
     # short-cut variables
@@ -301,40 +121,6 @@ def get_shortcut( port_dic ):
 
     return port_key, port_str
 
-def get_port_gains():
-
-    # get latest value
-    last_price = [ stock_info['price'][option]['regularMarketPrice'] for option in port_k ]
-
-    # portfolio allocation
-    port_alloc  = [ params['port'][option] for option in port_k ]
-    total_alloc = sum( port_alloc )
-        
-    # for each time delta
-    time_delta = [ 1, 7, 30, 90, 180, 365 ]
-    port_gain  = []
-    for delta in time_delta:
-
-        # get historic price
-        if delta != 1:
-            prev_price = []
-            for option in port_k:
-                num_points = get_num_points( stock_hist['close'][option].index, [ delta, 0 ] )
-                while isnan( stock_hist['close'][option][-num_points] ): num_points-=1
-                prev_price.append( stock_hist['close'][option][-num_points] )
-        else:
-            prev_price = [ stock_info['price'][option]['regularMarketPreviousClose'] for option in port_k ]
-
-        # compute gains
-        prev_gain = []
-        for index, price in enumerate( prev_price ):
-            prev_gain.append( ( last_price[index]-price )/price*port_alloc[index]/total_alloc )
-
-        # final gain
-        port_gain.append( sum( prev_gain )*100. )
-    
-    return port_gain
-
 def get_gain_str( name, value ):
 
     if value >=0:
@@ -347,11 +133,6 @@ def get_gain_str( name, value ):
     temp_str += '&nbsp;'*5
     return temp_str
 
-def fix_ticker( ticker ):
-
-    if ticker in fix_ticker_list: return fix_ticker_list[ ticker ]
-    return ticker
-
 # -------------------------------------------------------------------------------------------------
 # Functions (Callbacks)
 # -------------------------------------------------------------------------------------------------
@@ -374,9 +155,9 @@ def cb_ticker_list():
 
     # validate
     _verified_list = {}
-    t = Ticker( list( _ticker_list ), verify=False, validate=True )
+    symbols = fsprovider.get_symbols( list( _ticker_list ) )
     for k in _ticker_list:
-        if k in t.symbols:
+        if k in symbols:
             _verified_list[ k ] = _ticker_list[ k ]
 
     # if nothing, use default port
@@ -390,9 +171,6 @@ def cb_ticker_list():
     params[ 'port' ] = _verified_list
     save_params( params )
 
-    # clear portfolio cache
-    st.session_state.stcnt += 1
-
 def cb_gain_period():
     params[ 'gain_period' ] = st.session_state.gainperiod
     save_params( params )
@@ -419,6 +197,13 @@ def cb_sector_period():
     params[ 'sector_period' ] = st.session_state.sectorperiod
     save_params( params )
 
+def cb_rebalance():
+    params[ 'rebalance'    ] = st.session_state.rebalance
+    params[ 'band'         ] = st.session_state.band
+    params[ 'cost_bps'     ] = st.session_state.costbps
+    params[ 'slippage_bps' ] = st.session_state.slippagebps
+    save_params( params )
+
 def cb_pattern_period():
     params[ 'pattern_period' ] = st.session_state.patternperiod
     save_params( params )
@@ -429,17 +214,46 @@ def cb_pattern_period():
 
 parser = argparse.ArgumentParser( description='Financial Stream' )
 parser.add_argument( '--nosave', action='store_true' )
+parser.add_argument( '--store', default=fsstore.store_dir )
+parser.add_argument( '--cache-mb', type=int, default=fscache.budget // 2**20 )
+parser.add_argument( '--reconcile', action='store_true' )
+parser.add_argument( '--universe', default=None )
+parser.add_argument( '--max-points', type=int, default=fsdown.target_points )
+parser.add_argument( '--offline', action='store_true' )
+parser.add_argument( '--api', type=int, default=None )
+parser.add_argument( '--prefetch', action='store_true' )
+parser.add_argument( '--provider', default='yahoo', choices=[ 'yahoo', 'record', 'replay', 'synthetic' ] )
+parser.add_argument( '--record-file', default=fsprovider.record_file )
+parser.add_argument( '--latency', type=float, nargs=2, default=[ 0, 0 ], metavar=( 'CALL', 'TICKER' ) )
 args = parser.parse_args()
 
+# local price store location, cache budget and chart points (0 disables downsampling)
+fsstore.store_dir    = args.store
+fscache.budget       = args.cache_mb * 2**20
+fsdown.target_points = args.max_points or None
+fscore.offline       = args.offline
+
+# data provider (record to / replay from a file, latency in seconds per call and per ticker)
+fsprovider.use( args.provider, args.record_file, *args.latency )
+
+# JSON API next to the dashboard (same process, so it shares the caches)
+if args.api: fsapi.start( args.api )
+
+# background refresh of every menu's data (one scheduler per process)
+if args.prefetch: fsprefetch.start()
+
+# payload size is bounded by downsampling, not by the altair row limit
+alt.data_transformers.disable_max_rows()
+
 # -------------------------------------------------------------------------------------------------
 # Layout
 # -------------------------------------------------------------------------------------------------
 
 # add sidebar
 st.sidebar.title( 'Financial Stream' )
-menu   = st.sidebar.radio( "MENU", ( 'Market', 'Sector', 'Portfolio', 'Stock', 'Pattern', 'Bond' ) )
+menu   = st.sidebar.radio( "MENU", ( 'Market', 'Sector', 'Portfolio', 'Optimizer', 'Stock', 'Pattern', 'Screener', 'Bond' ) )
 button = st.sidebar.button( "Clear Cache" )
-if button: st.experimental_singleton.clear() 
+if button: fscache.clear()
 st.sidebar.markdown( '[**GitHub**](https://github.com/hurumi/financial-stream)' )
 
 # -------------------------------------------------------------------------------------------------
@@ -453,18 +267,9 @@ else: save_params( params )
 # get shortcut variables
 port_k, port_str = get_shortcut( params['port'] )
 
-# portfolio and benchmark
-stock_list = fetch_tickers( port_k )
-bench_list = fetch_tickers( params['bench'] )
-
-# -------------------------------------------------------------------------------------------------
-# Clear cache counter if necessary
-# -------------------------------------------------------------------------------------------------
-
-if 'stcnt' not in st.session_state: st.session_state.stcnt = 0
-if 'mkcnt' not in st.session_state: st.session_state.mkcnt = 0
-if 'secnt' not in st.session_state: st.session_state.secnt = 0
-if 'bdcnt' not in st.session_state: st.session_state.bdcnt = 0
+# keep this session's ticker lists warm
+for kind, tickers in [ [ 'portfolio', port_k ], [ 'bench', params['bench'] ], [ 'market', params['market'] ], [ 'future', params['future'] ] ]:
+    fsprefetch.watch( kind, tickers )
 
 # -------------------------------------------------------------------------------------------------
 # Portfolio
@@ -480,23 +285,25 @@ if menu == 'Portfolio':
                                 on_change=cb_ticker_list )
 
     if st.button( 'Refresh' ):
-        st.session_state.stcnt += 1
+        fetch_info.revalidate   ( port_k )
+        fetch_history.revalidate( port_k, '1y', '1d' )
+        fetch_history.revalidate( params['bench'], '1y', '1d' )
 
     # ---------------------------------------------------------------------------------------------
     # Summary
     # ---------------------------------------------------------------------------------------------
 
     # historical prices
-    stock_info = fetch_info   ( stock_list, cache_key='stock'+str(st.session_state.stcnt) )
-    stock_hist = fetch_history( stock_list, period='1y', interval='1d', cache_key='stock'+str(st.session_state.stcnt) )
+    stock_info = fetch_info   ( port_k )
+    stock_hist = fetch_history( port_k, period='1y', interval='1d' )
 
     # fill data from stock list
-    df  = fill_table( stock_info, stock_hist, cache_key="stock"+str(st.session_state.stcnt) ).sort_values( by='RSI(14)' )
+    df  = fill_table( stock_info, stock_hist, params['port'] ).sort_values( by='RSI(14)' )
     dfs = df.style.apply( highlight_color, axis=0 ).format( "{:.2f}", na_rep='-' )
     st.write( dfs )
 
     # get portfolio gains (1D, 1W, 1M, 3M, 6M, 1Y)
-    port_gain_list = get_port_gains()
+    port_gain_list = get_port_gains( stock_info, stock_hist, params['port'] )
     port_gain_str  = get_gain_str( '1D', port_gain_list[0] )
     port_gain_str += get_gain_str( '1W', port_gain_list[1] )
     port_gain_str += get_gain_str( '1M', port_gain_list[2] )
@@ -511,28 +318,66 @@ if menu == 'Portfolio':
 
     with st.expander( "Accumulated Gain (%)" ):
         # points selector
-        values = [ '1M', '3M', '6M', '1Y' ]
+        values = [ '1M', '3M', '6M', '1Y', '5Y', '10Y', 'MAX' ]
         period = st.selectbox( 'Period', values, 
                                 index=values.index( params['gain_period'] ),
                                 key='gainperiod',
                                 on_change=cb_gain_period )
 
-        # load data
-        bench_hist = fetch_history( bench_list,  period='1y', interval='1d', cache_key='bench'+str(st.session_state.stcnt) )
+        # rebalancing selector
+        col1, col2, col3, col4 = st.columns(4)
+        values = [ 'None', 'Monthly', 'Quarterly', 'Band' ]
+        col1.selectbox( 'Rebalance', values, index=values.index( params['rebalance'] ), key='rebalance', on_change=cb_rebalance )
+        col2.number_input( 'Band (%)',       1, 50,  params['band'],         key='band',        on_change=cb_rebalance )
+        col3.number_input( 'Cost (bps)',     0, 500, params['cost_bps'],     key='costbps',     on_change=cb_rebalance )
+        col4.number_input( 'Slippage (bps)', 0, 500, params['slippage_bps'], key='slippagebps', on_change=cb_rebalance )
+
+        # load data (long periods from the local store)
+        bench_hist = fetch_history( params['bench'], period=get_fetch_period( period ), interval='1d' )
+        gain_hist  = fetch_history( port_k,          period=get_fetch_period( period ), interval='1d' )
 
         # compute min number of points
         _temp_list =  [ get_num_points( bench_hist['close'][ elem ].index, period_delta[period] ) for elem in params['bench'] ]
-        _temp_list += [ get_num_points( stock_hist['close'][ elem ].index, period_delta[period] ) for elem in params['port' ] ]
+        _temp_list += [ get_num_points( gain_hist ['close'][ elem ].index, period_delta[period] ) for elem in params['port' ] ]
         num_points = min( _temp_list )
 
         # draw chart
-        bt_src, bt_inf = fc.get_btest_source( stock_hist, bench_hist, num_points, params )
+        bt_src, bt_inf = fc.get_btest_source( gain_hist, bench_hist, num_points, params )
         btest_chart    = fc.get_btest_chart ( bt_src )
         st.altair_chart( btest_chart, use_container_width=True )
 
         # write basic statistics
         bt_inf_s = bt_inf.style.format( "{:.2f}", na_rep='-' )
         st.dataframe( bt_inf_s )
+        if 'rebalance' in bt_inf.attrs:
+            rb = bt_inf.attrs['rebalance']
+            st.text( f'Rebalances: {rb["Rebalances"]}, Turnover: {rb["Turnover(%)"]:.1f}%, Cost: {rb["Cost(%)"]:.2f}%' )
+
+        # rolling statistics (beta against the first benchmark)
+        if st.checkbox( 'Rolling statistics', key='rolling' ):
+            values = [ '1M', '3M', '6M' ]
+            window = st.selectbox( 'Window', values, index=1, key='rollingwindow' )
+            window = min( { '1M': 21, '3M': 63, '6M': 126 }[ window ], num_points-1 )
+            st.altair_chart( fc.get_rolling_chart( fc.get_rolling_source( gain_hist, bench_hist, num_points, params, window ) ), use_container_width=True )
+
+    # ---------------------------------------------------------------------------------------------
+    # Risk simulation
+    # ---------------------------------------------------------------------------------------------
+
+    with st.expander( "Risk simulation (1Y)" ):
+        col1, col2 = st.columns(2)
+        method = col1.selectbox( 'Method', [ 'Bootstrap', 'Parametric' ], key='riskmethod' )
+        num    = col2.selectbox( 'Paths', [ 10000, 100000 ], index=1, key='risknum' )
+
+        # simulated from daily returns of the last year, cached per data version
+        # ( expander bodies run even when collapsed, so the simulation waits for the checkbox )
+        if st.checkbox( 'Run simulation', key='riskrun' ):
+            close   = fsport.get_close( stock_hist, port_k )
+            key     = ( 'risk', fsind.get_version( stock_hist ), tuple( params['port'].items() ), method, num )
+            risk, fan = fsport.memoize( key, lambda: fsrisk.simulate( fsrisk.get_port_returns( close, params['port'] ), num, method=method ) )
+
+            st.altair_chart( fc.get_fan_chart( fan ), use_container_width=True )
+            st.dataframe( risk.to_frame( 'Value(%)' ).T.style.format( "{:.2f}" ) )
 
     # ---------------------------------------------------------------------------------------------
     # Oversold & Overbought
@@ -582,6 +427,46 @@ if menu == 'Portfolio':
         dfs = overbought_df.style.apply( highlight_color, axis=0 ).format( "{:.2f}", na_rep='-' )
         st.write( dfs )
 
+# -------------------------------------------------------------------------------------------------
+# Optimizer
+# -------------------------------------------------------------------------------------------------
+
+if menu == 'Optimizer':
+
+    # sub title
+    st.subheader( 'Allocation sweep' )
+
+    col1, col2 = st.columns( 2 )
+    # points selector
+    values = [ '1M', '3M', '6M', '1Y', '5Y', '10Y', 'MAX' ]
+    period = col1.selectbox( 'Period', values, index=values.index( params['gain_period'] ), key='optperiod' )
+
+    # number of random candidates
+    values = [ 10000, 50000, 100000, 500000 ]
+    num    = col2.selectbox( 'Candidates', values, index=1, key='optnum' )
+
+    # load data
+    stock_hist = fetch_history( port_k, period=get_fetch_period( period ), interval='1d' )
+    num_points = min( [ get_num_points( stock_hist['close'][ elem ].index, period_delta[period] ) for elem in port_k ] )
+    close      = fsport.get_close( stock_hist, port_k ).iloc[ -num_points: ]
+
+    if len( port_k ) < 2:
+        st.text( 'At least two tickers are needed' )
+    elif st.checkbox( 'Run sweep', key='optrun' ):
+        # sweep is cached per data version and settings
+        key     = ( 'sweep', fsind.get_version( stock_hist ), tuple( port_k ), num_points, num )
+        sweep   = fsport.memoize( key, lambda: fsopt.sweep( close, num ) )
+        current = fsopt.get_current( close, params['port'] )
+
+        # draw chart
+        st.altair_chart( fc.get_frontier_chart( sweep, current ), use_container_width=True )
+
+        # statistics and weights (%)
+        st.dataframe( pd.concat( [ current, sweep['stats'] ] ).style.format( "{:.2f}", na_rep='-' ) )
+        weights = sweep['best'].assign( Current=[ params['port'][ elem ] for elem in port_k ] )
+        weights['Current'] = weights['Current'] / weights['Current'].sum() * 100
+        st.dataframe( weights[ [ 'Current', 'Max Sharpe', 'Min Vol' ] ].style.format( "{:.1f}" ) )
+
 # -------------------------------------------------------------------------------------------------
 # Each stock
 # -------------------------------------------------------------------------------------------------
@@ -595,17 +480,24 @@ if menu == 'Stock':
     option = st.selectbox( 'Ticker', port_k, key='stockticker' )
 
     # points selector
-    values = [ '1M', '3M', '6M', '1Y' ]
+    values = [ '1M', '3M', '6M', '1Y', '5Y', '10Y', 'MAX' ]
     period = st.selectbox( 'Period', values, 
                             index=values.index( params['stock_period'] ),
                             key='stockperiod',
                             on_change=cb_stock_period )
 
     # historical prices
-    stock_info = fetch_info    ( stock_list, cache_key='stock'+str(st.session_state.stcnt) )
-    stock_hist = fetch_history ( stock_list, period='1y', interval='1d', cache_key='stock'+str(st.session_state.stcnt) )
+    stock_info = fetch_info    ( port_k )
+    stock_hist = fetch_history ( port_k, period=get_fetch_period( period ), interval='1d' )
     num_points = get_num_points( stock_hist['close'][option].index, period_delta[period] )
 
+    # long periods are drawn with weekly / monthly bars derived locally
+    interval = fc.get_bar_interval( num_points )
+    if interval != '1d':
+        stock_hist = fsstore.resample( stock_hist.loc[ [ option ] ], interval )
+        num_points = get_num_points( stock_hist['close'][option].index, period_delta[period] )
+        st.caption( { '1wk': 'Weekly', '1mo': 'Monthly' }[ interval ] + ' bars' )
+
     # detailed information (JSON format)
     with st.expander( "Detailed information" ):
         
@@ -630,58 +522,16 @@ if menu == 'Stock':
     with col4:
         ma120_flag  = st.checkbox( 'MA120 (BLUE)' )
 
-    # price chart
-    price_chart = fc.get_candle_chart( stock_info, stock_hist, option, num_points )
-
-    # bollinger band chart
-    if bband_flag:
-        price_chart = fc.get_bband_chart( stock_hist, option, num_points ) + price_chart
-
-    # MA20 chart
-    if ma20_flag:
-        price_chart = fc.get_ma_chart( stock_hist, option, num_points, 20, 'red' ) + price_chart
-
-    # MA60 chart
-    if ma60_flag:
-        price_chart = fc.get_ma_chart( stock_hist, option, num_points, 60, 'green' ) + price_chart
-
-    # MA120 chart
-    if ma120_flag:
-        price_chart = fc.get_ma_chart( stock_hist, option, num_points, 120, 'blue' ) + price_chart
-
-    # draw
-    st.altair_chart( price_chart, use_container_width=True )
-
-    # ---------------------------------------------------------------------------------------------
-    # RSI history chart
-    # ---------------------------------------------------------------------------------------------
-
-    # rsi chart
-    rsi_chart = fc.get_rsi_chart( stock_hist, option, num_points, params )
-
-    # draw
-    st.altair_chart( rsi_chart, use_container_width=True )
-
-    # ---------------------------------------------------------------------------------------------
-    # CCI history chart
-    # ---------------------------------------------------------------------------------------------
+    # moving averages to overlay
+    ma_list = { period: color for period, color, flag in [ ( 20, 'red', ma20_flag ), ( 60, 'green', ma60_flag ), ( 120, 'blue', ma120_flag ) ] if flag }
 
-    # rsi chart
-    cci_chart = fc.get_cci_chart( stock_hist, option, num_points, params )
+    # candle, RSI, CCI and MACD panels share one dataset
+    key = ( 'stock', option, fsind.get_version( stock_hist, option ), fscache.get_token( stock_info ), num_points, bband_flag, tuple( ma_list.items() ),
+            params['RSI_L'], params['RSI_H'], params['CCI_L'], params['CCI_H'] )
+    stock_chart = fc.get_spec( key, lambda: fc.get_stock_chart( stock_info, stock_hist, option, num_points, params, bband_flag, ma_list ) )
 
     # draw
-    st.altair_chart( cci_chart, use_container_width=True )    
-
-    # ---------------------------------------------------------------------------------------------
-    # MACD history chart
-    # ---------------------------------------------------------------------------------------------
-    
-    # macd chart
-    macd_chart, macd_hist_chart = fc.get_macd_charts( stock_hist, option, num_points )
-
-    # draw
-    st.altair_chart( macd_chart,      use_container_width=True )
-    st.altair_chart( macd_hist_chart, use_container_width=True )
+    st.vega_lite_chart( stock_chart, use_container_width=True )
 
 # -------------------------------------------------------------------------------------------------
 # Market
@@ -699,31 +549,43 @@ if menu == 'Market':
                             key="marketperiod", 
                             on_change=cb_market_period )
 
-    if st.button( 'Refresh' ):
-        st.session_state.mkcnt += 1
-
     # check market open
     if is_market_open():
         ticker_list = params[ 'market' ]
+        st.caption( 'Market open, closes at ' + fscalendar.next_close( params['market'][0] ).strftime( '%a %H:%M ET' ) )
     else:
         ticker_list = params[ 'future' ]
+        st.caption( 'Market closed, opens at ' + fscalendar.next_open( params['market'][0] ).strftime( '%a %H:%M ET' ) )
 
-    # load historical data
-    market_list = fetch_tickers( ticker_list )
-    market_info = fetch_info   ( market_list, cache_key='market'+str(st.session_state.mkcnt) )
-    market_hist = fetch_history( market_list, period='5d', interval='5m', cache_key='market'+str(st.session_state.mkcnt) )
-
-    # if unmatched (when market changes), change cache key and try again
-    if set( market_info['price'].keys() ) != set( ticker_list ):
-        st.session_state.mkcnt += 1
-        market_info = fetch_info   ( market_list, cache_key='market'+str(st.session_state.mkcnt) )
-        market_hist = fetch_history( market_list, period='5d', interval='5m', cache_key='market'+str(st.session_state.mkcnt) )
-
-    # draw
-    for option in ticker_list:
-        num_points = get_num_points( market_hist['close'][option].index, period_delta[period] )
-        market_chart = fc.get_price_chart( market_info, market_hist, option, num_points, True )
-        st.altair_chart( market_chart, use_container_width=True )
+    if st.button( 'Refresh' ):
+        fetch_info.revalidate   ( ticker_list )
+        fetch_history.revalidate( ticker_list, '5d', '5m' )
+
+    # load historical data (cache is keyed by ticker list, so market changes fetch new data)
+    market_info = fetch_info   ( ticker_list )
+    market_hist = fetch_history( ticker_list, period='5d', interval='5m' )
+
+    # draw all tickers in one chart
+    num_points = { option: get_num_points( market_hist['close'][option].index, period_delta[period] ) for option in ticker_list }
+    key = ( 'market', tuple( ticker_list ), fsind.get_version( market_hist ), fscache.get_token( market_info ), tuple( num_points.items() ), True )
+    st.vega_lite_chart( fc.get_spec( key, lambda: fc.get_market_chart( market_info, market_hist, ticker_list, num_points, True ) ), use_container_width=True )
+
+    # streaming indicators (only new bars are applied on each refresh)
+    with st.expander( 'Intraday indicators (5m)' ):
+        live = {}
+        for option in ticker_list:
+            value = fslive.feed( market_hist, option, '5m' )
+            if value == {}: continue
+            live[ option ] = {
+                'RSI(14)'  : value[ 'RSI(14)' ],
+                'CCI(14)'  : value[ 'CCI(14)' ],
+                'MACD'     : value[ 'MACD' ][0],
+                'Signal'   : value[ 'MACD' ][1],
+                'BB_U'     : value[ 'BBANDS' ][0],
+                'BB_L'     : value[ 'BBANDS' ][2],
+                'SMA(20)'  : value[ 'SMA(20)' ],
+            }
+        st.write( pd.DataFrame( live ).transpose().style.format( "{:.2f}", na_rep='-' ) )
 
 # -------------------------------------------------------------------------------------------------
 # Sector
@@ -735,54 +597,82 @@ if menu == 'Sector':
     st.subheader( 'Sector chart' )
 
     # points selector
-    values = [ '1D', '1W', '1M', '3M', '6M', '1Y' ]
+    values = [ '1D', '1W', '1M', '3M', '6M', '1Y', '5Y', '10Y', 'MAX' ]
     period = st.selectbox( 'Period', values, 
                             index=values.index( params['sector_period'] ), 
                             key="sectorperiod", 
                             on_change=cb_sector_period )
 
-    if st.button( 'Refresh' ):
-        st.session_state.secnt += 1
+    refresh = st.button( 'Refresh' )
+    if refresh:
+        fetch_info.revalidate   ( list( sector_tickers ) )
+        fetch_history.revalidate( list( sector_tickers ), get_fetch_period( period ), '1d' )
+
+    # keep this period warm (sector ETFs and their holdings)
+    fsprefetch.watch( 'sector', [ get_fetch_period( period ) ] )
 
     # load historical data
-    sector_list = fetch_tickers( sector_tickers )
-    sector_info = fetch_info   ( sector_list, cache_key='sector'+str(st.session_state.secnt) )
-    sector_hist = fetch_history( sector_list, period='1y', interval='1d', cache_key='sector'+str(st.session_state.secnt) )
+    sector_info = fetch_info   ( list( sector_tickers ) )
+    sector_hist = fetch_history( list( sector_tickers ), period=get_fetch_period( period ), interval='1d' )
 
     # compute duration
     num_points  = get_num_points( sector_hist['close'][list(sector_tickers)[0]].index, period_delta[period] )
     
     # get source
-    se_chart = fc.get_sector_chart( sector_info, sector_hist, num_points )
+    key      = ( 'sector', fsind.get_version( sector_hist ), fscache.get_token( sector_info ), period_delta[period][0], period != 'MAX' )
+    se_chart = fc.get_spec( key, lambda: fc.get_sector_chart( sector_info, sector_hist, period_delta[period][0], period != 'MAX' ) )
 
     # draw
-    st.altair_chart( se_chart, use_container_width=True )
+    st.vega_lite_chart( se_chart, use_container_width=True )
 
     # stock selector
     r_sector_tickers = { v:k for k, v in sector_tickers.items() }
     option = st.selectbox( 'Sector', r_sector_tickers, key='stockticker' )
 
+    # holdings of all sector ETFs, each unique ticker fetched once (shared by every sector below)
+    holdings = fsholdings.get_holdings( sector_info )
+    universe = fsholdings.get_universe( holdings )
+    if refresh:
+        fsholdings.fetch_holdings_info.revalidate   ( universe )
+        fsholdings.fetch_holdings_history.revalidate( universe, get_fetch_period( period ) )
+    hold_info = fsholdings.fetch_holdings_info   ( universe )
+    hold_hist = fsholdings.fetch_holdings_history( universe, get_fetch_period( period ) )
+
     # top holdings performance
     with st.expander( 'Top holdings performance' ):
         r_option = r_sector_tickers[option]
 
-        # fix_ticker fixes ticker name error in yahoo finance (temporary solution)
-        top_tickers = [ fix_ticker( elem['symbol'] ) for elem in sector_info['fund'][r_option]['holdings'] ]
-        top_list = fetch_tickers( top_tickers ) 
-        top_info = fetch_info   ( top_list, cache_key=r_option+str(st.session_state.secnt) )
-        top_hist = fetch_history( top_list, period='1y', interval='1d', cache_key=r_option+str(st.session_state.secnt) )
+        # tickers of the selected ETF found in the shared data
+        top_tickers = fsholdings.get_available( hold_info, hold_hist, list( holdings.get( r_option, {} ) ) )
 
         # get source
-        to_chart = fc.get_sector_chart( top_info, top_hist, num_points )
+        key      = ( 'holdings', r_option, fscache.get_token( sector_info ), fsind.get_version( hold_hist ), fscache.get_token( hold_info ), period_delta[period][0], period != 'MAX' )
+        to_chart = fc.get_spec( key, lambda: fc.get_sector_chart( hold_info, hold_hist, period_delta[period][0], period != 'MAX', top_tickers ) )
 
         # draw
-        st.altair_chart( to_chart, use_container_width=True )
+        st.vega_lite_chart( to_chart, use_container_width=True )
 
-    # sector chart
-    se_chart = fc.get_price_chart( sector_info, sector_hist, r_sector_tickers[option], num_points )
+    # all sector holdings
+    with st.expander( 'All sector holdings' ):
+
+        # get source
+        key      = ( 'heatmap', fscache.get_token( sector_info ), fsind.get_version( hold_hist ), fscache.get_token( hold_info ), period_delta[period][0], period != 'MAX' )
+        hm_chart = fc.get_spec( key, lambda: fc.get_heatmap_chart( fsholdings.get_heatmap_source( holdings, hold_info, hold_hist, period_delta[period][0], period != 'MAX' ) ) )
+
+        # draw
+        st.vega_lite_chart( hm_chart, use_container_width=True )
+
+    # sector chart (weekly / monthly bars for long periods)
+    se_ticker = r_sector_tickers[option]
+    interval  = fc.get_bar_interval( num_points )
+    if interval != '1d':
+        sector_hist = fsstore.resample( sector_hist.loc[ [ se_ticker ] ], interval )
+        num_points  = get_num_points( sector_hist['close'][se_ticker].index, period_delta[period] )
+    key      = ( 'price', se_ticker, fsind.get_version( sector_hist, se_ticker ), fscache.get_token( sector_info ), num_points, False )
+    se_chart = fc.get_spec( key, lambda: fc.get_price_chart( sector_info, sector_hist, se_ticker, num_points ) )
 
     # draw
-    st.altair_chart( se_chart, use_container_width=True )
+    st.vega_lite_chart( se_chart, use_container_width=True )
 
 # -------------------------------------------------------------------------------------------------
 # Pattern
@@ -791,8 +681,8 @@ if menu == 'Sector':
 if menu == 'Pattern':
 
     # historical prices
-    stock_info = fetch_info    ( stock_list, cache_key='stock'+str(st.session_state.stcnt) )
-    stock_hist = fetch_history ( stock_list, period='1y', interval='1d', cache_key='stock'+str(st.session_state.stcnt) )
+    stock_info = fetch_info    ( port_k )
+    stock_hist = fetch_history ( port_k, period='1y', interval='1d' )
     num_points = get_num_points( stock_hist['close'][port_k[0]].index, period_delta['1M'] )
 
     # ---------------------------------------------------------------------------------------------
@@ -800,37 +690,26 @@ if menu == 'Pattern':
     # ---------------------------------------------------------------------------------------------
 
     st.subheader( 'Pattern logs (1M)' )
-    
+
+    # pattern set (all TA-Lib patterns are split into bullish and bearish by sign)
+    if st.checkbox( 'All candlestick patterns' ):
+        bull_list, bear_list = fspattern.all_patterns, fspattern.all_patterns
+    else:
+        bull_list, bear_list = bullish_pattern, bearish_pattern
+
+    # each pattern is computed once per ticker and shared with the chart below
+    bull_logs, bear_logs = fspattern.get_logs( stock_hist, port_k, bull_list, bear_list, num_points )
+
     col1, col2 = st.columns(2)
     with col1:
         # bullish patterns
         st.markdown( '##### Bullish patterns' )
-        _temp        = []
-        for option in port_k:
-            for method in bullish_pattern:
-                data = getattr( ta, method )( stock_hist['open'][option][-num_points:], 
-                                    stock_hist['high'][option][-num_points:], 
-                                    stock_hist['low'][option][-num_points:], 
-                                    stock_hist['close'][option][-num_points:] )
-                for d, v in data.items():
-                    if v>0: _temp.append( f'{d}: [{option:5}] {method}' )
-        _temp.sort()
-        st.code( '\n'.join( _temp ) )
+        st.code( '\n'.join( bull_logs ) )
         
     with col2:
         # bearish patterns
         st.markdown( '##### Bearish patterns' )
-        _temp = []        
-        for option in port_k:
-            for method in bearish_pattern:
-                data = getattr( ta, method )( stock_hist['open'][option][-num_points:], 
-                                    stock_hist['high'][option][-num_points:], 
-                                    stock_hist['low'][option][-num_points:], 
-                                    stock_hist['close'][option][-num_points:] )
-                for d, v in data.items():
-                    if v<0: _temp.append( f'{d}: [{option:5}] {method}' )
-        _temp.sort()
-        st.code( '\n'.join( _temp ) )
+        st.code( '\n'.join( bear_logs ) )
 
     # ---------------------------------------------------------------------------------------------
     # Pattern chart for selected stock
@@ -851,31 +730,8 @@ if menu == 'Pattern':
 
     num_points = get_num_points( stock_hist['close'][option].index, period_delta[period] )
 
-    # bullish data
-    _bullish_histo = stock_hist['close'][option][-num_points:].copy()    
-    for idx, method in enumerate( bullish_pattern ):
-        _temp = getattr( ta, method )( stock_hist['open'][option][-num_points:], 
-                            stock_hist['high'][option][-num_points:], 
-                            stock_hist['low'][option][-num_points:], 
-                            stock_hist['close'][option][-num_points:] )
-        if idx == 0: data  = _temp
-        else:        data += _temp
-    
-    _bullish_histo[ data <= 0 ] = 0
-    bullish_histo = _bullish_histo[ _bullish_histo > 0 ]
-
-    # bearish data
-    _bearish_histo = stock_hist['close'][option][-num_points:].copy()    
-    for idx, method in enumerate( bearish_pattern ):
-        _temp = getattr( ta, method )( stock_hist['open'][option][-num_points:], 
-                            stock_hist['high'][option][-num_points:], 
-                            stock_hist['low'][option][-num_points:], 
-                            stock_hist['close'][option][-num_points:] )
-        if idx == 0: data  = _temp
-        else:        data += _temp                            
-    
-    _bearish_histo[ data >= 0 ] = 0
-    bearish_histo = _bearish_histo[ _bearish_histo > 0 ]
+    # bullish & bearish data
+    bullish_histo, bearish_histo = fspattern.get_histo( stock_hist, option, bull_list, bear_list, num_points )
 
     # price chart
     price_chart = fc.get_candle_chart( stock_info, stock_hist, option, num_points )
@@ -886,6 +742,44 @@ if menu == 'Pattern':
     # draw
     st.altair_chart( price_chart, use_container_width=True )
 
+# -------------------------------------------------------------------------------------------------
+# Screener
+# -------------------------------------------------------------------------------------------------
+
+if menu == 'Screener':
+
+    # sub title
+    st.subheader( 'Universe screener' )
+
+    # universe: portfolio, sector ETFs and their holdings, and optional universe file
+    sector_info = fetch_info( list( sector_tickers ) )
+    holdings    = fsholdings.get_universe( fsholdings.get_holdings( sector_info ) )
+    universe    = fsscreen.get_universe( port_k, list( sector_tickers ), holdings, fsscreen.load_universe( args.universe ) )
+    st.text( f'{len( universe )} tickers, RSI<{params["RSI_L"]} and CCI<{params["CCI_L"]} / RSI>{params["RSI_H"]} and CCI>{params["CCI_H"]}' )
+
+    if st.button( 'Run screen' ):
+        progress = st.progress( 0 )
+        status   = st.empty()
+        table    = st.empty()
+
+        # shards reuse cached / stored history, partial results are shown as they complete
+        parts = []
+        loader = lambda shard: fetch_history( shard, period='1y', interval='1d' )
+        for part, prog in fsscreen.run( universe, loader, bullish_pattern, bearish_pattern ):
+            parts.append( part )
+            progress.progress( prog['done'] / prog['total'] )
+            status.text( f'{prog["done"]}/{prog["total"]} tickers, {prog["throughput"]:.1f} tickers/s' )
+            oversold, overbought = fsscreen.get_over( pd.concat( parts ), params )
+            table.write( pd.concat( [ oversold, overbought ] ).style.format( "{:.2f}", subset=[ 'Price', 'RSI(14)', 'CCI(14)' ], na_rep='-' ) )
+        st.session_state.screen = pd.concat( parts )
+
+    # last result
+    if 'screen' in st.session_state:
+        oversold, overbought = fsscreen.get_over( st.session_state.screen, params )
+        for title, data in [ ( 'Oversold', oversold ), ( 'Overbought', overbought ) ]:
+            st.markdown( f'##### {title} ({len( data.index )})' )
+            st.write( data.style.format( "{:.2f}", subset=[ 'Price', 'RSI(14)', 'CCI(14)' ], na_rep='-' ) )
+
 # -------------------------------------------------------------------------------------------------
 # Bond
 # -------------------------------------------------------------------------------------------------
@@ -906,11 +800,12 @@ if menu == 'Bond':
     period = st.selectbox( 'Period', values, key="bondperiod" )
 
     if st.button( 'Refresh' ):
-        st.session_state.bdcnt += 1
+        fetch_bond_history.revalidate( bond1 )
+        fetch_bond_history.revalidate( bond2 )
 
     # fetch data
-    df1 = fetch_bond_history( bond1, cache_key='bond1'+str(st.session_state.bdcnt) )
-    df2 = fetch_bond_history( bond2, cache_key='bond2'+str(st.session_state.bdcnt) )
+    df1 = fetch_bond_history( bond1 )
+    df2 = fetch_bond_history( bond2 )
 
     # get charts
     num_points1 = get_num_points( df1['Close'].index, period_delta[period] )
@@ -920,4 +815,18 @@ if menu == 'Bond':
 
     # draw
     st.altair_chart( ch1, use_container_width=True )
-    st.altair_chart( ch2, use_container_width=True )
\ No newline at end of file
+    st.altair_chart( ch2, use_container_width=True )
+
+# -------------------------------------------------------------------------------------------------
+# Cache status
+# -------------------------------------------------------------------------------------------------
+
+with st.sidebar.expander( 'Cache status' ):
+    st.dataframe( fscache.get_stats().style.format( "{:.1f}", subset=[ 'Size(KB)', 'Hit(%)' ] ) )
+    st.dataframe( fsflight.get_stats().style.format( "{:.1f}", subset=[ 'Dedup(%)' ] ) )
+    if st.checkbox( 'Show entries' ):
+        st.dataframe( fscache.get_entries().style.format( "{:.1f}", subset=[ 'Size(KB)', 'Age(s)', 'TTL(s)' ] ) )
+
+if args.prefetch:
+    with st.sidebar.expander( 'Prefetch status' ):
+        st.dataframe( fsprefetch.get_status().style.format( "{:.2f}", subset=[ 'Duration(s)' ] ) )
\ No newline at end of file
@@ -0,0 +1,40 @@
+#
+# Test fixtures for financial analysis
+#
+
+# -------------------------------------------------------------------------------------------------
+# Imports
+# -------------------------------------------------------------------------------------------------
+
+import os
+import sys
+import pytest
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+import fscache
+import fsflight
+import fsprovider
+import fsstore
+
+# -------------------------------------------------------------------------------------------------
+# Fixtures
+# -------------------------------------------------------------------------------------------------
+
+@pytest.fixture( autouse=True )
+def isolated( tmp_path, monkeypatch ):
+
+    # synthetic data, an empty local store and an empty cache for every test
+    monkeypatch.setattr( fsstore, 'store_dir', str( tmp_path / 'store' ) )
+    monkeypatch.setattr( fsflight, 'window', 0 )
+    fsprovider.use( 'synthetic' )
+    fscache.clear()
+    fscache._stats.clear()
+    yield
+    fscache.clear()
+
+@pytest.fixture
+def hist():
+
+    # two tickers, one year of daily bars ( symbol, date )
+    return fsprovider.synthetic_history( [ 'AAA', 'BBB' ], '1d', '1y' )
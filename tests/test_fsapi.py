@@ -0,0 +1,81 @@
+#
+# API tests for financial analysis
+#
+
+import json
+import pytest
+import fsapi
+
+# -------------------------------------------------------------------------------------------------
+# Helpers
+# -------------------------------------------------------------------------------------------------
+
+@pytest.fixture( autouse=True )
+def stub( monkeypatch ):
+
+    # synthetic source, restored after each test
+    monkeypatch.setattr( fsapi, 'source', dict( fsapi.source ) )
+    fsapi.use_stub()
+
+# -------------------------------------------------------------------------------------------------
+# Response Tests
+# -------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize( 'path, query', [
+    ( '/table',      { 'port': 'AAA:60,BBB:40' } ),
+    ( '/gains',      { 'port': 'AAA:60,BBB:40' } ),
+    ( '/btest',      { 'port': 'AAA,BBB', 'bench': 'CCC', 'period': '6M', 'rebalance': 'Monthly', 'cost_bps': '5' } ),
+    ( '/indicators', { 'ticker': 'aaa', 'period': '3M' } ),
+] )
+def test_ok_then_not_modified( path, query ):
+
+    status, etag, body = fsapi.respond( path, query )
+    assert status == 200
+    assert etag is not None and etag.startswith( '"' )
+    assert json.loads( body ) != {}
+
+    # same data version: same tag, 304 without a body, shared body otherwise
+    assert fsapi.respond( path, query, if_none_match=etag ) == ( 304, etag, None )
+    assert fsapi.respond( path, query, if_none_match=f'"other", {etag}' )[0] == 304
+    assert fsapi.respond( path, query, if_none_match='"other"' ) == ( 200, etag, body )
+
+def test_etag_follows_request_and_data():
+
+    _, tag1, _ = fsapi.respond( '/table', { 'port': 'AAA:60,BBB:40' } )
+    _, tag2, _ = fsapi.respond( '/table', { 'port': 'AAA:50,BBB:50' } )
+    assert tag1 != tag2
+
+    # new data version after the history is refetched
+    fsapi.source[ 'history' ].revalidate( [ 'AAA', 'BBB' ], '1y', '1d' )
+    _, tag3, _ = fsapi.respond( '/table', { 'port': 'AAA:60,BBB:40' } )
+    assert tag3 != tag1
+
+def test_cache_never_tagged():
+
+    status, etag, _ = fsapi.respond( '/cache', {} )
+    assert status == 200 and etag is None
+
+@pytest.mark.parametrize( 'path, query', [
+    ( '/table',      {} ),
+    ( '/table',      { 'port': ' , ' } ),
+    ( '/table',      { 'port': 'AAA:x' } ),
+    ( '/btest',      { 'port': 'AAA', 'band': 'wide' } ),
+    ( '/btest',      { 'port': 'AAA', 'rebalance': 'Weekly' } ),
+    ( '/btest',      { 'port': 'AAA', 'period': '7Y' } ),
+    ( '/patterns',   { 'tickers': 'AAA', 'bullish': 'NOPE' } ),
+] )
+def test_bad_request( path, query ):
+
+    status, etag, body = fsapi.respond( path, query )
+    assert status == 400 and etag is None
+    assert 'error' in body
+
+def test_missing_data_is_bad_request( monkeypatch ):
+
+    monkeypatch.setitem( fsapi.source, 'history', lambda tickers, period, interval: { t: 'No data found' for t in tickers } )
+    status, _, body = fsapi.respond( '/indicators', { 'ticker': 'ZZZ' } )
+    assert status == 400 and 'ZZZ' in body[ 'error' ]
+
+def test_unknown_endpoint():
+
+    assert fsapi.respond( '/nope', {} )[0] == 404
@@ -0,0 +1,132 @@
+#
+# Cache tests for financial analysis
+#
+
+import gc
+import pandas as pd
+import fscache
+
+# -------------------------------------------------------------------------------------------------
+# Helpers
+# -------------------------------------------------------------------------------------------------
+
+def make_counted( dataset ):
+
+    # memoized frame builder counting its real calls
+    calls = []
+
+    @fscache.memoize( dataset )
+    def build( tickers, period, interval='1d' ):
+        calls.append( ( tuple( tickers ), period, interval ) )
+        return pd.DataFrame( { 'n': [ len( tickers ) ] } )
+
+    return build, calls
+
+# -------------------------------------------------------------------------------------------------
+# Keyword Tests
+# -------------------------------------------------------------------------------------------------
+
+def test_keyword_and_positional_share_entry():
+
+    build, calls = make_counted( 'daily' )
+    a = build( [ 'AAA' ], period='1y' )
+    b = build( [ 'AAA' ], '1y', '1d' )
+    c = build( tickers=[ 'AAA' ], interval='1d', period='1y' )
+    assert a is b and b is c
+    assert len( calls ) == 1
+
+def test_dataset_function_gets_keywords():
+
+    @fscache.memoize( lambda tickers, period, interval='1d': 'intraday' if interval[-1] in 'mh' else 'daily' )
+    def build( tickers, period, interval='1d' ):
+        return pd.DataFrame()
+
+    assert build.dataset( [ 'AAA' ], '1y' ) == 'daily'
+    assert build.dataset( [ 'AAA' ], period='5d', interval='5m' ) == 'intraday'
+
+def test_helpers_accept_keywords():
+
+    build, calls = make_counted( 'daily' )
+    assert build.expires( [ 'AAA' ], period='1y' ) is None
+
+    first = build( [ 'AAA' ], period='1y' )
+    assert build.ttl( [ 'AAA' ], '1y' ) > 0
+    assert build.expires( tickers=[ 'AAA' ], period='1y' ) is not None
+
+    build.revalidate( [ 'AAA' ], period='1y' )
+    assert build( [ 'AAA' ], '1y' ) is not first
+    assert len( calls ) == 2
+
+    fresh = build.refresh( [ 'AAA' ], period='1y', interval='1d' )
+    assert build( [ 'AAA' ], '1y' ) is fresh
+    assert len( calls ) == 3
+
+# -------------------------------------------------------------------------------------------------
+# Token Tests
+# -------------------------------------------------------------------------------------------------
+
+def test_results_key_dependent_calls():
+
+    build, _ = make_counted( 'daily' )
+    derived  = []
+
+    @fscache.memoize( 'table' )
+    def table( df, k ):
+        derived.append( k )
+        return { 'k': k }
+
+    df = build( [ 'AAA' ], '1y' )
+    assert table( df, 1 ) is table( df, 1 )
+    assert derived == [ 1 ]
+
+def test_token_kept_after_eviction( monkeypatch ):
+
+    build, _ = make_counted( 'daily' )
+    held = build( [ 'AAA' ], '1y' )
+    token = fscache.get_token( held )
+
+    # a budget of one byte evicts everything but the newest entry
+    monkeypatch.setattr( fscache, 'budget', 1 )
+    build( [ 'BBB' ], '1y' )
+    assert fscache.get_stats().loc[ 'daily', 'Evictions' ] == 1
+    assert fscache.get_token( held ) == token
+
+    @fscache.memoize( 'table' )
+    def table( df ):
+        return { 'rows': len( df.index ) }
+
+    assert table( held ) is table( held )
+
+def test_token_kept_after_clear():
+
+    build, calls = make_counted( 'daily' )
+    held  = build( [ 'AAA' ], '1y' )
+    token = fscache.get_token( held )
+
+    fscache.clear()
+    assert fscache.get_token( held ) == token
+    assert build( [ 'AAA' ], '1y' ) is not held
+    assert len( calls ) == 2
+
+def test_token_forgotten_with_value():
+
+    build, _ = make_counted( 'daily' )
+    value_id = id( build( [ 'AAA' ], '1y' ) )
+    fscache.clear()
+    gc.collect()
+    assert value_id not in fscache._tokens
+
+def test_unkeyed_argument_computes_uncached():
+
+    derived = []
+
+    @fscache.memoize( 'table' )
+    def table( df ):
+        derived.append( 1 )
+        return { 'rows': len( df.index ) }
+
+    df = pd.DataFrame( { 'x': [ 1, 2 ] } )
+    assert table( df ) == { 'rows': 2 }
+    assert table( df ) == { 'rows': 2 }
+    assert len( derived ) == 2
+    assert fscache.get_entries().empty
@@ -0,0 +1,73 @@
+#
+# Request coalescing tests for financial analysis
+#
+
+import threading
+import pandas as pd
+import pytest
+import fsflight
+import fsprovider
+import fsstore
+
+# -------------------------------------------------------------------------------------------------
+# History Tests
+# -------------------------------------------------------------------------------------------------
+
+def test_partial_error_dict_keeps_symbols():
+
+    # yahooquery answers { ticker: date rows or error } when some tickers fail
+    good = fsprovider.synthetic_history( [ 'AAA' ], '1d', '1mo' ).xs( 'AAA', level=0 )
+    hist = fsflight.fetch( 'history', [ 'AAA', 'BAD' ], lambda tickers: { 'AAA': good, 'BAD': 'No data found' } )
+
+    assert isinstance( hist, pd.DataFrame )
+    assert list( hist.index.names ) == [ 'symbol', 'date' ]
+    assert list( hist.index.unique( level=0 ) ) == [ 'AAA' ]
+    assert list( fsstore.split_symbols( hist ) ) == [ 'AAA' ]
+    pd.testing.assert_frame_equal( hist.xs( 'AAA', level=0 ), good )
+
+def test_all_errors_stay_dict():
+
+    hist = fsflight.fetch( 'history', [ 'BAD' ], lambda tickers: { 'BAD': 'No data found' } )
+    assert hist == { 'BAD': 'No data found' }
+
+def test_split_and_join_roundtrip( hist ):
+
+    parts = fsflight.split_history( hist, [ 'AAA', 'BBB', 'CCC' ] )
+    assert parts[ 'CCC' ] == 'No data found'
+    pd.testing.assert_frame_equal( fsflight.join_history( parts ), hist )
+
+# -------------------------------------------------------------------------------------------------
+# Coalescing Tests
+# -------------------------------------------------------------------------------------------------
+
+def test_concurrent_fetches_share_upstream( monkeypatch ):
+
+    monkeypatch.setattr( fsflight, 'window', 0.2 )
+    monkeypatch.setattr( fsflight, '_stats', {} )
+    calls   = []
+    results = {}
+
+    def call( tickers ):
+        calls.append( list( tickers ) )
+        return fsprovider.synthetic_info( tickers )
+
+    def run( name, tickers ):
+        results[ name ] = fsflight.fetch( 'info', tickers, call )
+
+    threads = [ threading.Thread( target=run, args=( i, tickers ) ) for i, tickers in enumerate( [ [ 'AAA', 'BBB' ], [ 'BBB', 'CCC' ] ] ) ]
+    for th in threads: th.start()
+    for th in threads: th.join()
+
+    assert len( calls ) == 1 and sorted( calls[0] ) == [ 'AAA', 'BBB', 'CCC' ]
+    assert sorted( results[0][ 'price' ] ) == [ 'AAA', 'BBB' ]
+    assert sorted( results[1][ 'price' ] ) == [ 'BBB', 'CCC' ]
+    assert fsflight.get_pending() == 0
+
+def test_error_reaches_every_caller():
+
+    def call( tickers ):
+        raise RuntimeError( 'upstream down' )
+
+    with pytest.raises( RuntimeError, match='upstream down' ):
+        fsflight.fetch( 'info', [ 'AAA' ], call )
+    assert fsflight.get_pending() == 0
@@ -0,0 +1,78 @@
+#
+# Indicator tests for financial analysis
+#
+
+import numpy as np
+import talib as ta
+import fsind
+import fslive
+
+# -------------------------------------------------------------------------------------------------
+# Batch Tests
+# -------------------------------------------------------------------------------------------------
+
+def test_batch_rsi_matches_talib( hist ):
+
+    tickers = [ 'AAA', 'BBB' ]
+    close   = fsind.get_matrix( hist, tickers, 'close' )
+    out     = fsind.batch_rsi( close )
+    for row, t in enumerate( tickers ):
+        expect = ta.RSI( hist[ 'close' ][ t ].to_numpy( dtype='float64' ) )
+        np.testing.assert_allclose( out[ row, -len( expect ): ], expect, rtol=1e-9, atol=1e-9 )
+
+def test_batch_rsi_ragged_rows( hist ):
+
+    # shorter histories are NaN-padded in front and computed on their own bars
+    short = hist.drop( hist.xs( 'BBB', level=0, drop_level=False ).index[ :100 ] )
+    close = fsind.get_matrix( short, [ 'AAA', 'BBB' ], 'close' )
+    out   = fsind.batch_rsi( close )
+    expect = ta.RSI( short[ 'close' ][ 'BBB' ].to_numpy( dtype='float64' ) )
+    assert np.isnan( out[ 1, :100 ] ).all()
+    np.testing.assert_allclose( out[ 1, 100: ], expect, rtol=1e-9, atol=1e-9 )
+
+def test_batch_cci_matches_talib( hist ):
+
+    tickers = [ 'AAA', 'BBB' ]
+    high, low, close = [ fsind.get_matrix( hist, tickers, field ) for field in [ 'high', 'low', 'close' ] ]
+    out = fsind.batch_cci( high, low, close )
+    for row, t in enumerate( tickers ):
+        inputs = [ hist[ field ][ t ].to_numpy( dtype='float64' ) for field in [ 'high', 'low', 'close' ] ]
+        np.testing.assert_allclose( out[ row ], ta.CCI( *inputs ), rtol=1e-6, atol=1e-6 )
+
+# -------------------------------------------------------------------------------------------------
+# Live Tests
+# -------------------------------------------------------------------------------------------------
+
+def test_live_book_matches_talib( hist ):
+
+    # feeding bars one at a time gives the last values of the full TA-Lib series
+    df   = hist.xs( 'AAA', level=0 )
+    high, low, close = [ df[ field ].to_numpy( dtype='float64' ) for field in [ 'high', 'low', 'close' ] ]
+    book = fslive.new_book()
+    for row in df.itertuples():
+        value = fslive.update_book( book, row.Index, row.open, row.high, row.low, row.close )
+
+    macd   = ta.MACD( close )
+    bbands = ta.BBANDS( close, 20, 2, 2 )
+    expect = {
+        'SMA(20)': ta.SMA( close, 20 )[-1],
+        'EMA(20)': ta.EMA( close, 20 )[-1],
+        'RSI(14)': ta.RSI( close )[-1],
+        'CCI(14)': ta.CCI( high, low, close )[-1],
+    }
+    for name, v in expect.items():
+        assert np.isclose( value[ name ], v, rtol=1e-6 ), name
+    np.testing.assert_allclose( value[ 'MACD'   ], [ s[-1] for s in macd ],   rtol=1e-6 )
+    np.testing.assert_allclose( value[ 'BBANDS' ], [ s[-1] for s in bbands ], rtol=1e-6 )
+
+def test_feed_peeks_live_bar( hist, monkeypatch ):
+
+    monkeypatch.setattr( fslive, 'books', {} )
+    close = hist[ 'close' ][ 'AAA' ].to_numpy( dtype='float64' )
+    value = fslive.feed( hist, 'AAA', '1d' )
+    assert np.isclose( value[ 'RSI(14)' ], ta.RSI( close )[-1] )
+
+    # the live bar is not applied to the stored book
+    assert fslive.books[ ( 'AAA', '1d' ) ][ 'last' ] == hist.xs( 'AAA', level=0 ).index[-2]
+    again = fslive.feed( hist, 'AAA', '1d' )
+    assert again[ 'RSI(14)' ] == value[ 'RSI(14)' ]
@@ -0,0 +1,76 @@
+#
+# Portfolio tests for financial analysis
+#
+
+import numpy as np
+import pandas as pd
+import pytest
+import fsport
+
+# -------------------------------------------------------------------------------------------------
+# Helpers
+# -------------------------------------------------------------------------------------------------
+
+@pytest.fixture
+def prices( hist ):
+
+    close = hist[ 'close' ].unstack( level=0 )[ [ 'AAA', 'BBB' ] ]
+    return close.to_numpy( dtype='float64' ), close.index
+
+# -------------------------------------------------------------------------------------------------
+# Rebalancing Tests
+# -------------------------------------------------------------------------------------------------
+
+def test_none_is_buy_and_hold( prices ):
+
+    values, dates = prices
+    gains, info = fsport.get_rebalanced( values, dates, [ 60, 40 ], 'None' )
+    units  = np.array( [ 0.6, 0.4 ] ) / values[0]
+    expect = ( values @ units - 1 ) * 100
+    np.testing.assert_allclose( gains, expect )
+    assert info[ 'Rebalances' ] == 0
+
+def test_periodic_rebalances_at_period_starts( prices ):
+
+    values, dates = prices
+    months = pd.DatetimeIndex( dates ).to_period( 'M' ).nunique()
+    _, monthly   = fsport.get_rebalanced( values, dates, [ 1, 1 ], 'Monthly' )
+    _, quarterly = fsport.get_rebalanced( values, dates, [ 1, 1 ], 'Quarterly' )
+    assert monthly[ 'Rebalances' ] == months - 1
+    assert 0 < quarterly[ 'Rebalances' ] < monthly[ 'Rebalances' ]
+
+def test_rebalance_restores_target( prices ):
+
+    # right after a rebalance, holdings are back at target weights
+    values, dates = prices
+    starts = fsport.get_period_starts( dates, 'Monthly' )
+    gains, _ = fsport.get_rebalanced( values[ :starts[0]+1 ], dates[ :starts[0]+1 ], [ 3, 1 ], 'Monthly' )
+    units = np.array( [ 0.75, 0.25 ] ) / values[0]
+    total = values[ starts[0] ] @ units
+    assert np.isclose( gains[-1], ( total - 1 ) * 100 )
+
+def test_costs_reduce_gain( prices ):
+
+    values, dates = prices
+    free, info = fsport.get_rebalanced( values, dates, [ 1, 1 ], 'Monthly' )
+    paid, cost = fsport.get_rebalanced( values, dates, [ 1, 1 ], 'Monthly', cost_bps=10, slippage_bps=5 )
+    assert info[ 'Cost(%)' ] == 0
+    assert cost[ 'Cost(%)' ] > 0
+    assert np.isclose( cost[ 'Turnover(%)' ] * 15 / 1e4, cost[ 'Cost(%)' ] )
+    assert paid[-1] < free[-1]
+
+def test_band_triggers_on_drift( prices ):
+
+    values, dates = prices
+    _, never = fsport.get_rebalanced( values, dates, [ 1, 1 ], 'Band', band=1.0 )
+    _, tight = fsport.get_rebalanced( values, dates, [ 1, 1 ], 'Band', band=0.01 )
+    assert never[ 'Rebalances' ] == 0
+    assert tight[ 'Rebalances' ] > 0
+
+def test_band_independent_of_lookahead( prices ):
+
+    values, dates = prices
+    a, info_a = fsport.get_rebalanced( values, dates, [ 1, 1 ], 'Band', band=0.02, lookahead=1 )
+    b, info_b = fsport.get_rebalanced( values, dates, [ 1, 1 ], 'Band', band=0.02, lookahead=64 )
+    np.testing.assert_allclose( a, b )
+    assert info_a == info_b
@@ -0,0 +1,66 @@
+#
+# Simulation tests for financial analysis
+#
+
+import numpy as np
+import pandas as pd
+import pytest
+import fsrisk
+import fsopt
+
+# -------------------------------------------------------------------------------------------------
+# Helpers
+# -------------------------------------------------------------------------------------------------
+
+@pytest.fixture
+def close( hist ):
+
+    return hist[ 'close' ].unstack( level=0 )[ [ 'AAA', 'BBB' ] ]
+
+# -------------------------------------------------------------------------------------------------
+# Risk Tests
+# -------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize( 'method', [ 'Bootstrap', 'Parametric' ] )
+def test_simulate_reproducible( close, method ):
+
+    returns = fsrisk.get_port_returns( close, { 'AAA': 1, 'BBB': 1 } )
+    run = lambda workers, seed=7: fsrisk.simulate( returns, num=2000, horizon=20, method=method, chunk=500, seed=seed, workers=workers )
+
+    risk1, fan1 = run( 1 )
+    risk2, fan2 = run( 2 )
+    pd.testing.assert_series_equal( risk1, risk2 )
+    pd.testing.assert_frame_equal( fan1, fan2 )
+
+    risk3, _ = run( 1, seed=8 )
+    assert not risk1.equals( risk3 )
+
+def test_simulate_tail_ordering( close ):
+
+    returns = fsrisk.get_port_returns( close, { 'AAA': 1, 'BBB': 1 } )
+    risk, fan = fsrisk.simulate( returns, num=4000, horizon=60, chunk=1000, seed=1, workers=1 )
+    assert risk[ 'CVaR(95%)' ] >= risk[ 'VaR(95%)' ]
+    assert risk[ 'CVaR(99%)' ] >= risk[ 'VaR(99%)' ]
+    assert risk[ 'VaR(99%)' ] >= risk[ 'VaR(95%)' ]
+    assert ( np.diff( fan[ [ f'P{q}' for q in fsrisk.fan_levels ] ].to_numpy(), axis=1 ) >= 0 ).all()
+
+# -------------------------------------------------------------------------------------------------
+# Sweep Tests
+# -------------------------------------------------------------------------------------------------
+
+def test_sweep_reproducible( close ):
+
+    run = lambda workers, seed=3: fsopt.sweep( close, 600, chunk=200, workers=workers, seed=seed, sample_size=100 )
+
+    one, two = run( 1 ), run( 2 )
+    for name in [ 'sample', 'frontier', 'best', 'stats' ]:
+        pd.testing.assert_frame_equal( one[ name ], two[ name ] )
+
+    other = run( 1, seed=4 )
+    assert not one[ 'best' ].equals( other[ 'best' ] )
+
+def test_sweep_weights( close ):
+
+    out = fsopt.sweep( close, 400, chunk=200, workers=1, seed=0, sample_size=100 )
+    np.testing.assert_allclose( out[ 'best' ].sum(), 100 )
+    assert out[ 'stats' ].loc[ 'Min Vol', 'Vol' ] <= out[ 'sample' ][ 'Vol' ].min() + 1e-9
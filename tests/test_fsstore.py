@@ -0,0 +1,84 @@
+#
+# Local store tests for financial analysis
+#
+
+import numpy as np
+import pandas as pd
+import pytest
+import fsprovider
+import fsstore
+
+# -------------------------------------------------------------------------------------------------
+# Helpers
+# -------------------------------------------------------------------------------------------------
+
+class Loader:
+
+    # yahooquery style history up to a moving last bar, recording each request
+    def __init__( self, full, last ):
+        self.full  = full
+        self.last  = pd.Timestamp( last )
+        self.calls = []
+
+    def __call__( self, tickers, period=None, start=None ):
+        self.calls.append( ( list( tickers ), period, start ) )
+        hist = self.full[ self.full.index.get_level_values( 0 ).isin( tickers ) ]
+        date = hist.index.get_level_values( 1 )
+        keep = ( date <= self.last ) & ( date >= ( pd.Timestamp( start ) if start is not None else self.last - pd.Timedelta( days=400 ) ) )
+        return hist[ keep ]
+
+@pytest.fixture
+def loader():
+
+    full = fsprovider.synthetic_history( [ 'AAA', 'BBB' ], '1d', '2y' )
+    return Loader( full, '2024-06-28' )
+
+# -------------------------------------------------------------------------------------------------
+# Read-through Tests
+# -------------------------------------------------------------------------------------------------
+
+def test_first_read_fetches_period( loader ):
+
+    hist = fsstore.get_history( [ 'AAA', 'BBB' ], '1y', '1d', loader )
+    assert loader.calls[0] == ( [ 'AAA', 'BBB' ], '1y', None )
+    assert list( hist.index.names ) == [ 'symbol', 'date' ]
+    assert hist.index.get_level_values( 1 ).max() == loader.last
+    assert fsstore.load( 'AAA', '1d' ).attrs[ 'period' ] == '1y'
+
+def test_tail_merge( loader ):
+
+    fsstore.get_history( [ 'AAA', 'BBB' ], '1y', '1d', loader )
+    first = loader.last
+
+    # a week later, with the previously last bar revised upstream
+    loader.full.loc[ ( 'AAA', first ), 'close' ] += 1
+    loader.last = pd.Timestamp( '2024-07-05' )
+    hist = fsstore.get_history( [ 'AAA', 'BBB' ], '1y', '1d', loader )
+
+    assert loader.calls[-1] == ( [ 'AAA', 'BBB' ], None, first.normalize() )
+    assert len( loader.calls ) == 2
+    assert hist.index.get_level_values( 1 ).max() == loader.last
+    assert not hist.index.duplicated().any()
+
+    # stored values are float32, the revised bar wins
+    expect = loader( [ 'AAA' ], start=first )[ 'close' ].xs( 'AAA', level=0 )
+    got    = hist[ 'close' ].xs( 'AAA', level=0 ).loc[ expect.index ]
+    np.testing.assert_allclose( got, expect.astype( 'float32' ), rtol=1e-6 )
+
+    # the window stays trimmed to the stored period
+    dates = fsstore.load( 'AAA', '1d' ).index
+    assert dates[0] >= dates[-1] - pd.Timedelta( days=fsstore.period_days[ '1y' ] )
+
+def test_longer_period_refetches( loader ):
+
+    fsstore.get_history( [ 'AAA' ], '1mo', '1d', loader )
+    fsstore.get_history( [ 'AAA' ], '1y', '1d', loader )
+    assert loader.calls[-1] == ( [ 'AAA' ], '1y', None )
+    assert fsstore.load( 'AAA', '1d' ).attrs[ 'period' ] == '1y'
+
+def test_trim_to_requested_period( loader ):
+
+    fsstore.get_history( [ 'AAA' ], '1y', '1d', loader )
+    hist  = fsstore.get_history( [ 'AAA' ], '1mo', '1d', loader )
+    dates = hist.index.get_level_values( 1 )
+    assert dates[0] >= dates[-1] - pd.Timedelta( days=fsstore.period_days[ '1mo' ] )